@@ -0,0 +1,180 @@
+"""Upstream fixtures for the benchmark stub server.
+
+Recorded responses in ``benchmarks/fixtures`` (see ``record_fixtures.py``)
+are served as-is. When a recording is missing, a deterministic synthetic
+response with the same shape is generated instead, so the suite also runs
+on machines without network access.
+"""
+import json
+import os
+import random
+import struct
+import time
+from functools import lru_cache
+
+import flatbuffers
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
+SEED = 1729
+# Every recording the stub server looks for; RSS feeds use rss_<feed>.xml
+NAMES = (
+    'worldbank_population.json', 'restcountries_population.json', 'surftruths_stations.json',
+    'surftruths_predictions.json', 'rss_nyt_health.xml', 'rss_sciencedaily_nutrition.xml',
+    'openmeteo_forecast.bin',
+)
+
+# Open-Meteo variable and unit ids, from openmeteo_sdk.Variable and .Unit
+TEMPERATURE, RELATIVE_HUMIDITY, PRECIPITATION, WEATHER_CODE = 47, 29, 24, 56
+CELSIUS, PERCENT, MILLIMETRE, WMO_CODE = 1, 35, 32, 40
+
+
+def sources():
+    """Fixture name -> 'recorded' or 'synthetic', for reports and baselines."""
+    return {name: 'recorded' if os.path.exists(os.path.join(FIXTURES_DIR, name)) else 'synthetic'
+            for name in NAMES}
+
+
+def recorded(name):
+    path = os.path.join(FIXTURES_DIR, name)
+    if os.path.exists(path):
+        with open(path, 'rb') as f:
+            return f.read()
+    return None
+
+
+@lru_cache(maxsize=None)
+def worldbank_population():
+    rng = random.Random(SEED)
+    rows = [
+        {
+            'indicator': {'id': 'SP.POP.TOTL', 'value': 'Population, total'},
+            'country': {'id': f"C{i:02d}", 'value': f"Country {i}"},
+            'countryiso3code': f"C{i:02d}",
+            'date': '2023',
+            'value': rng.randint(100_000, 1_400_000_000),
+        }
+        for i in range(266)
+    ]
+    meta = {'page': 1, 'pages': 1, 'per_page': 300, 'total': len(rows)}
+    return json.dumps([meta, rows]).encode()
+
+
+@lru_cache(maxsize=None)
+def restcountries_population():
+    rng = random.Random(SEED)
+    return json.dumps([
+        {'cca3': f"C{i:02d}", 'population': rng.randint(100_000, 1_400_000_000)}
+        for i in range(250)
+    ]).encode()
+
+
+@lru_cache(maxsize=None)
+def surftruths_stations(count=3000):
+    rng = random.Random(SEED)
+    return json.dumps([
+        {
+            'id': 1000 + i,
+            'name': f"Station {i}",
+            'latitude': round(rng.uniform(-60, 70), 4),
+            'longitude': round(rng.uniform(-180, 180), 4),
+        }
+        for i in range(count)
+    ]).encode()
+
+
+def surftruths_predictions(day):
+    rng = random.Random(f"{SEED}-{day}")
+    stamp = time.strftime('%Y-%m-%d', time.strptime(day, '%Y%m%d'))
+    return json.dumps([
+        {'time': f"{stamp}T{h:02d}:{rng.randint(0, 59):02d}:00Z",
+         'type': kind, 'value': rng.randint(-150, 450)}
+        for h, kind in ((2, 'high'), (8, 'low'), (14, 'high'), (20, 'low'))
+    ]).encode()
+
+
+@lru_cache(maxsize=None)
+def rss_feed(name, items=20):
+    entries = ''.join(
+        f"<item><title>{name} story {i}</title>"
+        f"<link>https://example.org/{name}/{i}</link>"
+        f"<pubDate>Mon, 19 Oct 2026 {i % 24:02d}:00:00 GMT</pubDate>"
+        f"<description>{'Summary text for the benchmark feed. ' * 12}</description></item>"
+        for i in range(items)
+    )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel>'
+        f"<title>{name}</title><link>https://example.org/{name}</link>"
+        f"<description>Synthetic {name} feed</description>{entries}</channel></rss>"
+    ).encode()
+
+
+def _variable(builder, variable, unit, value=None, values=None):
+    vector = None
+    if values is not None:
+        builder.StartVector(4, len(values), 4)
+        for v in reversed(values):
+            builder.PrependFloat32(v)
+        vector = builder.EndVector()
+    builder.StartObject(13)
+    builder.PrependUint8Slot(0, variable, 0)
+    builder.PrependUint8Slot(1, unit, 0)
+    if value is not None:
+        builder.PrependFloat32Slot(2, value, 0.0)
+    if vector is not None:
+        builder.PrependUOffsetTRelativeSlot(3, vector, 0)
+    return builder.EndObject()
+
+
+def _variables_with_time(builder, start, end, interval, variables):
+    builder.StartVector(4, len(variables), 4)
+    for v in reversed(variables):
+        builder.PrependUOffsetTRelative(v)
+    vector = builder.EndVector()
+    builder.StartObject(4)
+    builder.PrependInt64Slot(0, start, 0)
+    builder.PrependInt64Slot(1, end, 0)
+    builder.PrependInt32Slot(2, interval, 0)
+    builder.PrependUOffsetTRelativeSlot(3, vector, 0)
+    return builder.EndObject()
+
+
+def openmeteo_message(lat, lon, rng):
+    """One length-prefixed WeatherApiResponse, as sent with format=flatbuffers."""
+    builder = flatbuffers.Builder(1024)
+    now = int(time.time()) // 3600 * 3600
+
+    current = _variables_with_time(builder, now, now + 900, 900, [
+        _variable(builder, TEMPERATURE, CELSIUS, value=rng.uniform(-20, 40)),
+        _variable(builder, RELATIVE_HUMIDITY, PERCENT, value=rng.uniform(10, 100)),
+        _variable(builder, PRECIPITATION, MILLIMETRE, value=rng.choice([0.0, 0.0, 0.4, 2.5])),
+        _variable(builder, WEATHER_CODE, WMO_CODE, value=float(rng.choice([0, 1, 2, 3, 61, 80, 95]))),
+    ])
+    hourly = _variables_with_time(builder, now, now + 24 * 3600, 3600, [
+        _variable(builder, TEMPERATURE, CELSIUS, values=[rng.uniform(-20, 40) for _ in range(24)]),
+    ])
+    timezone = builder.CreateString('GMT')
+    abbreviation = builder.CreateString('GMT')
+
+    builder.StartObject(15)
+    builder.PrependFloat32Slot(0, lat, 0.0)
+    builder.PrependFloat32Slot(1, lon, 0.0)
+    builder.PrependFloat32Slot(2, rng.uniform(0, 500), 0.0)
+    builder.PrependFloat32Slot(3, 0.05, 0.0)
+    builder.PrependInt32Slot(6, 0, 0)
+    builder.PrependUOffsetTRelativeSlot(7, timezone, 0)
+    builder.PrependUOffsetTRelativeSlot(8, abbreviation, 0)
+    builder.PrependUOffsetTRelativeSlot(9, current, 0)
+    builder.PrependUOffsetTRelativeSlot(11, hourly, 0)
+    builder.Finish(builder.EndObject())
+
+    body = builder.Output()
+    return struct.pack('<I', len(body)) + bytes(body)
+
+
+def openmeteo_forecast(latitudes, longitudes):
+    """One message per requested location, like the multi-location API."""
+    single = recorded('openmeteo_forecast.bin')
+    if single is not None:
+        return single * len(latitudes)
+    rng = random.Random(SEED)
+    return b''.join(openmeteo_message(lat, lon, rng) for lat, lon in zip(latitudes, longitudes))
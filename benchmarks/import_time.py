@@ -0,0 +1,152 @@
+"""Startup cost of the app, from ``python -X importtime``.
+
+Imports ``app`` in fresh interpreters and reports the median total import
+time, the heaviest direct imports, and any module that is meant to be
+loaded lazily but was imported at startup. The committed
+import_baseline.json is from one development machine; timings are
+machine-specific, so store a local baseline before comparing. Run from the
+repository root:
+
+    python -m benchmarks.import_time                    # compare with baseline
+    python -m benchmarks.import_time --update-baseline  # store this run
+    python -m benchmarks.import_time --serve            # also time to first /healthz
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC = os.path.join(ROOT, 'src')
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'import_baseline.json')
+
+# Deferred until first use or background warm-up; importing any of these at
+# startup is reported as a regression regardless of timings
+DEFERRED = ('cudf', 'feedparser', 'httpx', 'openmeteo_sdk', 'pyarrow')
+
+
+def _environ():
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [ROOT, SRC, env.get('PYTHONPATH')]))
+    env.setdefault('GAIA_SNAPSHOT_DIR', tempfile.mkdtemp(prefix='gaia-import-'))
+    return env
+
+
+def parse_importtime(stderr):
+    """-> list of (module, depth, self_us, cumulative_us) in report order."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative, name = line[len('import time:'):].split('|', 2)
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), depth, int(self_us), int(cumulative)))
+    return rows
+
+
+def measure(module):
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f"import {module}"],
+        cwd=SRC, env=_environ(), capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+    rows = parse_importtime(proc.stderr)
+    total = next(cum for name, depth, _, cum in rows if name == module and depth == 0)
+    # Direct imports of the target are one level below it in the report
+    direct = {name: cum for name, depth, _, cum in rows if depth == 1}
+    loaded = {name.split('.')[0] for name, *_ in rows}
+    return total, direct, sorted(loaded.intersection(DEFERRED))
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def time_to_healthz(timeout=60.0):
+    port = free_port()
+    env = _environ()
+    env['GAIA_PORT'] = str(port)
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, os.path.join(SRC, 'app.py')],
+        cwd=SRC, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            if server.poll() is not None:
+                raise RuntimeError(f"app exited with status {server.returncode}")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/healthz", timeout=0.5):
+                    return time.perf_counter() - start
+            except OSError:
+                time.sleep(0.02)
+        raise RuntimeError(f"/healthz did not answer within {timeout:.0f}s")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--module', default='app')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10, help="Direct imports to list")
+    parser.add_argument('--serve', action='store_true', help="Also time app start to first /healthz")
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--update-baseline', action='store_true')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="Relative slowdown reported as a regression")
+    args = parser.parse_args()
+
+    runs = [measure(args.module) for _ in range(args.runs)]
+    totals = [total for total, _, _ in runs]
+    _, direct, deferred = runs[-1]
+    result = {'import_ms': round(statistics.median(totals) / 1000, 1)}
+
+    lines = [f"import {args.module}: {result['import_ms']:.1f} ms median of {len(runs)} "
+             f"(min {min(totals) / 1000:.1f}, max {max(totals) / 1000:.1f})"]
+    lines.append("heaviest direct imports:")
+    for name, cum in sorted(direct.items(), key=lambda item: -item[1])[:args.top]:
+        lines.append(f"  {name:<40} {cum / 1000:>8.1f} ms")
+    if args.serve:
+        result['healthz_ms'] = round(time_to_healthz() * 1000, 1)
+        lines.append(f"start to first /healthz: {result['healthz_ms']:.1f} ms")
+
+    regressions = [f"{name} imported at startup" for name in deferred]
+    if args.update_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(result, f, indent=2, sort_keys=True)
+        lines.append(f"Baseline written to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        for metric, now in result.items():
+            before = baseline.get(metric)
+            if not before:
+                continue
+            change = (now - before) / before
+            flag = ''
+            if change > args.threshold:
+                flag = '  REGRESSION'
+                regressions.append(metric)
+            lines.append(f"  {metric:<12} {before:>10.1f} -> {now:>10.1f} ({change:+.1%}){flag}")
+    else:
+        lines.append(f"No baseline at {args.baseline}; rerun with --update-baseline to store one")
+
+    for name in deferred:
+        lines.append(f"REGRESSION: {name} is imported at startup but should be deferred")
+    print('\n'.join(lines))
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
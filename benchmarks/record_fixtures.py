@@ -0,0 +1,66 @@
+"""Record live upstream responses into benchmarks/fixtures.
+
+Run from the repository root:  python -m benchmarks.record_fixtures
+"""
+import argparse
+import os
+from datetime import date
+
+import requests
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
+TODAY = date.today().strftime("%Y%m%d")
+
+# fixture file -> live URL it is recorded from
+SOURCES = {
+    'worldbank_population.json':
+        "https://api.worldbank.org/v2/country/all/indicator/SP.POP.TOTL?format=json&per_page=300&date=2023",
+    'restcountries_population.json':
+        "https://restcountries.com/v3.1/all?fields=cca3,population",
+    'surftruths_stations.json':
+        "https://surftruths.com/api/tide/stations.json",
+    'rss_nyt_health.xml':
+        "http://rss.nytimes.com/services/xml/rss/nyt/Health.xml",
+    'rss_sciencedaily_nutrition.xml':
+        "https://www.sciencedaily.com/rss/health_medicine/nutrition.xml",
+    # A single location; the stub repeats it once per requested location
+    'openmeteo_forecast.bin':
+        "https://api.open-meteo.com/v1/forecast?latitude=51.51&longitude=-0.13"
+        "&current=temperature_2m,relative_humidity_2m,precipitation,weather_code"
+        "&hourly=temperature_2m&timezone=auto&forecast_days=1&format=flatbuffers",
+}
+
+
+def record(name, url):
+    response = requests.get(url, timeout=30)
+    response.raise_for_status()
+    with open(os.path.join(FIXTURES_DIR, name), 'wb') as f:
+        f.write(response.content)
+    print(f"{name}: {len(response.content)} bytes")
+    return response
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--station', help="Station id to record predictions for (default: first listed)")
+    args = parser.parse_args()
+
+    os.makedirs(FIXTURES_DIR, exist_ok=True)
+    for name, url in SOURCES.items():
+        try:
+            response = record(name, url)
+        except Exception as e:
+            print(f"Error recording {name}: {e}")
+            continue
+        if name == 'surftruths_stations.json':
+            station = args.station or response.json()[0]['id']
+            try:
+                record('surftruths_predictions.json',
+                       f"https://surftruths.com/api/tide/stations/{station}/predictions.json"
+                       f"?start={TODAY}&end={TODAY}")
+            except Exception as e:
+                print(f"Error recording surftruths_predictions.json: {e}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,261 @@
+"""Offline benchmark for the fetch chain and globe callbacks.
+
+Every upstream is served by the local stub server, so runs are repeatable
+and need no network. The stub serves recordings from benchmarks/fixtures
+(see record_fixtures.py) and synthetic responses of the same shape for any
+that are missing. The committed baseline.json was taken against the
+synthetic responses only, on a machine without cudf (so the globe targets
+are skipped); timings are machine-specific, so store a local baseline
+before comparing. Run from the repository root:
+
+    python -m benchmarks.run                    # compare with baseline.json
+    python -m benchmarks.run --latency 80 --latency openmeteo=250
+    python -m benchmarks.run --update-baseline  # store this run as baseline
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import traceback
+
+from benchmarks import fixtures
+from benchmarks.stub_server import StubServer, parse_latency
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baseline.json')
+OUTPUT_PATH = os.path.join(ROOT, 'bench_output.txt')
+
+
+def payload_bytes(result):
+    from plotly.io.json import to_json_plotly
+    if isinstance(result, str):
+        return len(result.encode('utf-8'))
+    try:
+        if hasattr(result, 'to_plotly_json'):
+            result = result.to_plotly_json()
+        return len(to_json_plotly(result).encode('utf-8'))
+    except Exception:
+        return None
+
+
+def seed_seismic(count=1000):
+    from events import seismic
+    rng = random.Random(7)
+    seismic.recent_events.clear()
+    for _ in range(count):
+        seismic.recent_events.append({
+            'seq': seismic.next_seq(),
+            'lat': rng.uniform(-60, 70),
+            'lon': rng.uniform(-180, 180),
+            'depth': rng.uniform(0, 300),
+            'mag': rng.uniform(1, 7),
+            'region': 'SYNTHETIC REGION',
+            'time': '2026-10-19T00:00:00Z',
+        })
+
+
+class Suite:
+    """Imports the app modules against the stub and owns cache resets."""
+
+    def __init__(self, workdir):
+        self.workdir = workdir
+        self.snapshot_dir = os.path.join(workdir, 'snapshots')
+        os.environ['GAIA_SNAPSHOT_DIR'] = self.snapshot_dir
+        sys.path[:0] = [ROOT, os.path.join(ROOT, 'src')]
+        # events.tide opens its SQLite cache relative to the cwd
+        os.chdir(workdir)
+
+        from events import http_client, weather, weather_layer, population, tide
+        self.weather, self.weather_layer, self.population, self.tide = weather, weather_layer, population, tide
+        self.http_client = http_client
+        try:
+            from utils.GAIAGX import Globe
+            self.globe, self.globe_error = Globe, None
+        except Exception as e:
+            self.globe, self.globe_error = None, f"{type(e).__name__}: {e}"
+
+    def reset(self):
+        shutil.rmtree(self.snapshot_dir, ignore_errors=True)
+        from events import snapshot
+        snapshot._mapped.clear()
+        self.http_client.clear_cache()
+        self.tide.clear_cache()
+        if self.globe is not None:
+            self.globe._earthquake_delta.cache_clear()
+            self.globe._base_figure.cache_clear()
+
+    def _require_globe(self):
+        if self.globe is None:
+            raise RuntimeError(f"Globe unavailable ({self.globe_error})")
+
+    def targets(self):
+        def update_base_globe():
+            self._require_globe()
+            return self.globe.update_base_globe(None)
+
+        def add_data_layers():
+            self._require_globe()
+            g = self.globe
+            g.update_base_globe(None)
+            quake, _ = g.fetch_earthquake_data('earth-globe')
+            tide, _ = g.fetch_tide_data('earth-globe')
+            weather, _ = g.fetch_weather_data('earth-globe')
+            stores = (g.fetch_news_data('earth-globe'), weather, quake, tide)
+            start = time.perf_counter()
+            result = g.add_data_layers(*stores)
+            return result, time.perf_counter() - start
+
+        def serialize_layer_100k():
+            # Encoding and serialising a large marker layer, as a callback response
+            import numpy as np
+            from plotly.io.json import to_json_plotly
+            from utils.GAIAGX.figures import layer_trace, typed_array
+            rng = np.random.default_rng(3)
+            lat, lon, mag = rng.uniform(-90, 90, 100_000), rng.uniform(-180, 180, 100_000), rng.uniform(1, 8, 100_000)
+            return to_json_plotly(layer_trace(
+                'Earthquakes', typed_array(lon), typed_array(lat),
+                marker={'size': typed_array(np.maximum(4, mag * 2))}
+            ))
+
+        return {
+            'update_base_globe': update_base_globe,
+            'get_major_cities_weather': self.weather.get_major_cities_weather,
+            # 72 x 144 cell centres, 10,368 locations
+            'weather_grid_10k': lambda: self.weather_layer.fetch_locations_weather(
+                self.weather_layer.grid_locations(2.5)
+            ),
+            'fetch_tide_stations': lambda: self.tide.fetch_tide_stations(max_stations=50),
+            'fetch_tide_catalogue': self.tide.fetch_tide_catalogue,
+            'fetch_rss_feeds': self.population.fetch_rss_feeds,
+            'add_data_layers': add_data_layers,
+            'serialize_layer_100k': serialize_layer_100k,
+        }
+
+
+def time_call(fn):
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    # add_data_layers times itself so fetching its inputs is not counted
+    if isinstance(result, tuple) and len(result) == 2 and isinstance(result[1], float):
+        result, elapsed = result
+    return result, elapsed
+
+
+def run_target(suite, stub, name, fn, warm_runs):
+    suite.reset()
+    hits_before = sum(stub.hits.values())
+    try:
+        result, cold = time_call(fn)
+        cold_hits = sum(stub.hits.values()) - hits_before
+        warm = [time_call(fn)[1] for _ in range(warm_runs)]
+    except Exception as e:
+        traceback.print_exc(file=sys.stderr)
+        return {'error': f"{type(e).__name__}: {e}"}
+
+    return {
+        'cold_ms': round(cold * 1000, 3),
+        'warm_ms': round(statistics.median(warm) * 1000, 3) if warm else None,
+        'bytes': payload_bytes(result),
+        'upstream_calls': cold_hits,
+    }
+
+
+def compare(results, baseline, threshold):
+    lines, regressions = [], []
+    for name, result in results.items():
+        base = baseline.get(name, {})
+        for metric in ('cold_ms', 'warm_ms', 'bytes'):
+            now, before = result.get(metric), base.get(metric)
+            if not now or not before:
+                continue
+            change = (now - before) / before
+            flag = ''
+            if change > threshold:
+                flag = '  REGRESSION'
+                regressions.append(f"{name}.{metric}")
+            lines.append(f"  {name:<26} {metric:<8} {before:>12.3f} -> {now:>12.3f} ({change:+.1%}){flag}")
+    return lines, regressions
+
+
+def format_results(results):
+    lines = [f"{'target':<26} {'cold ms':>10} {'warm ms':>10} {'bytes':>10} {'calls':>6}"]
+    for name, r in results.items():
+        if 'error' in r:
+            lines.append(f"{name:<26} skipped: {r['error']}")
+            continue
+        warm = f"{r['warm_ms']:.3f}" if r['warm_ms'] is not None else '-'
+        size = r['bytes'] if r['bytes'] is not None else '-'
+        lines.append(f"{name:<26} {r['cold_ms']:>10.3f} {warm:>10} {size:>10} {r['upstream_calls']:>6}")
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--latency', action='append', metavar='[UPSTREAM=]MS',
+                        help="Injected upstream latency, globally or per upstream; repeatable")
+    parser.add_argument('--jitter', type=float, default=0.0, help="Latency jitter in ms")
+    parser.add_argument('--warm-runs', type=int, default=5)
+    parser.add_argument('--only', action='append', help="Run only these targets")
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--update-baseline', action='store_true')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="Relative slowdown or growth reported as a regression")
+    parser.add_argument('--output', default=OUTPUT_PATH)
+    args = parser.parse_args()
+
+    stub = StubServer(0, parse_latency(args.latency, 0.0), args.jitter / 1000.0).start()
+    os.environ.update(stub.environ())
+    # The stub has no quota, so measure fetch cost rather than the rate budget
+    os.environ.setdefault('GAIA_WEATHER_RATE', '1000000')
+
+    workdir = tempfile.mkdtemp(prefix='gaia-bench-')
+    try:
+        suite = Suite(workdir)
+        seed_seismic()
+        results = {
+            name: run_target(suite, stub, name, fn, args.warm_runs)
+            for name, fn in suite.targets().items()
+            if not args.only or name in args.only
+        }
+    finally:
+        stub.shutdown()
+        os.chdir(ROOT)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    sources = fixtures.sources()
+    synthetic = sorted(name for name, kind in sources.items() if kind == 'synthetic')
+    lines = format_results(results)
+    lines.append(f"\nUpstream responses: {len(sources) - len(synthetic)} recorded, {len(synthetic)} synthetic"
+                 + (" (record them with python -m benchmarks.record_fixtures)" if synthetic else ''))
+    regressions = []
+    if args.update_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump({'fixtures': sources, 'targets': results}, f, indent=2, sort_keys=True)
+            f.write('\n')
+        lines.append(f"\nBaseline written to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        diff, regressions = compare(results, baseline['targets'], args.threshold)
+        lines.append("\nAgainst baseline:")
+        if baseline.get('fixtures') != sources:
+            lines.append("  (baseline was taken against different fixtures; timings may not compare)")
+        lines.extend(diff or ["  no comparable targets"])
+    else:
+        lines.append(f"\nNo baseline at {args.baseline}; rerun with --update-baseline to store one")
+
+    report = '\n'.join(lines)
+    print(report)
+    with open(args.output, 'w') as f:
+        f.write(report + '\n')
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
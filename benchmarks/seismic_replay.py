@@ -0,0 +1,292 @@
+"""Seismic Portal websocket stand-in and ingest throughput harness.
+
+``serve`` replays recorded (one raw message per line) or synthetic
+aftershock-swarm messages at a sustained rate with optional bursts:
+
+    python -m benchmarks.seismic_replay serve --port 8766 --rate 200 --burst 2000 --burst-every 10
+
+``bench`` starts the server in a subprocess, points ``events.seismic`` at
+it and reports sustained messages/sec, ingest-to-snapshot latency and
+memory growth:
+
+    python -m benchmarks.seismic_replay bench --rate 2000 --duration 20
+
+Each message's ``time`` property is rewritten to the instant it is sent,
+so latency is measured from the wire to the published snapshot.
+"""
+import argparse
+import json
+import math
+import os
+import random
+import resource
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+from tornado import gen, web, websocket
+from tornado.ioloop import IOLoop, PeriodicCallback
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WS_PATH = '/standing_order/websocket'
+TICK = 0.01  # seconds between sustained-rate sends
+
+
+def iso_now(now=None):
+    now = time.time() if now is None else now
+    return datetime.fromtimestamp(now, timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+
+
+def parse_iso(value):
+    return datetime.strptime(value, '%Y-%m-%dT%H:%M:%S.%fZ').replace(tzinfo=timezone.utc).timestamp()
+
+
+class SwarmGenerator:
+    """Mainshock-centred events with Gutenberg-Richter magnitudes and revisions."""
+
+    def __init__(self, seed=42, update_ratio=0.3, lat=38.3, lon=142.4, b_value=1.0):
+        self.rng = random.Random(seed)
+        self.update_ratio = update_ratio
+        self.lat, self.lon = lat, lon
+        self.beta = b_value * math.log(10)
+        self.sent = []
+        self.counter = 0
+
+    def _event(self, unid):
+        rng = self.rng
+        mag = min(9.0, 2.0 + rng.expovariate(self.beta))
+        lat = self.lat + rng.gauss(0, 0.4)
+        lon = self.lon + rng.gauss(0, 0.4)
+        depth = abs(rng.gauss(25, 10))
+        return {
+            'type': 'Feature',
+            'id': unid,
+            'geometry': {'type': 'Point', 'coordinates': [lon, lat, -depth]},
+            'properties': {
+                'unid': unid, 'source_id': str(self.counter), 'source_catalog': 'EMSC-RTS',
+                'lat': lat, 'lon': lon, 'depth': depth, 'evtype': 'ke', 'auth': 'REPLAY',
+                'mag': round(mag, 1), 'magtype': 'mb', 'flynn_region': 'NEAR EAST COAST OF HONSHU, JAPAN',
+                'time': None, 'lastupdate': None,
+            },
+        }
+
+    def next(self):
+        self.counter += 1
+        if self.sent and self.rng.random() < self.update_ratio:
+            data = self._event(self.rng.choice(self.sent))
+            return {'action': 'update', 'data': data}
+        unid = f"20261019_{self.counter:07d}"
+        self.sent.append(unid)
+        return {'action': 'create', 'data': self._event(unid)}
+
+
+class RecordedSource:
+    def __init__(self, path):
+        with open(path) as f:
+            self.messages = [json.loads(line) for line in f if line.strip()]
+        self.index = 0
+
+    def next(self):
+        message = self.messages[self.index % len(self.messages)]
+        self.index += 1
+        return json.loads(json.dumps(message))
+
+
+def stamp(message, now=None):
+    now = iso_now(now)
+    props = message['data']['properties']
+    props['time'] = now
+    props['lastupdate'] = now
+    return json.dumps(message)
+
+
+class ReplayHandler(websocket.WebSocketHandler):
+    def initialize(self, options):
+        self.options = options
+
+    def check_origin(self, origin):
+        return True
+
+    def open(self):
+        IOLoop.current().spawn_callback(self.replay)
+
+    async def replay(self):
+        opts = self.options
+        source = RecordedSource(opts.replay) if opts.replay else SwarmGenerator(opts.seed, opts.update_ratio)
+        started = time.monotonic()
+        next_burst = started + opts.burst_every if opts.burst else float('inf')
+        owed, sent = 0.0, 0
+
+        try:
+            while time.monotonic() - started < opts.duration:
+                owed += opts.rate * TICK
+                count = int(owed)
+                owed -= count
+                if time.monotonic() >= next_burst:
+                    count += opts.burst
+                    next_burst += opts.burst_every
+                for _ in range(count):
+                    self.write_message(stamp(source.next()))
+                sent += count
+                await gen.sleep(TICK)
+        except websocket.WebSocketClosedError:
+            return
+        print(f"replay: sent {sent} messages in {time.monotonic() - started:.1f}s", file=sys.stderr)
+        self.close()
+
+
+def serve(opts):
+    app = web.Application([(WS_PATH, ReplayHandler, {'options': opts})])
+    app.listen(opts.port, '127.0.0.1')
+    print(f"replay: listening on ws://127.0.0.1:{opts.port}{WS_PATH}", file=sys.stderr, flush=True)
+    IOLoop.current().start()
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_for_port(port, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.2):
+                return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f"replay server did not start on port {port}")
+
+
+def percentile(values, q):
+    if not values:
+        return float('nan')
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def bench(opts):
+    port = free_port()
+    server_args = [sys.executable, '-m', 'benchmarks.seismic_replay', 'serve', '--port', str(port)]
+    for name in ('rate', 'duration', 'burst', 'burst_every', 'update_ratio', 'seed'):
+        server_args += [f"--{name.replace('_', '-')}", str(getattr(opts, name))]
+    if opts.replay:
+        server_args += ['--replay', opts.replay]
+    server = subprocess.Popen(server_args, cwd=ROOT)
+
+    os.environ.setdefault('GAIA_SNAPSHOT_DIR', tempfile.mkdtemp(prefix='gaia-seismic-'))
+    sys.path.insert(0, ROOT)
+    from events import seismic, snapshot
+    seismic.echo_uri = f"ws://127.0.0.1:{port}{WS_PATH}"
+
+    latencies, samples = [], []
+    state = {'head': 0, 'publish_ms': []}
+
+    def publish_and_measure():
+        started = time.perf_counter()
+        seismic.publish_events()
+        published = time.time()
+        state['publish_ms'].append((time.perf_counter() - started) * 1000)
+
+        snap = snapshot.read_snapshot('seismic')
+        if snap is None or not len(snap):
+            return
+        # Revised events keep their slot but take a new seq, so scan them all
+        seqs = snap['seq']
+        times = snap['time']
+        for i in np.flatnonzero(seqs > state['head']):
+            try:
+                latencies.append(published - parse_iso(times[i]))
+            except ValueError:
+                pass
+        state['head'] = int(seqs.max())
+
+    def sample():
+        current, peak = tracemalloc.get_traced_memory()
+        samples.append((time.monotonic(), seismic.ingest_counts['ingested'], current, peak))
+
+    tracemalloc.start()
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    wait_for_port(port)
+
+    loop = IOLoop.current()
+    publisher = PeriodicCallback(publish_and_measure, opts.publish_ms)
+    sampler = PeriodicCallback(sample, 250)
+
+    async def run():
+        publisher.start()
+        sampler.start()
+        sample()
+        try:
+            await seismic.launch_client()
+        finally:
+            publisher.stop()
+            sampler.stop()
+            publish_and_measure()
+            sample()
+
+    try:
+        loop.run_sync(run, timeout=opts.duration + 60)
+    finally:
+        server.terminate()
+        server.wait()
+
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    active = [s for s in samples if s[1] > 0]
+    if len(active) >= 2:
+        (t0, n0, *_), (t1, n1, *_) = active[0], active[-1]
+        rates = [
+            (b[1] - a[1]) / (b[0] - a[0]) for a, b in zip(samples, samples[1:]) if b[0] > a[0]
+        ]
+        sustained = (n1 - n0) / (t1 - t0) if t1 > t0 else float('nan')
+        peak_rate = max(rates) if rates else float('nan')
+    else:
+        sustained = peak_rate = float('nan')
+
+    report = [
+        f"messages ingested      {seismic.ingest_counts['ingested']}",
+        f"revisions upserted     {seismic.ingest_counts.get('revised', 0)}",
+        f"parse errors           {seismic.ingest_counts['error']}",
+        f"buffer fill            {len(seismic.recent_events)}/{seismic.MAX_EVENTS}",
+        f"sustained msgs/sec     {sustained:.0f}",
+        f"peak msgs/sec (250ms)  {peak_rate:.0f}",
+        f"ingest->snapshot p50   {percentile(latencies, 0.50) * 1000:.1f} ms",
+        f"ingest->snapshot p95   {percentile(latencies, 0.95) * 1000:.1f} ms",
+        f"ingest->snapshot p99   {percentile(latencies, 0.99) * 1000:.1f} ms",
+        f"publish cost (median)  {statistics.median(state['publish_ms']) if state['publish_ms'] else float('nan'):.2f} ms",
+        f"traced memory growth   {(samples[-1][2] - samples[0][2]) / 1024:.0f} KiB (peak {samples[-1][3] / 1024:.0f} KiB)",
+        f"max RSS growth         {(rss_after - rss_before)} KiB",
+    ]
+    print('\n'.join(report))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('mode', choices=('serve', 'bench'))
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--rate', type=float, default=200.0, help="Sustained messages per second")
+    parser.add_argument('--duration', type=float, default=15.0, help="Seconds to replay for")
+    parser.add_argument('--burst', type=int, default=0, help="Extra messages sent back-to-back per burst")
+    parser.add_argument('--burst-every', type=float, default=5.0, help="Seconds between bursts")
+    parser.add_argument('--update-ratio', type=float, default=0.3,
+                        help="Share of synthetic messages that revise an earlier event")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--replay', help="File of recorded raw messages, one per line")
+    parser.add_argument('--publish-ms', type=int, default=2000, help="Snapshot publish interval (bench)")
+    opts = parser.parse_args()
+
+    if opts.mode == 'serve':
+        serve(opts)
+    else:
+        bench(opts)
+
+
+if __name__ == '__main__':
+    main()
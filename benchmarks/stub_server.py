@@ -0,0 +1,131 @@
+"""Local stand-in for every upstream the fetchers call.
+
+Routes are prefixed by upstream so one server covers all of them, e.g.
+``GAIA_WORLDBANK_URL=http://127.0.0.1:8765/worldbank``. Run standalone with
+``python -m benchmarks.stub_server --port 8765 --latency 80``.
+"""
+import argparse
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from benchmarks import fixtures
+
+PREDICTIONS_PATH = re.compile(r'^/surftruths/api/tide/stations/[^/]+/predictions\.json$')
+
+
+def _floats(query, name):
+    return [float(v) for v in query.get(name, ['0'])[0].split(',')]
+
+
+def route(path, query):
+    """Return (upstream, content type, body) for a request, or None for 404."""
+    if path == '/worldbank/v2/country/all/indicator/SP.POP.TOTL':
+        return 'worldbank', 'application/json', fixtures.recorded('worldbank_population.json') or fixtures.worldbank_population()
+    if path == '/restcountries/v3.1/all':
+        return 'restcountries', 'application/json', fixtures.recorded('restcountries_population.json') or fixtures.restcountries_population()
+    if path == '/surftruths/api/tide/stations.json':
+        return 'surftruths', 'application/json', fixtures.recorded('surftruths_stations.json') or fixtures.surftruths_stations()
+    if PREDICTIONS_PATH.match(path):
+        day = query.get('start', [time.strftime('%Y%m%d')])[0]
+        return 'surftruths', 'application/json', fixtures.recorded('surftruths_predictions.json') or fixtures.surftruths_predictions(day)
+    if path.startswith('/rss/'):
+        name = path[len('/rss/'):].rsplit('.', 1)[0]
+        return 'rss', 'application/rss+xml', fixtures.recorded(f"rss_{name}.xml") or fixtures.rss_feed(name)
+    if path == '/openmeteo/v1/forecast':
+        body = fixtures.openmeteo_forecast(_floats(query, 'latitude'), _floats(query, 'longitude'))
+        return 'openmeteo', 'application/octet-stream', body
+    return None
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        match = route(url.path, query)
+        server = self.server
+
+        upstream = match[0] if match else 'unknown'
+        delay = server.latency.get(upstream, server.latency.get('*', 0.0))
+        if delay:
+            time.sleep(max(0.0, delay + random.uniform(-server.jitter, server.jitter)))
+
+        with server.lock:
+            server.hits[upstream] = server.hits.get(upstream, 0) + 1
+
+        if match is None:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        _, content_type, body = match
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port=0, latency=None, jitter=0.0):
+        super().__init__(('127.0.0.1', port), StubHandler)
+        self.latency = latency or {}
+        self.jitter = jitter
+        self.hits = {}
+        self.lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def environ(self):
+        """Environment variables pointing the fetchers at this server."""
+        return {
+            'GAIA_WORLDBANK_URL': f"{self.base_url}/worldbank",
+            'GAIA_RESTCOUNTRIES_URL': f"{self.base_url}/restcountries",
+            'GAIA_SURFTRUTHS_URL': f"{self.base_url}/surftruths",
+            'GAIA_OPENMETEO_URL': f"{self.base_url}/openmeteo",
+            'GAIA_RSS_FEEDS': f"{self.base_url}/rss/nyt_health.xml,{self.base_url}/rss/sciencedaily_nutrition.xml",
+        }
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+def parse_latency(values, default_ms):
+    """``['80', 'openmeteo=250']`` -> {'*': 0.08, 'openmeteo': 0.25}"""
+    latency = {'*': default_ms / 1000.0}
+    for value in values or []:
+        upstream, _, ms = value.rpartition('=')
+        latency[upstream or '*'] = float(ms) / 1000.0
+    return latency
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', action='append', metavar='[UPSTREAM=]MS',
+                        help="Injected latency, globally or per upstream; repeatable")
+    parser.add_argument('--jitter', type=float, default=0.0, help="Latency jitter in ms")
+    args = parser.parse_args()
+
+    server = StubServer(args.port, parse_latency(args.latency, 0.0), args.jitter / 1000.0)
+    for name, value in server.environ().items():
+        print(f"export {name}={value}")
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,173 @@
+# events/http_client.py
+import asyncio
+import importlib.util
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+from events.metrics import count_cache, register_collector, upstream_call
+from events.resilience import guarded, request_timeout
+
+# Requests in flight per upstream host; the rest queue on the shared loop
+HOST_CONCURRENCY = int(os.environ.get('GAIA_HTTP_PER_HOST', 8))
+# Idle keep-alive connections kept across all hosts, and their lifetime
+MAX_KEEPALIVE = int(os.environ.get('GAIA_HTTP_KEEPALIVE', 32))
+KEEPALIVE_EXPIRY = 60.0
+# HTTP/2 needs the optional h2 package; without it connections stay HTTP/1.1
+HTTP2 = os.environ.get('GAIA_HTTP2', '1') != '0' and importlib.util.find_spec('h2') is not None
+# GET responses kept in memory for callers that pass cache_ttl
+RESPONSE_CACHE_SIZE = 2048
+# Seconds before the first retry; doubled for each one after
+RETRY_BACKOFF = 0.2
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_thread: Optional[threading.Thread] = None
+_loop_lock = threading.Lock()
+_host_limits: Dict[str, asyncio.Semaphore] = {}
+_in_flight: Dict[str, int] = {}
+_responses: 'OrderedDict[tuple, tuple]' = OrderedDict()
+
+
+def start() -> asyncio.AbstractEventLoop:
+    """The loop every request runs on, started in a daemon thread on first use."""
+    global _loop, _loop_thread
+    with _loop_lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            _loop_thread = threading.Thread(target=loop.run_forever, name='gaia-http', daemon=True)
+            _loop_thread.start()
+            _loop = loop
+    return _loop
+
+
+@lru_cache(maxsize=None)
+def _client():
+    # Only ever called on the loop thread; httpx is imported here so app
+    # startup does not pay for it
+    import httpx
+
+    return httpx.AsyncClient(
+        http2=HTTP2,
+        limits=httpx.Limits(
+            max_connections=None,
+            max_keepalive_connections=MAX_KEEPALIVE,
+            keepalive_expiry=KEEPALIVE_EXPIRY
+        ),
+        follow_redirects=True
+    )
+
+
+@asynccontextmanager
+async def _host_slot(host: str):
+    limit = _host_limits.get(host)
+    if limit is None:
+        limit = _host_limits[host] = asyncio.Semaphore(HOST_CONCURRENCY)
+    async with limit:
+        _in_flight[host] = _in_flight.get(host, 0) + 1
+        try:
+            yield
+        finally:
+            _in_flight[host] -= 1
+
+
+def _cache_key(url, params, headers):
+    def frozen(d):
+        return tuple(sorted((k, str(v)) for k, v in (d or {}).items()))
+    return url, frozen(params), frozen(headers)
+
+
+async def fetch(url: str, *, upstream: Optional[str] = None, route: Optional[str] = None,
+                params: Optional[Dict] = None, headers: Optional[Dict] = None,
+                timeout: float = 10.0, retries: int = 0, cache_ttl: Optional[float] = None):
+    """GET ``url`` on the shared client and return the httpx response.
+
+    The call goes through ``upstream``'s circuit breaker (default: the host)
+    and takes its timeout from the caller's deadline. Connection errors and
+    5xx responses are retried ``retries`` times; a 5xx that survives them is
+    raised. With ``cache_ttl``, successful responses are reused for that
+    many seconds.
+    """
+    import httpx
+
+    parsed = urlparse(url)
+    upstream = upstream or parsed.netloc
+    key = _cache_key(url, params, headers) if cache_ttl else None
+    if key is not None:
+        cached = _responses.get(key)
+        count_cache('http.responses', cached is not None and cached[0] > time.monotonic())
+        if cached is not None and cached[0] > time.monotonic():
+            _responses.move_to_end(key)
+            return cached[1]
+
+    async with _host_slot(parsed.netloc):
+        with guarded(upstream), upstream_call(upstream, route or parsed.path):
+            for attempt in range(retries + 1):
+                try:
+                    response = await _client().get(
+                        url, params=params, headers=headers, timeout=request_timeout(timeout)
+                    )
+                    if response.status_code < 500 or attempt == retries:
+                        break
+                except httpx.TransportError as e:
+                    if isinstance(e, httpx.TimeoutException):
+                        # Raises DeadlineExceeded if it was our deadline, not the host, that ran out
+                        request_timeout(timeout)
+                    if attempt == retries:
+                        raise
+                await asyncio.sleep(min(RETRY_BACKOFF * 2 ** attempt, max(0.0, request_timeout(timeout))))
+            if response.status_code >= 500:
+                response.raise_for_status()
+
+    if key is not None and response.is_success:
+        _responses[key] = (time.monotonic() + cache_ttl, response)
+        while len(_responses) > RESPONSE_CACHE_SIZE:
+            _responses.popitem(last=False)
+    return response
+
+
+def run(coro):
+    """Run ``coro`` on the shared loop and block until it finishes.
+
+    For Dash callbacks and other threads; the caller's context (and with it
+    the callback deadline) carries over to the coroutine.
+    """
+    loop = start()
+    if threading.current_thread() is _loop_thread:
+        raise RuntimeError("http.run() called from the event loop; await the coroutine instead")
+    return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+
+def get(url: str, **kwargs):
+    """Blocking ``fetch``."""
+    return run(fetch(url, **kwargs))
+
+
+def gather(*coros):
+    """Run ``coros`` concurrently; results (or raised exceptions) in order."""
+    async def run_all():
+        return await asyncio.gather(*coros, return_exceptions=True)
+    return run(run_all())
+
+
+def clear_cache():
+    _responses.clear()
+
+
+@register_collector
+def http_metrics():
+    lines = [
+        "# HELP gaia_http_in_flight Upstream requests in flight on the shared client, by host.",
+        "# TYPE gaia_http_in_flight gauge",
+    ]
+    lines += [f'gaia_http_in_flight{{host="{host}"}} {n}' for host, n in list(_in_flight.items())]
+    lines += [
+        "# HELP gaia_http_cached_responses GET responses held in the shared client's cache.",
+        "# TYPE gaia_http_cached_responses gauge",
+        f"gaia_http_cached_responses {len(_responses)}",
+    ]
+    return lines
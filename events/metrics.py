@@ -0,0 +1,222 @@
+# events/metrics.py
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+from events.profiling import record_upstream
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+BYTES_BUCKETS = (1e3, 1e4, 5e4, 1e5, 2.5e5, 5e5, 1e6, 2.5e6, 5e6, 1e7)
+
+_registry: List['_Metric'] = []
+_collectors: List[Callable[[], List[str]]] = []
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = '') -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+    kind = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def labels(self, *values, **kwargs):
+        if kwargs:
+            values = tuple(kwargs[n] for n in self.labelnames)
+        values = tuple(str(v) for v in values)
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+
+
+class _Value:
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+    def set(self, value: float):
+        self.value = float(value)
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+    def _samples(self):
+        return [
+            f"{self.name}_total{_format_labels(self.labelnames, k)} {_format_value(c.value)}"
+            for k, c in list(self._children.items())
+        ]
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=(), fn: Optional[Callable[[], float]] = None):
+        super().__init__(name, documentation, labelnames)
+        self._fn = fn
+
+    def _new_child(self):
+        return _Value()
+
+    def set(self, value: float):
+        self.labels().set(value)
+
+    def _samples(self):
+        if self._fn is not None:
+            try:
+                return [f"{self.name} {_format_value(self._fn())}"]
+            except Exception:
+                return []
+        return [
+            f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(c.value)}"
+            for k, c in list(self._children.items())
+        ]
+
+
+class _HistogramChild:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def _samples(self):
+        lines = []
+        for key, child in list(self._children.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), child.counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(child.sum)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+def register_collector(fn: Callable[[], List[str]]):
+    """Add a function returning ready-made exposition lines at scrape time."""
+    _collectors.append(fn)
+    return fn
+
+
+def render() -> str:
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    for collector in _collectors:
+        try:
+            lines.extend(collector())
+        except Exception as e:
+            print(f"Error collecting metrics from {collector.__name__}: {e}")
+    return '\n'.join(lines) + '\n'
+
+
+UPSTREAM_SECONDS = Histogram(
+    'gaia_upstream_request_seconds', 'Latency of upstream HTTP calls.', ('upstream', 'endpoint'))
+UPSTREAM_ERRORS = Counter(
+    'gaia_upstream_errors', 'Upstream HTTP calls that raised or returned unusable data.', ('upstream', 'endpoint'))
+ERRORS = Counter(
+    'gaia_errors', 'Errors swallowed by fetchers and callbacks so the globe keeps rendering.', ('source',))
+CACHE_REQUESTS = Counter(
+    'gaia_cache_requests', 'Cache lookups by cache and result.', ('cache', 'result'))
+CALLBACK_SECONDS = Histogram(
+    'gaia_callback_seconds', 'Dash callback request duration.', ('callback',))
+CALLBACK_PAYLOAD_BYTES = Histogram(
+    'gaia_callback_payload_bytes', 'Dash callback response size.', ('callback',), buckets=BYTES_BUCKETS)
+
+
+@contextmanager
+def upstream_call(upstream: str, endpoint: str):
+    """Time one upstream call, counting it as an error if it raises."""
+    start = time.perf_counter()
+    failed = False
+    try:
+        yield
+    except Exception:
+        failed = True
+        UPSTREAM_ERRORS.labels(upstream, endpoint).inc()
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        UPSTREAM_SECONDS.labels(upstream, endpoint).observe(elapsed)
+        record_upstream(upstream, endpoint, elapsed, failed)
+
+
+def count_cache(cache: str, hit: bool):
+    CACHE_REQUESTS.labels(cache, 'hit' if hit else 'miss').inc()
+
+
+def count_error(source: str, error=None):
+    ERRORS.labels(source).inc()
+    if error is not None:
+        print(f"Error in {source}: {error}")
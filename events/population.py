@@ -1,16 +1,28 @@
-import feedparser
+import asyncio
+import os
 from datetime import datetime
 import random
-import requests
 from typing import Dict, List, Optional
-from events import fetch_weather_data, get_weather_description, get_weather_icon
+from events import http_client
+from events.weather import fetch_weather_async, get_weather_description, get_weather_icon
+from events.metrics import count_error
+from events.resilience import Unavailable, mark_partial
+
+# Upstream roots are overridable so benchmarks can point them at a local stub
+WORLDBANK_URL = os.environ.get('GAIA_WORLDBANK_URL', 'https://api.worldbank.org')
+RESTCOUNTRIES_URL = os.environ.get('GAIA_RESTCOUNTRIES_URL', 'https://restcountries.com')
+RSS_FEEDS = os.environ.get(
+    'GAIA_RSS_FEEDS',
+    'http://rss.nytimes.com/services/xml/rss/nyt/Health.xml,'
+    'https://www.sciencedaily.com/rss/health_medicine/nutrition.xml'
+).split(',')
 
 
 def fetch_live_population_data() -> Dict[str, float]:
     try:
-        url = "https://api.worldbank.org/v2/country/all/indicator/SP.POP.TOTL?format=json&per_page=300&date=2023"
+        url = f"{WORLDBANK_URL}/v2/country/all/indicator/SP.POP.TOTL?format=json&per_page=300&date=2023"
         
-        response = requests.get(url, timeout=10)
+        response = http_client.get(url, upstream='worldbank', route='/v2/country/all/indicator/SP.POP.TOTL')
         data = response.json()
 
         population_data = {}
@@ -28,13 +40,13 @@ def fetch_live_population_data() -> Dict[str, float]:
         return population_data
         
     except Exception as e:
-        print(f"Error fetching World Bank population data: {e}")
+        count_error('population.worldbank', e)
         return fetch_backup_population_data()
 
 def fetch_backup_population_data() -> Dict[str, float]:
     try:
-        url = "https://restcountries.com/v3.1/all?fields=cca3,population"
-        response = requests.get(url, timeout=10)
+        url = f"{RESTCOUNTRIES_URL}/v3.1/all?fields=cca3,population"
+        response = http_client.get(url, upstream='restcountries', route='/v3.1/all')
         countries = response.json()
         
         population_data = {}
@@ -48,11 +60,12 @@ def fetch_backup_population_data() -> Dict[str, float]:
         return population_data
         
     except Exception as e:
-        print(f"Error fetching backup population data: {e}")
+        count_error('population.restcountries', e)
         return get_minimal_fallback_data()
 
 def get_minimal_fallback_data() -> Dict[str, float]:
     """Minimal fallback data for critical countries"""
+    mark_partial('population.fallback')
     return {
         'USA': 335, 'CHN': 1425, 'IND': 1428, 'IDN': 277, 'PAK': 231,
         'BRA': 216, 'NGA': 218, 'BGD': 171, 'RUS': 144, 'MEX': 128,
@@ -87,41 +100,55 @@ def get_global_coordinates():
     
     return lat, lon
 
-def fetch_rss_feeds():
-    feeds = [
-        'http://rss.nytimes.com/services/xml/rss/nyt/Health.xml',
-        'https://www.sciencedaily.com/rss/health_medicine/nutrition.xml',
-    ]
-    
+async def _fetch_feed(feed_url: str) -> List[Dict]:
+    import feedparser
+
+    try:
+        response = await http_client.fetch(feed_url)
+        response.raise_for_status()
+    except Unavailable as e:
+        mark_partial(f"news.rss {feed_url}: {e}")
+        return []
+    except Exception as e:
+        count_error('news.rss', f"{feed_url}: {e}")
+        return []
+
+    # Parsing is CPU-bound; keep it off the shared event loop
+    feed = await asyncio.to_thread(feedparser.parse, response.content)
+    entries = feed.entries[:5]
+    coordinates = [get_global_coordinates() for _ in entries]
+    forecasts = await asyncio.gather(*(fetch_weather_async(lat, lon) for lat, lon in coordinates))
+
     feed_data = []
-    for feed_url in feeds:
-        try:
-            feed = feedparser.parse(feed_url)
-            for entry in feed.entries[:5]:  
-                lat, lon = get_global_coordinates()
+    for entry, (lat, lon), weather_data in zip(entries, coordinates, forecasts):
+        feed_entry = {
+            'title': entry.get('title', 'No title'),
+            'link': entry.get('link', '#'),
+            'published': entry.get('published', 'Unknown date'),
+            'summary': entry.get('summary', 'No summary')[:200] + '...',
+            'lat': lat,
+            'lon': lon
+        }
 
-                weather_data = fetch_weather_data(lat, lon)
-                
-                feed_entry = {
-                    'title': entry.get('title', 'No title'),
-                    'link': entry.get('link', '#'),
-                    'published': entry.get('published', 'Unknown date'),
-                    'summary': entry.get('summary', 'No summary')[:200] + '...',
-                    'lat': lat,
-                    'lon': lon
-                }
+        if weather_data:
+            feed_entry.update({
+                'temperature': f"{weather_data['temperature']:.1f}°C",
+                'humidity': f"{weather_data['humidity']:.0f}%",
+                'precipitation': f"{weather_data['precipitation']:.1f}mm",
+                'weather_icon': get_weather_icon(weather_data['weather_code']),
+                'weather_description': get_weather_description(weather_data['weather_code'])
+            })
+        
+        feed_data.append(feed_entry)
+    return feed_data
 
-                if weather_data:
-                    feed_entry.update({
-                        'temperature': f"{weather_data['temperature']:.1f}°C",
-                        'humidity': f"{weather_data['humidity']:.0f}%",
-                        'precipitation': f"{weather_data['precipitation']:.1f}mm",
-                        'weather_icon': get_weather_icon(weather_data['weather_code']),
-                        'weather_description': get_weather_description(weather_data['weather_code'])
-                    })
-                
-                feed_data.append(feed_entry)
-        except Exception as e:
-            print(f"Error fetching feed {feed_url}: {e}")
-    
-    return feed_data
\ No newline at end of file
+def fetch_rss_feeds():
+    # Every feed, and the forecast for every entry, is fetched concurrently
+    feeds = http_client.gather(*(_fetch_feed(feed_url) for feed_url in RSS_FEEDS))
+    feed_data = []
+    for feed_url, entries in zip(RSS_FEEDS, feeds):
+        if isinstance(entries, Exception):
+            count_error('news.rss', f"{feed_url}: {entries}")
+            continue
+        feed_data.extend(entries)
+    return feed_data
@@ -0,0 +1,299 @@
+# events/profiling.py
+import contextvars
+import functools
+import itertools
+import os
+import random
+import sys
+import sysconfig
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STDLIB = sysconfig.get_paths()['stdlib']
+
+# Fraction of callback requests and fetcher runs to profile; 0 leaves the
+# profiler off until it is switched on through /admin/profiling
+PROFILE_RATE = float(os.environ.get('GAIA_PROFILE_RATE', 0))
+# Milliseconds between stack samples of a profiled thread
+PROFILE_INTERVAL_MS = float(os.environ.get('GAIA_PROFILE_INTERVAL_MS', 5))
+# Finished profiles kept in memory, oldest dropped first
+PROFILE_KEEP = int(os.environ.get('GAIA_PROFILE_KEEP', 50))
+# Only names containing this are profiled, e.g. "earth-globe.figure"
+PROFILE_MATCH = os.environ.get('GAIA_PROFILE_MATCH', '')
+MAX_DEPTH = 256
+
+settings = {'rate': PROFILE_RATE, 'interval_ms': PROFILE_INTERVAL_MS, 'keep': PROFILE_KEEP, 'match': PROFILE_MATCH}
+
+_current: contextvars.ContextVar[Optional['Profile']] = contextvars.ContextVar('gaia_profile', default=None)
+_profiles: deque = deque(maxlen=PROFILE_KEEP)
+_ids = itertools.count(1)
+
+
+@functools.lru_cache(maxsize=4096)
+def _location(filename: str) -> str:
+    path = os.path.abspath(filename)
+    if path.startswith(ROOT + os.sep):
+        return os.path.relpath(path, ROOT)
+    # Library frames: keep the part after site-packages or the stdlib directory
+    _, found, rest = path.rpartition('site-packages' + os.sep)
+    if found:
+        return rest
+    if path.startswith(STDLIB + os.sep):
+        return os.path.relpath(path, STDLIB)
+    return filename
+
+
+class Profile:
+    """Stack samples of one thread while a callback or fetcher runs.
+
+    Samples are stored in order, root frame first, each weighted by the wall
+    time since the previous one; frames are interned per code object.
+    """
+
+    def __init__(self, name: str, thread_id: int, tags: Dict):
+        self.id = next(_ids)
+        self.name = name
+        self.thread_id = thread_id
+        self.tags = dict(tags)
+        self.upstream: List[Dict] = []
+        self.started = time.time()
+        self.duration: Optional[float] = None
+        self.frames: List[Dict] = []
+        self.samples: List[tuple] = []
+        self.weights: List[float] = []
+        self._codes: Dict[object, int] = {}
+        self._t0 = self._last = time.perf_counter()
+        self._token = None
+
+    def sample(self, frame, now: float):
+        stack = []
+        while frame is not None and len(stack) < MAX_DEPTH:
+            code = frame.f_code
+            index = self._codes.get(code)
+            if index is None:
+                index = self._codes[code] = len(self.frames)
+                self.frames.append({
+                    'name': getattr(code, 'co_qualname', code.co_name),
+                    'file': _location(code.co_filename),
+                    'line': code.co_firstlineno,
+                })
+            stack.append(index)
+            frame = frame.f_back
+        stack.reverse()
+        self.samples.append(tuple(stack))
+        self.weights.append(now - self._last)
+        self._last = now
+
+    def label(self) -> str:
+        return f"{self.name} #{self.id}"
+
+    def summary(self) -> Dict:
+        return {
+            'id': self.id,
+            'name': self.name,
+            'started': self.started,
+            'duration': self.duration,
+            'samples': len(self.samples),
+            'tags': self.tags,
+            'upstream': self.upstream,
+        }
+
+
+class _Sampler:
+    """One daemon thread that samples every active profile's thread."""
+
+    def __init__(self):
+        self.active: Dict[int, Profile] = {}
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.thread = None
+
+    def add(self, profile: Profile):
+        with self.lock:
+            self.active[profile.id] = profile
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name='gaia-profiler', daemon=True)
+                self.thread.start()
+        self.wake.set()
+
+    def remove(self, profile: Profile):
+        with self.lock:
+            self.active.pop(profile.id, None)
+
+    def run(self):
+        while True:
+            if not self.active:
+                self.wake.wait(1.0)
+                self.wake.clear()
+                continue
+            time.sleep(settings['interval_ms'] / 1000)
+            frames = sys._current_frames()
+            now = time.perf_counter()
+            with self.lock:
+                for profile in self.active.values():
+                    frame = frames.get(profile.thread_id)
+                    if frame is not None:
+                        profile.sample(frame, now)
+            del frames
+
+
+_sampler = _Sampler()
+
+
+def configure(rate=None, interval_ms=None, keep=None, match=None) -> Dict:
+    """Change the profiling settings of this process; returns them."""
+    global _profiles
+    if rate is not None:
+        rate = float(rate)
+        if not 0 <= rate <= 1:
+            raise ValueError("rate must be between 0 and 1")
+        settings['rate'] = rate
+    if interval_ms is not None:
+        interval_ms = float(interval_ms)
+        if interval_ms < 1:
+            raise ValueError("interval_ms must be at least 1")
+        settings['interval_ms'] = interval_ms
+    if keep is not None:
+        keep = int(keep)
+        if keep < 1:
+            raise ValueError("keep must be positive")
+        settings['keep'] = keep
+        _profiles = deque(_profiles, maxlen=keep)
+    if match is not None:
+        settings['match'] = str(match)
+    return dict(settings)
+
+
+def begin(name: str, **tags) -> Optional[Profile]:
+    """Start profiling the current thread if ``name`` is sampled.
+
+    Returns None when it is not, or when this context is already being
+    profiled (a fetcher inside a profiled callback shows up in its stacks).
+    """
+    rate = settings['rate']
+    if rate <= 0 or _current.get() is not None or settings['match'] not in name:
+        return None
+    if rate < 1 and random.random() >= rate:
+        return None
+    profile = Profile(name, threading.get_ident(), tags)
+    profile._token = _current.set(profile)
+    _sampler.add(profile)
+    return profile
+
+
+def end(profile: Optional[Profile], **tags):
+    """Stop ``profile`` and keep it among the recent profiles."""
+    if profile is None or profile.duration is not None:
+        return
+    _sampler.remove(profile)
+    profile.duration = time.perf_counter() - profile._t0
+    profile.tags.update(tags)
+    try:
+        _current.reset(profile._token)
+    except ValueError:
+        # Ended from another context (e.g. a request teardown hook)
+        pass
+    _profiles.append(profile)
+
+
+@contextmanager
+def profiling(name: str, **tags):
+    profile = begin(name, **tags)
+    try:
+        yield profile
+    finally:
+        end(profile)
+
+
+def profiled(name: str):
+    """Profile the decorated fetcher when ``name`` is sampled."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with profiling(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def record_upstream(upstream: str, endpoint: str, seconds: float, error: bool):
+    """Tag the profile of the current context, if any, with one upstream call."""
+    profile = _current.get()
+    if profile is not None:
+        profile.upstream.append({
+            'upstream': upstream,
+            'endpoint': endpoint,
+            'seconds': round(seconds, 6),
+            'error': error,
+        })
+
+
+def recent(ids=None, match: str = '') -> List[Profile]:
+    """Finished profiles, oldest first, optionally by id or name substring."""
+    wanted = None if ids is None else set(ids)
+    return [p for p in list(_profiles) if (wanted is None or p.id in wanted) and match in p.name]
+
+
+def clear():
+    _profiles.clear()
+
+
+def active() -> int:
+    """Profiles currently being sampled."""
+    return len(_sampler.active)
+
+
+def collapsed(profiles: List[Profile]) -> str:
+    """Folded stacks, one "root;...;leaf count" line each, rooted at the profile label."""
+    lines = []
+    for profile in profiles:
+        names = [f"{f['name']} ({f['file']}:{f['line']})".replace(';', ',') for f in profile.frames]
+        counts = Counter(profile.samples)
+        root = profile.label().replace(';', ',')
+        lines += [';'.join([root] + [names[i] for i in stack]) + f" {n}" for stack, n in counts.items()]
+    return '\n'.join(lines) + '\n'
+
+
+def _upstream_summary(profile: Profile) -> str:
+    totals: Dict[str, float] = {}
+    for call in profile.upstream:
+        totals[call['upstream']] = totals.get(call['upstream'], 0.0) + call['seconds']
+    return ', '.join(f"{host} {seconds:.3f}s" for host, seconds in totals.items())
+
+
+def speedscope(profiles: List[Profile]) -> Dict:
+    """A speedscope file (https://www.speedscope.app) with one sampled profile each."""
+    frames, shared = [], {}
+    exported = []
+    for profile in profiles:
+        remap = []
+        for frame in profile.frames:
+            key = (frame['name'], frame['file'], frame['line'])
+            if key not in shared:
+                shared[key] = len(frames)
+                frames.append(dict(frame))
+            remap.append(shared[key])
+
+        tags = ', '.join(f"{k}={v}" for k, v in profile.tags.items())
+        upstream = _upstream_summary(profile)
+        name = profile.label() + (f" [{tags}]" if tags else '') + (f" upstream: {upstream}" if upstream else '')
+        exported.append({
+            'type': 'sampled',
+            'name': name,
+            'unit': 'seconds',
+            'startValue': 0,
+            'endValue': profile.duration or sum(profile.weights),
+            'samples': [[remap[i] for i in stack] for stack in profile.samples],
+            'weights': profile.weights,
+        })
+    return {
+        '$schema': 'https://www.speedscope.app/file-format-schema.json',
+        'shared': {'frames': frames},
+        'profiles': exported,
+        'name': 'GAIA-GX profiles',
+        'exporter': 'gaia-gx',
+    }
@@ -0,0 +1,215 @@
+# events/resilience.py
+import contextvars
+import functools
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from events.metrics import register_collector
+
+# Consecutive failures that open a host's breaker, and seconds before one
+# trial request is let through again
+FAILURE_THRESHOLD = int(os.environ.get('GAIA_BREAKER_FAILURES', 5))
+RESET_TIMEOUT = float(os.environ.get('GAIA_BREAKER_RESET', 30))
+
+
+class Unavailable(Exception):
+    """An upstream call was skipped rather than attempted."""
+
+
+class DeadlineExceeded(Unavailable):
+    pass
+
+
+class CircuitOpen(Unavailable):
+    pass
+
+
+class Budget:
+    """Time left for the current callback, and whether its result is partial."""
+
+    def __init__(self, expires: float):
+        self.expires = expires
+        self.partial = False
+        self.reasons: List[str] = []
+
+    def remaining(self) -> float:
+        return self.expires - time.monotonic()
+
+
+_budget: contextvars.ContextVar[Optional[Budget]] = contextvars.ContextVar('gaia_budget', default=None)
+
+
+@contextmanager
+def deadline(seconds: float = math.inf):
+    """Bound every guarded call inside the block; nested scopes never extend it.
+
+    A scope with no limit still collects mark_partial() calls, which are also
+    passed up to the enclosing scope.
+    """
+    parent = _budget.get()
+    expires = time.monotonic() + seconds
+    if parent is not None:
+        expires = min(expires, parent.expires)
+    budget = Budget(expires)
+    token = _budget.set(budget)
+    try:
+        yield budget
+    finally:
+        _budget.reset(token)
+        if parent is not None and budget.partial:
+            parent.partial = True
+            parent.reasons.extend(budget.reasons)
+
+
+def with_deadline(seconds: float):
+    """Run the decorated callback under ``deadline(seconds)``."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with deadline(seconds):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def mark_partial(reason: str):
+    budget = _budget.get()
+    if budget is not None:
+        budget.partial = True
+        budget.reasons.append(reason)
+
+
+def request_timeout(default: float) -> float:
+    """Per-request timeout: ``default``, cut to what is left of the deadline."""
+    budget = _budget.get()
+    if budget is None:
+        return default
+    remaining = budget.remaining()
+    if remaining <= 0:
+        raise DeadlineExceeded("callback deadline exceeded")
+    return min(default, remaining)
+
+
+class CircuitBreaker:
+    """Closed until ``threshold`` straight failures, then open for ``reset_after``
+    seconds; after that a single trial call decides whether it closes again."""
+
+    def __init__(self, name: str, threshold: int = FAILURE_THRESHOLD, reset_after: float = RESET_TIMEOUT):
+        self.name = name
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial = False
+        self.opens = 0
+        self.rejected = 0
+        self.lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at < self.reset_after:
+            return 'open'
+        return 'half_open'
+
+    def allow(self) -> bool:
+        return self.acquire() is not None
+
+    def acquire(self) -> Optional[str]:
+        """'call' while closed, 'trial' for the one half-open trial, None if rejected."""
+        with self.lock:
+            if self.opened_at is None:
+                return 'call'
+            if time.monotonic() - self.opened_at >= self.reset_after and not self.trial:
+                self.trial = True
+                return 'trial'
+            self.rejected += 1
+            return None
+
+    def release_trial(self):
+        """Free the trial slot after a trial that ended without a verdict."""
+        with self.lock:
+            self.trial = False
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.trial = False
+            if self.opened_at is not None or self.failures >= self.threshold:
+                if self.opened_at is None:
+                    self.opens += 1
+                self.opened_at = time.monotonic()
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(upstream: str) -> CircuitBreaker:
+    with _breakers_lock:
+        if upstream not in _breakers:
+            _breakers[upstream] = CircuitBreaker(upstream)
+        return _breakers[upstream]
+
+
+@contextmanager
+def guarded(upstream: str):
+    """Skip the call if the deadline has passed or ``upstream``'s breaker is open."""
+    budget = _budget.get()
+    if budget is not None and budget.remaining() <= 0:
+        raise DeadlineExceeded(f"{upstream}: callback deadline exceeded")
+    breaker = get_breaker(upstream)
+    slot = breaker.acquire()
+    if slot is None:
+        raise CircuitOpen(f"{upstream}: circuit open")
+    recorded = False
+    try:
+        yield
+    except Unavailable:
+        raise
+    except Exception:
+        # A timeout cut short by our own deadline says nothing about the host
+        if budget is None or budget.remaining() > 0:
+            breaker.record_failure()
+            recorded = True
+        raise
+    else:
+        breaker.record_success()
+        recorded = True
+    finally:
+        # Otherwise a trial without a verdict would keep the breaker open for good
+        if slot == 'trial' and not recorded:
+            breaker.release_trial()
+
+
+@register_collector
+def breaker_metrics():
+    states = ('closed', 'half_open', 'open')
+    lines = [
+        "# HELP gaia_circuit_state Upstream circuit breaker state (0 closed, 1 half open, 2 open).",
+        "# TYPE gaia_circuit_state gauge",
+    ]
+    breakers = list(_breakers.values())
+    lines += [f'gaia_circuit_state{{upstream="{b.name}"}} {states.index(b.state)}' for b in breakers]
+    lines += [
+        "# HELP gaia_circuit_opens_total Times each upstream circuit breaker opened.",
+        "# TYPE gaia_circuit_opens_total counter",
+    ]
+    lines += [f'gaia_circuit_opens_total{{upstream="{b.name}"}} {b.opens}' for b in breakers]
+    lines += [
+        "# HELP gaia_circuit_rejected_total Calls failed fast by an open circuit breaker.",
+        "# TYPE gaia_circuit_rejected_total counter",
+    ]
+    lines += [f'gaia_circuit_rejected_total{{upstream="{b.name}"}} {b.rejected}' for b in breakers]
+    return lines
@@ -1,51 +1,438 @@
 # seismic_live.py
 import json
 import logging
+import math
+import os
+import time
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
 from tornado.websocket import websocket_connect
-from tornado.ioloop import IOLoop
+from tornado.ioloop import IOLoop, PeriodicCallback
 from tornado import gen
-from collections import deque
+import numpy as np
+from events.snapshot import publish_snapshot, read_snapshot, records_to_columns
+from events.metrics import register_collector
+from events.profiling import profiled
+from events.swarms import SwarmDetector
 
-echo_uri = 'wss://www.seismicportal.eu/standing_order/websocket'
+echo_uri = os.environ.get('GAIA_SEISMIC_URI', 'wss://www.seismicportal.eu/standing_order/websocket')
 PING_INTERVAL = 10
+SNAPSHOT_INTERVAL = 2000  # ms between snapshot publishes
+MAX_EVENTS = 1000
+MAX_BATCH = 512  # messages ingested per pass when they arrive back-to-back
+# seq changes on every revision, first_seq only when the event is created
+EVENT_FIELDS = ['seq', 'first_seq', 'unid', 'lat', 'lon', 'depth', 'mag', 'region', 'time']
+# Hourly buckets kept by the analytics aggregates
+AGGREGATE_HOURS = int(os.environ.get('GAIA_SEISMIC_HOURS', 72))
+# Lower bin edges; the last bin of each is open-ended
+MAG_EDGES = np.arange(0, 10, 0.5)
+DEPTH_EDGES = np.array([0, 5, 10, 20, 35, 70, 150, 300, 500, 700])
+CLUSTER_FIELDS = ['id', 'lat', 'lon', 'count', 'max_mag', 'first', 'last', 'kind', 'region']
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+
+def _checked(action, event):
+    # Rejected here so bad values are counted as decode errors instead of
+    # failing in the aggregates or the swarm grid
+    if not (-90 <= event['lat'] <= 90 and math.isfinite(event['lon']) and math.isfinite(event['depth'])):
+        raise ValueError(f"Bad coordinates {event['lon']}, {event['lat']}, {event['depth']}")
+    if event['mag'] is not None and not math.isfinite(event['mag']):
+        raise ValueError(f"Bad magnitude {event['mag']}")
+    return action, event
+
+
+if msgspec is not None:
+    # Decode straight into the few fields we keep, skipping the rest of the
+    # feature without building intermediate dicts
+    class _Properties(msgspec.Struct):
+        unid: Optional[str] = None
+        mag: Optional[float] = None
+        flynn_region: Optional[str] = None
+        time: Optional[str] = None
+
+    class _Geometry(msgspec.Struct):
+        coordinates: Tuple[float, float, float]
+
+    class _Feature(msgspec.Struct):
+        geometry: _Geometry
+        properties: _Properties
+        id: Optional[str] = None
+
+    class _Message(msgspec.Struct):
+        data: _Feature
+        action: str = 'create'
+
+    _decoder = msgspec.json.Decoder(_Message)
+    DECODE_ERRORS = (msgspec.DecodeError, ValueError)
+
+    def decode_message(msg):
+        """Return (action, event) for one raw Seismic Portal message."""
+        m = _decoder.decode(msg)
+        props = m.data.properties
+        lon, lat, depth = m.data.geometry.coordinates
+        return _checked(m.action, {
+            'unid': props.unid or m.data.id or '',
+            'lat': lat,
+            'lon': lon,
+            'depth': depth,
+            'mag': props.mag,
+            'region': props.flynn_region or 'Unknown',
+            'time': props.time,
+        })
+else:
+    DECODE_ERRORS = (ValueError, KeyError, TypeError, AttributeError)
+
+    def decode_message(msg):
+        """Return (action, event) for one raw Seismic Portal message."""
+        data = json.loads(msg)
+        feature = data['data']
+        props = feature['properties']
+        lon, lat, depth = (float(v) for v in feature['geometry']['coordinates'])
+        mag = props.get('mag')
+        return _checked(data.get('action', 'create'), {
+            'unid': props.get('unid') or feature.get('id') or '',
+            'lat': lat,
+            'lon': lon,
+            'depth': depth,
+            'mag': None if mag is None else float(mag),
+            'region': props.get('flynn_region') or 'Unknown',
+            'time': props.get('time'),
+        })
+
+
+class EventBuffer:
+    """Fixed-size ring of events with an unid -> slot index.
+
+    Revisions of an event already in the ring overwrite its slot in place,
+    so a burst of updates cannot push distinct events out of the window.
+    Iteration runs oldest to newest by creation.
+    """
+
+    def __init__(self, maxlen: int):
+        self.maxlen = maxlen
+        self.clear()
+
+    def clear(self):
+        self._slots: List[Optional[Dict]] = [None] * self.maxlen
+        self._index: Dict[str, int] = {}
+        self._start = 0
+        self._len = 0
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __iter__(self) -> Iterator[Dict]:
+        for i in range(self._len):
+            yield self._slots[(self._start + i) % self.maxlen]
+
+    def __getitem__(self, i: int) -> Dict:
+        if i < 0:
+            i += self._len
+        if not 0 <= i < self._len:
+            raise IndexError(i)
+        return self._slots[(self._start + i) % self.maxlen]
+
+    def upsert(self, event: Dict) -> bool:
+        """Insert ``event`` or overwrite the one with its unid; True if revised."""
+        unid = event.get('unid')
+        slot = self._index.get(unid) if unid else None
+        if slot is not None:
+            event['first_seq'] = self._slots[slot]['first_seq']
+            self._slots[slot] = event
+            return True
+
+        if self._len == self.maxlen:
+            evicted = self._slots[self._start]
+            if evicted.get('unid'):
+                self._index.pop(evicted['unid'], None)
+            slot = self._start
+            self._start = (self._start + 1) % self.maxlen
+        else:
+            slot = (self._start + self._len) % self.maxlen
+            self._len += 1
+
+        event.setdefault('first_seq', event['seq'])
+        self._slots[slot] = event
+        if unid:
+            self._index[unid] = slot
+        return False
+
+    append = upsert
+
+
+def _bin(edges, value) -> int:
+    if value is None or value != value:
+        return -1
+    return max(0, int(np.searchsorted(edges, value, side='right')) - 1)
+
+
+def _origin_time(event) -> float:
+    """Unix seconds at the event's origin time, capped at now."""
+    now = time.time()
+    try:
+        return min(now, datetime.fromisoformat(event['time']).timestamp())
+    except (TypeError, ValueError, KeyError):
+        return now
+
+
+def _origin_hour(event) -> int:
+    return int(_origin_time(event) // 3600)
+
+
+class SeismicAggregates:
+    """Rolling hourly event counts by region, magnitude bin and depth bin.
+
+    Buckets form a ring of ``hours`` slots keyed by origin hour; advancing
+    the head hour zeroes the slots that fall out of the window. Each event's
+    contribution is kept by unid, so a revision moves it to its new bins
+    instead of counting it twice. Readers sum at most ``hours`` rows however
+    many events have been seen.
+    """
+
+    def __init__(self, hours: int):
+        self.hours = hours
+        self.clear()
+
+    def clear(self):
+        self.head: Optional[int] = None
+        self.regions: List[str] = []
+        self._region_index: Dict[str, int] = {}
+        self._region_counts = np.zeros((16, self.hours), dtype=np.int32)
+        self.mag_counts = np.zeros((self.hours, len(MAG_EDGES)), dtype=np.int32)
+        self.depth_counts = np.zeros((self.hours, len(DEPTH_EDGES)), dtype=np.int32)
+        self._contributions: Dict[str, Tuple[int, int, int, int]] = {}
+        self.dirty = False
+
+    @property
+    def region_counts(self) -> np.ndarray:
+        return self._region_counts[:len(self.regions)]
+
+    def _region(self, name: str) -> int:
+        index = self._region_index.get(name)
+        if index is None:
+            index = self._region_index[name] = len(self.regions)
+            self.regions.append(name)
+            if index == len(self._region_counts):
+                grown = np.zeros((2 * index, self.hours), dtype=np.int32)
+                grown[:index] = self._region_counts
+                self._region_counts = grown
+        return index
+
+    def advance(self, hour: int):
+        """Move the head to ``hour``, expiring buckets that leave the window."""
+        if self.head is None:
+            self.head = hour
+            return
+        if hour <= self.head:
+            return
+        for h in range(max(self.head + 1, hour - self.hours + 1), hour + 1):
+            slot = h % self.hours
+            self._region_counts[:, slot] = 0
+            self.mag_counts[slot] = 0
+            self.depth_counts[slot] = 0
+        self.head = hour
+        oldest = hour - self.hours
+        self._contributions = {u: c for u, c in self._contributions.items() if c[0] > oldest}
+        self.dirty = True
+
+    def _apply(self, contribution, delta: int):
+        hour, region, mag, depth = contribution
+        slot = hour % self.hours
+        self._region_counts[region, slot] += delta
+        if mag >= 0:
+            self.mag_counts[slot, mag] += delta
+        if depth >= 0:
+            self.depth_counts[slot, depth] += delta
+
+    def add(self, event: Dict):
+        """Count ``event``, first removing an earlier version with the same unid."""
+        unid = event.get('unid')
+        previous = self._contributions.pop(unid, None) if unid else None
+        if previous is not None:
+            self._apply(previous, -1)
+            self.dirty = True
+
+        hour = _origin_hour(event)
+        self.advance(hour)
+        if hour <= self.head - self.hours:
+            return
+        depth = event.get('depth')
+        contribution = (
+            hour,
+            self._region(event.get('region') or 'Unknown'),
+            _bin(MAG_EDGES, event.get('mag')),
+            _bin(DEPTH_EDGES, abs(depth) if depth is not None else None),
+        )
+        self._apply(contribution, 1)
+        if unid:
+            self._contributions[unid] = contribution
+        self.dirty = True
+
+    def _order(self) -> np.ndarray:
+        # Ring slots from the oldest hour in the window to the head
+        return (np.arange(self.head - self.hours + 1, self.head + 1)) % self.hours
+
+    def hour_columns(self) -> Dict[str, np.ndarray]:
+        order = self._order()
+        return {
+            'hour': np.arange(self.head - self.hours + 1, self.head + 1, dtype=np.int64),
+            'events': self.region_counts.sum(axis=0)[order],
+            'mag': self.mag_counts[order],
+            'depth': self.depth_counts[order],
+        }
+
+    def region_columns(self) -> Dict[str, list]:
+        return {'region': list(self.regions), 'hourly': self.region_counts[:, self._order()]}
+
  
-recent_events = deque(maxlen=1000)
+recent_events = EventBuffer(MAX_EVENTS)
+aggregates = SeismicAggregates(AGGREGATE_HOURS)
+swarms = SwarmDetector()
+# Message outcomes; published with each snapshot so web workers can export them
+ingest_counts = {'ingested': 0, 'revised': 0, 'error': 0}
+_last_seq = 0
+
+def next_seq():
+    # Ingest timestamps in microseconds keep cursors increasing across restarts
+    global _last_seq
+    _last_seq = max(_last_seq + 1, time.time_ns() // 1000)
+    return _last_seq
+
+def ingest(messages) -> bool:
+    """Decode and upsert a batch of raw messages; True once the socket closed."""
+    for msg in messages:
+        if msg is None:
+            return True
+        try:
+            _, event = decode_message(msg)
+        except DECODE_ERRORS:
+            ingest_counts['error'] += 1
+            logging.exception("Error parsing message")
+            continue
+
+        event['seq'] = next_seq()
+        aggregates.add(event)
+        swarms.add(
+            event['unid'] or str(event['seq']), event['lat'], event['lon'],
+            _origin_time(event), event['mag'], event['region']
+        )
+        if recent_events.upsert(event):
+            ingest_counts['revised'] += 1
+        ingest_counts['ingested'] += 1
+    return False
 
 @gen.coroutine
 def listen(ws):
+    pending = ws.read_message()
     while True:
-        msg = yield ws.read_message()
-        if msg is None:
+        msg = yield pending
+        batch = [msg]
+        pending = ws.read_message()
+        # Drain messages that are already queued so a burst costs one pass
+        while msg is not None and pending.done() and len(batch) < MAX_BATCH:
+            msg = pending.result()
+            batch.append(msg)
+            pending = ws.read_message()
+
+        if ingest(batch):
             logging.info("WebSocket closed.")
             break
 
-        try:
-            data = json.loads(msg)
-            props = data['data']['properties']
-            coords = data['data']['geometry']['coordinates']
-            lon, lat, depth = coords
-            mag = props.get('mag', None)
-            region = props.get('flynn_region', 'Unknown')
-
-            recent_events.append({
-                'lat': lat,
-                'lon': lon,
-                'depth': depth,
-                'mag': mag,
-                'region': region,
-                'time': props.get('time'),
-            })
-        except Exception:
-            logging.exception("Error parsing message")
-
 @gen.coroutine
 def launch_client():
     logging.info("Connecting to Seismic Portal...")
     ws = yield websocket_connect(echo_uri, ping_interval=PING_INTERVAL)
     logging.info("Listening for earthquake updates...")
-    listen(ws)
+    yield listen(ws)
+
+def event_columns():
+    return records_to_columns(list(recent_events), EVENT_FIELDS)
+
+def head_seq(events) -> int:
+    return int(np.max(events['seq'])) if len(events['seq']) else 0
+
+def events_since(events, cursor):
+    """Split event columns into rows created after ``cursor`` and rows revised since.
+
+    Returns (appended, revised), both column dicts: appended holds the new
+    events in creation order, revised the events the client already has
+    that changed since.
+    """
+    seqs = np.asarray(events['seq'])
+    first = np.asarray(events['first_seq'])
+    changed = np.flatnonzero((first <= cursor) & (seqs > cursor))
+    # Creation order matches buffer order, so new events are a suffix
+    start = int(np.searchsorted(first, cursor, side='right'))
+    appended = {name: events[name][start:] for name in EVENT_FIELDS}
+    revised = {name: [events[name][i] for i in changed] for name in EVENT_FIELDS}
+    return appended, revised
+
+@profiled('seismic.publish')
+def publish_events():
+    # Lets every web worker map the buffer without running its own listener
+    if recent_events:
+        publish_snapshot('seismic', event_columns(), capacity=MAX_EVENTS, **ingest_counts)
+    publish_aggregates()
+    publish_swarms()
+
+def publish_swarms():
+    swarms.expire(time.time())
+    if not swarms.dirty:
+        return
+    clusters = swarms.clusters()
+    publish_snapshot('seismic_clusters', records_to_columns(clusters, CLUSTER_FIELDS), events=len(swarms))
+    swarms.dirty = False
+
+def publish_aggregates():
+    # Quiet hours still have to roll off the window
+    if aggregates.head is None:
+        return
+    aggregates.advance(int(time.time() // 3600))
+    if not aggregates.dirty:
+        return
+    publish_snapshot('seismic_hours', aggregates.hour_columns(), head=aggregates.head)
+    publish_snapshot('seismic_regions', aggregates.region_columns(), head=aggregates.head)
+    aggregates.dirty = False
+
+@register_collector
+def seismic_metrics():
+    if recent_events:
+        fill, counts = len(recent_events), ingest_counts
+    else:
+        snapshot = read_snapshot('seismic')
+        if snapshot is None:
+            return []
+        fill, counts = len(snapshot), snapshot.attrs
+
+    lines = [
+        "# HELP gaia_seismic_buffer_events Events held in the seismic ring buffer.",
+        "# TYPE gaia_seismic_buffer_events gauge",
+        f"gaia_seismic_buffer_events {fill}",
+        "# HELP gaia_seismic_buffer_capacity Size of the seismic ring buffer.",
+        "# TYPE gaia_seismic_buffer_capacity gauge",
+        f"gaia_seismic_buffer_capacity {MAX_EVENTS}",
+        "# HELP gaia_seismic_messages Seismic websocket messages by outcome.",
+        "# TYPE gaia_seismic_messages counter",
+    ]
+    lines.extend(
+        f'gaia_seismic_messages_total{{outcome="{outcome}"}} {counts.get(outcome, 0)}'
+        for outcome in ('ingested', 'revised', 'error')
+    )
+    return lines
 
 def start_seismic_listener():
-    ioloop = IOLoop()
+    ioloop = IOLoop.current()
     ioloop.spawn_callback(launch_client)
+
+    periodic = PeriodicCallback(publish_events, SNAPSHOT_INTERVAL)
+    periodic.start()
+
     ioloop.start()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    start_seismic_listener()
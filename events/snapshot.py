@@ -0,0 +1,266 @@
+# events/snapshot.py
+import json
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, Iterator, List, Optional
+
+import numpy as np
+
+from events.metrics import count_cache, count_error
+from events.resilience import deadline
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Snapshots live on tmpfs when available so every worker on the host maps the
+# same physical pages; a publish is a single atomic rename of a complete file.
+SNAPSHOT_DIR = os.environ.get(
+    'GAIA_SNAPSHOT_DIR',
+    os.path.join('/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir(), 'gaia-gx'),
+)
+LAYERS = ('population', 'weather', 'tide', 'seismic', 'seismic_clusters', 'news')
+# Row identity used to fill a partial fetch from the previous snapshot
+LAYER_KEYS = {'population': 'country', 'news': 'link', 'tide': 'id'}
+
+MAGIC = b'GXS1'
+ALIGN = 64
+# magic, version, created (unix seconds), row count, metadata length
+HEADER = struct.Struct('<4sQdQI')
+
+_mapped: Dict[str, 'Snapshot'] = {}
+_publish_lock = threading.Lock()
+
+
+class Snapshot:
+    """Read-only, zero-copy view over one published layer snapshot."""
+
+    def __init__(self, layer: str, buffer, key):
+        magic, version, created, rows, meta_len = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{layer}: not a GAIA-GX snapshot")
+        meta = json.loads(bytes(buffer[HEADER.size:HEADER.size + meta_len]))
+
+        self.layer = layer
+        self.version = version
+        self.created = created
+        self.rows = rows
+        self.attrs = meta.get('attrs', {})
+        self._key = key
+        self._buffer = buffer
+        self._meta = {c['name']: c for c in meta['columns']}
+        self._decoded: Dict[str, List[str]] = {}
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._meta
+
+    def __getitem__(self, name: str):
+        col = self._meta[name]
+        if col['kind'] == 'array':
+            shape = col.get('shape')
+            if shape:
+                # Fixed-width rows (histogram bins and the like), stored row-major
+                values = self._array(col['dtype'], col['offset'], col['length'] * int(np.prod(shape)))
+                return values.reshape(col['length'], *shape)
+            return self._array(col['dtype'], col['offset'], col['length'])
+
+        # Text columns are a utf-8 blob plus offsets; decode once per version
+        if name not in self._decoded:
+            offsets = self._array('<i8', col['offsets'], col['length'] + 1).tolist()
+            blob = self._buffer[col['data']:col['data'] + offsets[-1]]
+            self._decoded[name] = [
+                str(blob[offsets[i]:offsets[i + 1]], 'utf-8') for i in range(col['length'])
+            ]
+        return self._decoded[name]
+
+    def _array(self, dtype: str, offset: int, length: int) -> np.ndarray:
+        return np.frombuffer(self._buffer, dtype=dtype, count=length, offset=offset)
+
+    @property
+    def names(self) -> List[str]:
+        return list(self._meta)
+
+    def iter_rows(self) -> Iterator[Dict]:
+        columns = [(name, self[name]) for name in self._meta]
+        for i in range(self.rows):
+            yield {name: values[i] for name, values in columns}
+
+
+def _path(layer: str) -> str:
+    return os.path.join(SNAPSHOT_DIR, f"{layer}.snap")
+
+
+def _pad(n: int) -> int:
+    return (ALIGN - n % ALIGN) % ALIGN
+
+
+def _encode_column(values):
+    arr = values if isinstance(values, np.ndarray) else np.asarray(values)
+    if arr.dtype.kind == 'O' and all(v is None or isinstance(v, (int, float)) for v in values):
+        arr = arr.astype(np.float64)
+    if arr.dtype.kind in 'biuf':
+        return 'array', np.ascontiguousarray(arr, dtype=arr.dtype.newbyteorder('<'))
+    return 'text', ['' if v is None else str(v) for v in values]
+
+
+def records_to_columns(records: List[Dict], fields: Optional[List[str]] = None) -> Dict[str, list]:
+    """Pivot a list of row dicts into columns, filling missing keys with None."""
+    if fields is None:
+        fields = []
+        for record in records:
+            fields.extend(k for k in record if k not in fields)
+    return {f: [r.get(f) for r in records] for f in fields}
+
+
+def publish_snapshot(layer: str, columns: Dict[str, list], **attrs) -> int:
+    """Write a new snapshot for ``layer`` and atomically make it current."""
+    encoded = [(name,) + _encode_column(values) for name, values in columns.items()]
+    rows = len(encoded[0][2]) if encoded else 0
+
+    # Lay out column payloads first so offsets can go in the metadata
+    meta_cols, chunks = [], []
+    cursor = 0
+    for name, kind, data in encoded:
+        if len(data) != rows:
+            raise ValueError(f"{layer}: column '{name}' has {len(data)} rows, expected {rows}")
+        if kind == 'array':
+            meta_cols.append({'name': name, 'kind': kind, 'dtype': data.dtype.str,
+                              'length': rows, 'offset': cursor})
+            if data.ndim > 1:
+                meta_cols[-1]['shape'] = list(data.shape[1:])
+            chunks.append(data.tobytes())
+            cursor += data.nbytes
+        else:
+            blobs = [s.encode('utf-8') for s in data]
+            offsets = np.zeros(rows + 1, dtype='<i8')
+            np.cumsum([len(b) for b in blobs], out=offsets[1:])
+            meta_cols.append({'name': name, 'kind': kind, 'length': rows,
+                              'offsets': cursor, 'data': cursor + offsets.nbytes})
+            chunks.append(offsets.tobytes())
+            chunks.append(b''.join(blobs))
+            cursor += offsets.nbytes + int(offsets[-1])
+        pad = _pad(cursor)
+        chunks.append(b'\0' * pad)
+        cursor += pad
+
+    # Offsets above are relative to the data section; the metadata length
+    # decides where that starts, so fix them up after sizing the metadata
+    meta_len = 0
+    while True:
+        base = HEADER.size + meta_len
+        base += _pad(base)
+        shifted = [
+            {k: (v + base if k in ('offset', 'offsets', 'data') else v) for k, v in col.items()}
+            for col in meta_cols
+        ]
+        meta = json.dumps({'columns': shifted, 'attrs': attrs}).encode('utf-8')
+        if len(meta) <= meta_len:
+            break
+        meta_len = len(meta) + 64
+
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    path = _path(layer)
+    with _publish_lock:
+        current = read_snapshot(layer)
+        version = max(time.time_ns(), current.version + 1 if current else 0)
+
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, version, time.time(), rows, len(meta)))
+            f.write(meta)
+            f.write(b'\0' * (base - HEADER.size - len(meta)))
+            for chunk in chunks:
+                f.write(chunk)
+        os.replace(tmp, path)
+    return version
+
+
+def try_lease(layer: str):
+    """Take the host-wide lease to produce ``layer``, or return None if another process holds it.
+
+    The lease is an flock on a file next to the snapshot, held until the
+    returned file is closed or the process exits; other processes map what
+    the holder publishes. Without fcntl every process is its own holder.
+    """
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    f = open(os.path.join(SNAPSHOT_DIR, f"{layer}.lease"), 'a')
+    if fcntl is None:
+        return f
+    try:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        f.close()
+        return None
+    return f
+
+
+def read_snapshot(layer: str, max_age: Optional[float] = None) -> Optional[Snapshot]:
+    """Return the current snapshot for ``layer``, mapping it only when it changed."""
+    try:
+        st = os.stat(_path(layer))
+    except FileNotFoundError:
+        return None
+
+    key = (st.st_ino, st.st_mtime_ns, st.st_size)
+    snapshot = _mapped.get(layer)
+    if snapshot is None or snapshot._key != key:
+        try:
+            with open(_path(layer), 'rb') as f:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            snapshot = Snapshot(layer, memoryview(buffer), key)
+        except (FileNotFoundError, ValueError, struct.error) as e:
+            print(f"Error mapping {layer} snapshot: {e}")
+            return None
+        _mapped[layer] = snapshot
+
+    if max_age is not None and time.time() - snapshot.created > max_age:
+        return None
+    return snapshot
+
+
+def _merge_stale(records: List[Dict], previous: Optional[Snapshot], key: str) -> List[Dict]:
+    """Fresh ``records`` plus the rows of ``previous`` they did not cover, flagged stale."""
+    fresh = [dict(r, stale=0) for r in records]
+    if previous is None or key not in previous:
+        return fresh
+    seen = {r.get(key) for r in records}
+    return fresh + [dict(row, stale=1) for row in previous.iter_rows() if row[key] not in seen]
+
+
+def load_layer(layer: str, fetch: Callable[[], List[Dict]], max_age: Optional[float] = None) -> Optional[Snapshot]:
+    """Serve ``layer`` from a fresh snapshot, otherwise fetch, publish and map it.
+
+    A fetch cut short by the callback deadline or an open circuit is merged
+    with the previous snapshot's remaining rows, which get ``stale`` = 1;
+    such a snapshot is published as partial and refetched on the next load.
+    If the fetch yields nothing, the previous snapshot is served at any age.
+    """
+    snapshot = read_snapshot(layer, max_age)
+    fresh = snapshot is not None and not snapshot.attrs.get('partial')
+    count_cache(f"snapshot.{layer}", fresh)
+    if fresh:
+        return snapshot
+
+    with deadline() as scope:
+        try:
+            records = fetch()
+        except Exception as e:
+            count_error(f"snapshot.{layer}", e)
+            records = None
+    previous = snapshot or read_snapshot(layer)
+    if not records:
+        return previous
+
+    partial = scope.partial
+    if partial and layer in LAYER_KEYS:
+        records = _merge_stale(records, previous, LAYER_KEYS[layer])
+    publish_snapshot(layer, records_to_columns(records), partial=partial)
+    return read_snapshot(layer)
@@ -0,0 +1,333 @@
+# events/swarms.py
+import heapq
+import math
+import os
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+# Two events link when they are this close in space and time; a cluster is
+# the connected set of linked events still inside the window
+LINK_KM = float(os.environ.get('GAIA_SWARM_KM', 30))
+LINK_HOURS = float(os.environ.get('GAIA_SWARM_HOURS', 12))
+WINDOW_HOURS = float(os.environ.get('GAIA_SWARM_WINDOW', 72))
+# Clusters smaller than this are not reported
+MIN_EVENTS = int(os.environ.get('GAIA_SWARM_MIN_EVENTS', 5))
+# A largest event this far above the next marks a mainshock with aftershocks
+# (Båth's law puts the gap near 1.2); anything flatter is a swarm
+MAINSHOCK_GAP = 1.0
+
+EARTH_KM = 6371.0
+
+
+def _unit_vector(lat, lon):
+    p, l = math.radians(lat), math.radians(lon)
+    return math.cos(p) * math.cos(l), math.cos(p) * math.sin(l), math.sin(p)
+
+
+class _Grid:
+    """Cells just under link_km / sqrt(2) across, so any two points in one
+    cell are within the link distance. Each row's cells are as wide in
+    degrees as that spans at the row's equatorward edge, where the row is
+    widest."""
+
+    def __init__(self, link_km: float):
+        self.link = link_km / EARTH_KM
+        # Shaved a little so the diagonal stays inside the link on the sphere
+        self.cell_deg = math.degrees(self.link) / math.sqrt(2) * 0.999
+        rows = int(math.ceil(180 / self.cell_deg))
+        self.columns = []
+        for row in range(rows):
+            low, high = row * self.cell_deg - 90, min(90.0, (row + 1) * self.cell_deg - 90)
+            edge = 0.0 if low <= 0 <= high else min(abs(low), abs(high))
+            width = self.cell_deg / max(math.cos(math.radians(edge)), 1e-9)
+            self.columns.append(max(1, int(math.ceil(360 / width))))
+        # Cells are numbered row by row; a key adds the time bucket times this
+        self.width = max(self.columns)
+        self.stride = self.width * rows
+        self._around: Dict[int, List[int]] = {}
+
+    def row(self, lat) -> int:
+        return min(len(self.columns) - 1, max(0, int((lat + 90) // self.cell_deg)))
+
+    def column(self, row, lon) -> int:
+        columns = self.columns[row]
+        return int((lon + 180) / 360 * columns) % columns
+
+    def cell(self, row, col) -> int:
+        return row * self.width + col
+
+    def neighbours(self, row, col) -> List[int]:
+        """Cells that can hold a point within the link distance of any point in (row, col)."""
+        found = self._around.get(self.cell(row, col))
+        if found is not None:
+            return found
+        low = row * self.cell_deg - 90
+        high = min(90.0, low + self.cell_deg)
+        columns = self.columns[row]
+        # Longitude span of the cell plus how far the link reaches east or
+        # west from its poleward edge
+        poleward = math.radians(max(abs(low), abs(high)))
+        if self.link >= math.pi / 2 - poleward:
+            reach = 180.0
+        else:
+            reach = math.degrees(math.asin(min(1.0, math.sin(self.link) / math.cos(poleward))))
+        west = col * 360 / columns - 180 - reach
+        east = (col + 1) * 360 / columns - 180 + reach
+        reach_rows = int(math.ceil(math.degrees(self.link) / self.cell_deg))
+        found = []
+        for r in range(max(0, row - reach_rows), min(len(self.columns), row + reach_rows + 1)):
+            n = self.columns[r]
+            if east - west >= 360:
+                cols = range(n)
+            else:
+                first = int(math.floor((west + 180) / 360 * n))
+                last = int(math.floor((east + 180) / 360 * n))
+                cols = sorted({c % n for c in range(first, last + 1)})
+            found += [self.cell(r, c) for c in cols]
+        self._around[self.cell(row, col)] = found
+        return found
+
+
+# Directions in which each cell keeps its most extreme event; an event
+# outside the cell is nearest to the cell's events along their outline
+_DIRECTIONS = [(math.cos(a * math.pi / 4), math.sin(a * math.pi / 4)) for a in range(8)]
+
+
+class _Event:
+    __slots__ = ('unid', 'lat', 'lon', 't', 'mag', 'region', 'xyz', 'cell')
+
+    def __init__(self, unid, lat, lon, t, mag, region):
+        self.unid, self.lat, self.lon, self.t, self.mag, self.region = unid, lat, lon, t, mag, region
+        self.xyz = _unit_vector(lat, lon)
+        self.cell: Optional['_Cell'] = None
+
+
+class _Cell:
+    """Events in one grid cell and time bucket, which all link to each other
+    and so belong to one cluster. The newest of them and the extremes in
+    each compass direction, at most nine, stand in for the cell when linking
+    events from neighbouring cells."""
+
+    __slots__ = ('key', 'cluster', 'members', 'scale', 'extremes', 'reach', 'reps', 'newest')
+
+    def __init__(self, key, cluster: '_Cluster', lat):
+        self.key = key
+        self.cluster = cluster
+        self.members: Dict[str, _Event] = {}
+        self.scale = math.cos(math.radians(lat))
+        self.extremes: List[Optional[_Event]] = [None] * len(_DIRECTIONS)
+        self.reach = [-math.inf] * len(_DIRECTIONS)
+        self.reps: List[_Event] = []
+        self.newest: Optional[_Event] = None
+
+    def _offer(self, event: _Event) -> bool:
+        if self.newest is None or event.t >= self.newest.t:
+            self.newest = event
+        x, y = event.lon * self.scale, event.lat
+        changed = False
+        for i, (dx, dy) in enumerate(_DIRECTIONS):
+            reach = dx * x + dy * y
+            if reach > self.reach[i]:
+                self.reach[i], self.extremes[i] = reach, event
+                changed = True
+        return changed
+
+    def _collect(self):
+        self.reps = list({id(e): e for e in self.extremes if e is not None}.values())
+
+    def add(self, event: _Event):
+        self.members[event.unid] = event
+        event.cell = self
+        if self._offer(event):
+            self._collect()
+
+    def links(self, xyz, t, min_dot: float, link_seconds: float) -> bool:
+        """Whether an event at unit vector ``xyz`` and time ``t`` links to a representative."""
+        x, y, z = xyz
+        # The newest first, since events mostly arrive in time order
+        for other in (self.newest, *self.reps):
+            ox, oy, oz = other.xyz
+            if abs(other.t - t) <= link_seconds and x * ox + y * oy + z * oz >= min_dot:
+                return True
+        return False
+
+    def remove(self, event: _Event):
+        del self.members[event.unid]
+        if event is self.newest or any(e is event for e in self.extremes):
+            # Only a representative leaving rescans the cell
+            self.extremes = [None] * len(_DIRECTIONS)
+            self.reach = [-math.inf] * len(_DIRECTIONS)
+            self.newest = None
+            for other in self.members.values():
+                self._offer(other)
+            self._collect()
+
+
+class _Cluster:
+    """Running sums over the member events, so adding or removing one is O(1)."""
+
+    __slots__ = ('id', 'cells', 'count', 'sin_lon', 'cos_lon', 'sum_lat')
+
+    def __init__(self, cluster_id):
+        self.id = cluster_id
+        self.cells: Set[_Cell] = set()
+        self.count = 0
+        self.sin_lon = self.cos_lon = self.sum_lat = 0.0
+
+    def shift(self, event: _Event, sign: int):
+        lon = math.radians(event.lon)
+        self.count += sign
+        self.sin_lon += sign * math.sin(lon)
+        self.cos_lon += sign * math.cos(lon)
+        self.sum_lat += sign * event.lat
+
+    def absorb(self, other: '_Cluster'):
+        for cell in other.cells:
+            cell.cluster = self
+        self.cells |= other.cells
+        self.count += other.count
+        self.sin_lon += other.sin_lon
+        self.cos_lon += other.cos_lon
+        self.sum_lat += other.sum_lat
+
+    def summary(self) -> Dict:
+        members = [e for cell in self.cells for e in cell.members.values()]
+        members.sort(key=lambda e: e.mag if e.mag is not None else -np.inf, reverse=True)
+        mags = [e.mag for e in members if e.mag is not None]
+        largest = members[0]
+        mainshock = len(mags) > 1 and mags[0] - mags[1] >= MAINSHOCK_GAP
+        return {
+            'id': self.id,
+            'lat': self.sum_lat / len(members),
+            # Circular mean, so clusters across the antimeridian stay put
+            'lon': math.degrees(math.atan2(self.sin_lon, self.cos_lon)),
+            'count': len(members),
+            'max_mag': mags[0] if mags else np.nan,
+            'first': min(e.t for e in members),
+            'last': max(e.t for e in members),
+            'kind': 'aftershocks' if mainshock else 'swarm',
+            'region': largest.region,
+        }
+
+
+class SwarmDetector:
+    """Streaming single-linkage clustering of events over a grid of cells.
+
+    Cells are under LINK_KM / sqrt(2) across and LINK_HOURS long, so events
+    sharing a cell always link and an event's neighbours sit in a fixed
+    number of cells around it. A new event joins its own cell's cluster
+    outright and is checked against at most nine representatives of each
+    other nearby cell, so adding or removing one costs a bounded amount of
+    work however dense the swarm; the price is that a link reaching only a
+    cell's interior events from outside it is missed. When an event links
+    two clusters the smaller one's cells are relabelled into the larger,
+    which keeps merges amortised O(log n) per event. Events leave the
+    window after WINDOW_HOURS. A cluster whose linking events have expired
+    is not split; it shrinks until its remaining members expire too.
+    """
+
+    def __init__(self, link_km: float = LINK_KM, link_hours: float = LINK_HOURS,
+                 window_hours: float = WINDOW_HOURS):
+        self.link_km = link_km
+        self.link_seconds = link_hours * 3600
+        # Chord test: unit vectors within link_km have at least this dot product
+        self.min_dot = math.cos(link_km / EARTH_KM)
+        self.grid = _Grid(link_km)
+        self.window_seconds = window_hours * 3600
+        self.clear()
+
+    def clear(self):
+        self._events: Dict[str, _Event] = {}
+        self._cells: Dict[int, _Cell] = {}
+        # Cells per time bucket, so empty buckets are not searched
+        self._buckets: Dict[int, int] = {}
+        self._expiry: List[Tuple[float, int, _Event]] = []
+        self._clusters: Dict[int, _Cluster] = {}
+        self._next_id = 0
+        self.head = -math.inf
+        self.dirty = False
+
+    def __len__(self):
+        return len(self._events)
+
+    def add(self, unid: str, lat: float, lon: float, t: float, mag: Optional[float] = None, region: str = ''):
+        """Cluster one event; a known ``unid`` is treated as a revision."""
+        if unid in self._events:
+            self._remove(self._events[unid])
+        self.head = max(self.head, t)
+        self.expire()
+        if t < self.head - self.window_seconds:
+            return
+
+        grid, bucket = self.grid, int(t // self.link_seconds)
+        row = grid.row(lat)
+        col = grid.column(row, lon)
+        key = bucket * grid.stride + grid.cell(row, col)
+        event = _Event(unid, lat, lon, t, mag, region)
+        cells = self._cells
+        own = cells.get(key)
+        linked = {own.cluster} if own is not None else set()
+        around = grid.neighbours(row, col)
+        for b in (bucket - 1, bucket, bucket + 1):
+            if b not in self._buckets:
+                continue
+            base = b * grid.stride
+            for spot in around:
+                cell = cells.get(base + spot)
+                if cell is None or cell.cluster in linked:
+                    continue
+                if cell.links(event.xyz, t, self.min_dot, self.link_seconds):
+                    linked.add(cell.cluster)
+        if linked:
+            cluster = max(linked, key=lambda c: c.count)
+            for other in linked - {cluster}:
+                cluster.absorb(other)
+                del self._clusters[other.id]
+        else:
+            cluster = self._clusters[self._next_id] = _Cluster(self._next_id)
+            self._next_id += 1
+
+        if own is None:
+            own = cells[key] = _Cell(key, cluster, (row + 0.5) * grid.cell_deg - 90)
+            cluster.cells.add(own)
+            self._buckets[bucket] = self._buckets.get(bucket, 0) + 1
+        own.add(event)
+        cluster.shift(event, 1)
+
+        self._events[unid] = event
+        heapq.heappush(self._expiry, (t, id(event), event))
+        self.dirty = True
+
+    def _remove(self, event: _Event):
+        del self._events[event.unid]
+        cell = event.cell
+        cluster = cell.cluster
+        cell.remove(event)
+        cluster.shift(event, -1)
+        if not cell.members:
+            del self._cells[cell.key]
+            cluster.cells.discard(cell)
+            bucket = cell.key // self.grid.stride
+            self._buckets[bucket] -= 1
+            if not self._buckets[bucket]:
+                del self._buckets[bucket]
+        if not cluster.count:
+            del self._clusters[cluster.id]
+        self.dirty = True
+
+    def expire(self, now: Optional[float] = None):
+        """Drop events older than the window, measured back from ``now`` or the newest event."""
+        if now is not None:
+            self.head = max(self.head, now)
+        cutoff = self.head - self.window_seconds
+        while self._expiry and self._expiry[0][0] < cutoff:
+            _, _, event = heapq.heappop(self._expiry)
+            # Revised events leave stale heap entries behind
+            if self._events.get(event.unid) is event:
+                self._remove(event)
+
+    def clusters(self, min_events: int = MIN_EVENTS) -> List[Dict]:
+        """Summaries of the clusters with at least ``min_events`` events, largest first."""
+        found = [c.summary() for c in self._clusters.values() if c.count >= min_events]
+        return sorted(found, key=lambda c: -c['count'])
@@ -1,32 +1,250 @@
 # utils/GAIAGX/tides.py
-import requests
-from datetime import date
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from datetime import datetime, time as dtime, timedelta, timezone
+from functools import lru_cache
+from events import http_client
+from events.metrics import CACHE_REQUESTS, count_cache, count_error
+from events.profiling import profiled
+from events.resilience import Unavailable, mark_partial
 
-def fetch_tide_stations(max_stations=None, start=None, end=None):
-    stations_url = "https://surftruths.com/api/tide/stations.json"
+SURFTRUTHS_URL = os.environ.get('GAIA_SURFTRUTHS_URL', 'https://surftruths.com')
+TIDE_CACHE_PATH = os.environ.get('GAIA_TIDE_CACHE', '.tide_cache.sqlite')
+
+# Seconds the station list is trusted before a conditional revalidation
+STATIONS_TTL = 24 * 3600
+# Seconds before midnight UTC at which the next day's predictions are fetched
+PREFETCH_LEAD = 2 * 3600
+# Formatted prediction texts kept in memory for click and viewport lookups
+PREDICTION_TEXT_CACHE = 4096
+# Stations looked up per cache query
+CACHE_QUERY_STATIONS = 500
+
+_db_lock = threading.Lock()
+_prefetch_thread = None
+
+
+@lru_cache(maxsize=None)
+def _db():
+    # Predictions for a station and date never change, so rows are only
+    # ever inserted; the single stations row carries its validators
+    conn = sqlite3.connect(TIDE_CACHE_PATH, check_same_thread=False)
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS stations (
+            id INTEGER PRIMARY KEY CHECK (id = 0),
+            fetched REAL NOT NULL,
+            etag TEXT,
+            last_modified TEXT,
+            body BLOB NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS predictions (
+            station TEXT NOT NULL,
+            day TEXT NOT NULL,
+            body BLOB NOT NULL,
+            PRIMARY KEY (station, day)
+        ) WITHOUT ROWID;
+    """)
+    return conn
+
+
+def _pack(value):
+    return zlib.compress(json.dumps(value, separators=(',', ':')).encode('utf-8'))
+
+
+def _unpack(body):
+    return json.loads(zlib.decompress(body))
+
+
+def utc_day(offset=0):
+    return (datetime.now(timezone.utc) + timedelta(days=offset)).strftime('%Y%m%d')
+
+
+def _days(start, end):
+    day = datetime.strptime(start, '%Y%m%d')
+    last = datetime.strptime(end, '%Y%m%d')
+    while day <= last:
+        yield day.strftime('%Y%m%d')
+        day += timedelta(days=1)
+
+
+def clear_cache():
+    with _db_lock, _db() as conn:
+        conn.execute('DELETE FROM stations')
+        conn.execute('DELETE FROM predictions')
+    prediction_text.cache_clear()
+
+
+def get_stations(max_age=STATIONS_TTL):
+    with _db_lock:
+        row = _db().execute('SELECT fetched, etag, last_modified, body FROM stations').fetchone()
+    if row and time.time() - row[0] < max_age:
+        count_cache('tide.stations', True)
+        return _unpack(row[3])
+    count_cache('tide.stations', False)
+
+    headers = {}
+    if row and row[1]:
+        headers['If-None-Match'] = row[1]
+    if row and row[2]:
+        headers['If-Modified-Since'] = row[2]
     try:
-        stations = requests.get(stations_url, timeout=10).json()
+        response = http_client.get(
+            f"{SURFTRUTHS_URL}/api/tide/stations.json", upstream='surftruths', headers=headers
+        )
+        if row and response.status_code == 304:
+            body = row[3]
+        else:
+            response.raise_for_status()
+            body = _pack(response.json())
     except Exception as e:
-        print(f"Error fetching station list: {e}")
+        count_error('tide.stations', e)
+        # A stale list is far more useful than none
+        return _unpack(row[3]) if row else []
+
+    with _db_lock, _db() as conn:
+        conn.execute(
+            'INSERT OR REPLACE INTO stations VALUES (0, ?, ?, ?, ?)',
+            (time.time(), response.headers.get('ETag'), response.headers.get('Last-Modified'), body)
+        )
+    return _unpack(body)
+
+
+def _rows_to_predictions(body):
+    return [{'time': t, 'type': kind, 'value': v} for t, kind, v in _unpack(body)]
+
+
+def _cached_predictions(station_id, day):
+    with _db_lock:
+        row = _db().execute(
+            'SELECT body FROM predictions WHERE station = ? AND day = ?', (str(station_id), day)
+        ).fetchone()
+    count_cache('tide.predictions', row is not None)
+    if row:
+        return _rows_to_predictions(row[0])
+    return None
+
+
+def _cached_batch(station_ids, days):
+    """Cached predictions for every (station, day) pair, read in one query."""
+    wanted = list({str(sid) for sid in station_ids})
+    days = list(days)
+    rows = []
+    with _db_lock:
+        # Chunked to stay under SQLite's limit of 999 bound parameters
+        for i in range(0, len(wanted), CACHE_QUERY_STATIONS):
+            chunk = wanted[i:i + CACHE_QUERY_STATIONS]
+            rows += _db().execute(
+                f"SELECT station, day, body FROM predictions WHERE station IN ({','.join('?' * len(chunk))}) "
+                f"AND day IN ({','.join('?' * len(days))})",
+                chunk + days
+            ).fetchall()
+    found = {(station, day): _rows_to_predictions(body) for station, day, body in rows}
+    CACHE_REQUESTS.labels('tide.predictions', 'hit').inc(len(found))
+    CACHE_REQUESTS.labels('tide.predictions', 'miss').inc(len(wanted) * len(days) - len(found))
+    return found
+
+
+async def _download_predictions(station_id, day):
+    response = await http_client.fetch(
+        f"{SURFTRUTHS_URL}/api/tide/stations/{station_id}/predictions.json",
+        upstream='surftruths',
+        route='/api/tide/stations/{id}/predictions.json',
+        params={'start': day, 'end': day}
+    )
+    response.raise_for_status()
+    data = response.json() or []
+    if not isinstance(data, list):
+        raise ValueError(f"unexpected predictions payload for station {station_id}")
+
+    body = _pack([[t['time'], t['type'], t['value']] for t in data])
+    await asyncio.to_thread(_store_predictions, station_id, day, body)
+    return data
+
+
+def _store_predictions(station_id, day, body):
+    with _db_lock, _db() as conn:
+        conn.execute('INSERT OR IGNORE INTO predictions VALUES (?, ?, ?)', (str(station_id), day, body))
+
+
+async def get_predictions_async(station_id, day):
+    # sqlite blocks (and waits on _db_lock), so it runs off the shared loop
+    cached = await asyncio.to_thread(_cached_predictions, station_id, day)
+    return cached if cached is not None else await _download_predictions(station_id, day)
+
+
+def get_predictions(station_id, day):
+    """Predictions for one station on one UTC day (YYYYMMDD), cached forever."""
+    cached = _cached_predictions(station_id, day)
+    return cached if cached is not None else http_client.run(_download_predictions(station_id, day))
+
+
+def warm_predictions(station_ids, day):
+    """Fetch ``day`` for every uncached station at once; failures are left to the caller's retry."""
+    cached = _cached_batch(station_ids, [day])
+    missing = [sid for sid in station_ids if (str(sid), day) not in cached]
+    if missing:
+        http_client.gather(*(_download_predictions(sid, day) for sid in missing))
+
+
+def fetch_tide_catalogue():
+    """Every station's position and name, without predictions."""
+    return [
+        {"id": s["id"], "name": s["name"], "lat": s["latitude"], "lon": s["longitude"]}
+        for s in get_stations()
+    ]
+
+
+@lru_cache(maxsize=PREDICTION_TEXT_CACHE)
+def prediction_text(station_id, day):
+    """The first two predictions of ``day`` as hover text, or None if there are none."""
+    data = sorted(get_predictions(station_id, day), key=lambda x: x["time"])
+    if not data:
+        return None
+    return "<br>".join(f"{t['time']}: {t['type']} ({t['value']} cm)" for t in data[:2])
+
+
+def fetch_tide_stations(max_stations=None, start=None, end=None):
+    stations = get_stations()
+    if not stations:
         return []
 
     if max_stations:
         stations = stations[:max_stations]
 
-    today = date.today().strftime("%Y%m%d")
+    today = utc_day()
     start = start or today
-    end = end or today
+    end = end or start
+    days = list(_days(start, end))
+
+    # Cached days are read here in one query, so only misses go to the loop
+    cached = _cached_batch([s["id"] for s in stations], days)
+
+    async def station_predictions(sid):
+        predictions = []
+        for day in days:
+            hit = cached.get((str(sid), day))
+            predictions += hit if hit is not None else await _download_predictions(sid, day)
+        return predictions
+
+    # All stations at once; the shared client caps requests per host
+    fetched = http_client.gather(*(station_predictions(s["id"]) for s in stations))
 
     results = []
+    skipped = 0
 
-    for s in stations:
+    for s, data in zip(stations, fetched):
         try:
+            if isinstance(data, Exception):
+                raise data
             sid = s["id"]
-            pred_url = f"https://surftruths.com/api/tide/stations/{sid}/predictions.json?start={start}&end={end}"
-            data = requests.get(pred_url, timeout=10).json()
             if not data:
                 continue
- 
+
             data.sort(key=lambda x: x["time"])
             upcoming = data[:2]
             info_text = "<br>".join(
@@ -40,8 +258,54 @@ def fetch_tide_stations(max_stations=None, start=None, end=None):
                 "predictions": info_text,
                 "id": sid
             })
+        except Unavailable as e:
+            # Left for the next load, which merges in stale rows
+            skipped += 1
+            last_skip = e
         except Exception as e:
-            print(f"Error fetching tides for {s.get('name')}: {e}")
+            count_error('tide.predictions', f"{s.get('name')}: {e}")
             continue
 
+    if skipped:
+        mark_partial(f"tide.predictions: {skipped} stations skipped ({last_skip})")
     return results
+
+
+@profiled('tide.prefetch')
+def prefetch_next_day(day=None):
+    """Fetch ``day`` (default tomorrow, UTC) for every station cached today."""
+    day = day or utc_day(1)
+    with _db_lock:
+        stations = [row[0] for row in _db().execute(
+            'SELECT station FROM predictions WHERE day = ? '
+            'EXCEPT SELECT station FROM predictions WHERE day = ?', (utc_day(), day)
+        )]
+    results = http_client.gather(*(get_predictions_async(sid, day) for sid in stations))
+    for sid, result in zip(stations, results):
+        if isinstance(result, Exception) and not isinstance(result, Unavailable):
+            count_error('tide.prefetch', f"{sid}: {result}")
+    return len(stations)
+
+
+def _seconds_until_prefetch(now=None):
+    now = now or datetime.now(timezone.utc)
+    midnight = datetime.combine(now.date() + timedelta(days=1), dtime.min, timezone.utc)
+    return max(0.0, (midnight - now).total_seconds() - PREFETCH_LEAD)
+
+
+def start_prefetch():
+    """Prefetch tomorrow's predictions every day, PREFETCH_LEAD before midnight UTC."""
+    global _prefetch_thread
+    if _prefetch_thread is not None:
+        return _prefetch_thread
+
+    def run():
+        while True:
+            time.sleep(_seconds_until_prefetch())
+            prefetch_next_day()
+            # Sleep past midnight so the next wait targets the following day
+            time.sleep(PREFETCH_LEAD + 60)
+
+    _prefetch_thread = threading.Thread(target=run, name='gaia-tide-prefetch', daemon=True)
+    _prefetch_thread.start()
+    return _prefetch_thread
@@ -1,16 +1,52 @@
-import openmeteo_requests
-import requests_cache
-from retry_requests import retry
-from typing import Dict, List, Optional
+import os
+from typing import Dict, List
+from events import http_client
+from events.metrics import count_error
+from events.resilience import Unavailable, mark_partial
 
+OPENMETEO_URL = os.environ.get('GAIA_OPENMETEO_URL', 'https://api.open-meteo.com')
+# Seconds a forecast response is reused; Open-Meteo updates hourly
+FORECAST_CACHE_TTL = 3600
+# Few retries: each attempt gets the caller's remaining deadline as timeout
+FORECAST_RETRIES = 2
 
-cache_session = requests_cache.CachedSession('.cache', expire_after=3600)
-retry_session = retry(cache_session, retries=5, backoff_factor=0.2)
-openmeteo = openmeteo_requests.Client(session=retry_session)
 
-def fetch_weather_data(latitude: float, longitude: float) -> Dict:
+def parse_forecast(body: bytes) -> List:
+    """Split a FlatBuffers forecast body into one WeatherApiResponse per location.
+
+    Each message is prefixed with its little-endian 32-bit length; an error
+    raised mid-stream arrives as plain text starting with "Unexpected".
+    """
+    from openmeteo_sdk.WeatherApiResponse import WeatherApiResponse
+
+    messages, pos = [], 0
+    while pos < len(body):
+        length = int.from_bytes(body[pos:pos + 4], 'little')
+        if body[pos:pos + 4] == b'Unex':
+            raise ValueError(body[pos:].decode('utf-8', 'replace'))
+        messages.append(WeatherApiResponse.GetRootAs(body, pos + 4))
+        pos += 4 + length
+    return messages
+
+
+async def fetch_forecast(params: Dict, timeout: float = 10.0) -> List:
+    """Open-Meteo forecast for one or more locations, parsed per location."""
+    response = await http_client.fetch(
+        f"{OPENMETEO_URL}/v1/forecast",
+        upstream='openmeteo',
+        params={**params, 'format': 'flatbuffers'},
+        timeout=timeout,
+        retries=FORECAST_RETRIES,
+        cache_ttl=FORECAST_CACHE_TTL
+    )
+    if response.status_code in (400, 429):
+        raise ValueError(response.json().get('reason', response.text))
+    response.raise_for_status()
+    return parse_forecast(response.content)
+
+
+async def fetch_weather_async(latitude: float, longitude: float) -> Dict:
     try:
-        url = "https://api.open-meteo.com/v1/forecast"
         params = {
             "latitude": latitude,
             "longitude": longitude,
@@ -20,7 +56,7 @@ def fetch_weather_data(latitude: float, longitude: float) -> Dict:
             "forecast_days": 1
         }
         
-        responses = openmeteo.weather_api(url, params=params)
+        responses = await fetch_forecast(params)
         response = responses[0]
         
         # Process current weather data
@@ -37,10 +73,16 @@ def fetch_weather_data(latitude: float, longitude: float) -> Dict:
         
         return weather_data
         
+    except Unavailable as e:
+        mark_partial(f"weather.forecast: {e}")
+        return None
     except Exception as e:
-        print(f"Error fetching weather data for {latitude}, {longitude}: {e}")
+        count_error('weather.forecast', f"{latitude}, {longitude}: {e}")
         return None
 
+def fetch_weather_data(latitude: float, longitude: float) -> Dict:
+    return http_client.run(fetch_weather_async(latitude, longitude))
+
 def get_weather_icon(weather_code: int) -> str:
     """
     Convert weather code to emoji icon
@@ -95,93 +137,7 @@ def get_weather_description(weather_code: int) -> str:
 
 
 def get_major_cities_weather():
-    
-    major_cities = [
-        # North America
-        {"name": "New York", "lat": 40.71, "lon": -74.01},
-        {"name": "Los Angeles", "lat": 34.05, "lon": -118.25},
-        {"name": "Chicago", "lat": 41.88, "lon": -87.63},
-        {"name": "Toronto", "lat": 43.65, "lon": -79.38},
-        {"name": "Mexico City", "lat": 19.43, "lon": -99.13},
-        {"name": "Vancouver", "lat": 49.28, "lon": -123.12},
-        {"name": "Miami", "lat": 25.76, "lon": -80.19},
-        {"name": "Montreal", "lat": 45.50, "lon": -73.57},
-        {"name": "San Francisco", "lat": 37.77, "lon": -122.42},
-        {"name": "Denver", "lat": 39.74, "lon": -104.99},
-
-        # South America
-        {"name": "São Paulo", "lat": -23.55, "lon": -46.63},
-        {"name": "Buenos Aires", "lat": -34.60, "lon": -58.38},
-        {"name": "Rio de Janeiro", "lat": -22.91, "lon": -43.17},
-        {"name": "Lima", "lat": -12.04, "lon": -77.03},
-        {"name": "Bogotá", "lat": 4.71, "lon": -74.07},
-        {"name": "Santiago", "lat": -33.45, "lon": -70.65},
-        {"name": "Montevideo", "lat": -34.90, "lon": -56.19},
-        {"name": "Quito", "lat": -0.18, "lon": -78.47},
-        {"name": "Caracas", "lat": 10.49, "lon": -66.88},
-        {"name": "La Paz", "lat": -16.50, "lon": -68.12},
-
-        # Europe
-        {"name": "London", "lat": 51.51, "lon": -0.13},
-        {"name": "Paris", "lat": 48.85, "lon": 2.35},
-        {"name": "Berlin", "lat": 52.52, "lon": 13.41},
-        {"name": "Rome", "lat": 41.90, "lon": 12.50},
-        {"name": "Madrid", "lat": 40.42, "lon": -3.70},
-        {"name": "Moscow", "lat": 55.76, "lon": 37.62},
-        {"name": "Amsterdam", "lat": 52.37, "lon": 4.90},
-        {"name": "Prague", "lat": 50.08, "lon": 14.43},
-        {"name": "Vienna", "lat": 48.21, "lon": 16.37},
-        {"name": "Dublin", "lat": 53.35, "lon": -6.26},
-        {"name": "Lisbon", "lat": 38.72, "lon": -9.14},
-        {"name": "Oslo", "lat": 59.91, "lon": 10.75},
-        {"name": "Budapest", "lat": 47.50, "lon": 19.04},
-
-        # Africa
-        {"name": "Cairo", "lat": 30.04, "lon": 31.24},
-        {"name": "Lagos", "lat": 6.46, "lon": 3.39},
-        {"name": "Nairobi", "lat": -1.29, "lon": 36.82},
-        {"name": "Johannesburg", "lat": -26.20, "lon": 28.04},
-        {"name": "Accra", "lat": 5.56, "lon": -0.20},
-        {"name": "Addis Ababa", "lat": 9.03, "lon": 38.74},
-        {"name": "Casablanca", "lat": 33.57, "lon": -7.59},
-        {"name": "Cape Town", "lat": -33.92, "lon": 18.42},
-
-        # Asia
-        {"name": "Tokyo", "lat": 35.69, "lon": 139.69},
-        {"name": "Beijing", "lat": 39.90, "lon": 116.41},
-        {"name": "Seoul", "lat": 37.57, "lon": 126.98},
-        {"name": "Bangkok", "lat": 13.75, "lon": 100.50},
-        {"name": "Mumbai", "lat": 19.08, "lon": 72.88},
-        {"name": "Delhi", "lat": 28.61, "lon": 77.21},
-        {"name": "Singapore", "lat": 1.35, "lon": 103.82},
-        {"name": "Jakarta", "lat": -6.21, "lon": 106.85},
-        {"name": "Kuala Lumpur", "lat": 3.14, "lon": 101.69},
-        {"name": "Manila", "lat": 14.60, "lon": 120.98},
-
-        # Oceania
-        {"name": "Sydney", "lat": -33.87, "lon": 151.21},
-        {"name": "Melbourne", "lat": -37.81, "lon": 144.96},
-        {"name": "Auckland", "lat": -36.85, "lon": 174.76},
-        {"name": "Wellington", "lat": -41.29, "lon": 174.78},
-    ]
+    # The gazetteer in utils/cities.py, fetched in multi-location chunks
+    from events.weather_layer import fetch_locations_weather, gazetteer_locations
 
-    
-    cities_weather = []
-    for city in major_cities:
-        try:
-            weather_data = fetch_weather_data(city["lat"], city["lon"])
-            if weather_data:
-                cities_weather.append({
-                    "name": city["name"],
-                    "lat": city["lat"],
-                    "lon": city["lon"],
-                    "temperature": weather_data["temperature"],
-                    "humidity": weather_data["humidity"],
-                    "precipitation": weather_data["precipitation"],
-                    "weather_icon": get_weather_icon(weather_data["weather_code"]),
-                    "weather_description": get_weather_description(weather_data["weather_code"])
-                })
-        except Exception as e:
-            print(f"Error fetching weather for {city['name']}: {e}")
-    
-    return cities_weather
+    return fetch_locations_weather(gazetteer_locations())
@@ -0,0 +1,319 @@
+# events/weather_layer.py
+import csv
+import importlib.util
+import json
+import os
+import threading
+import time
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from events import http_client
+from events.metrics import count_error
+from events.profiling import profiled
+from events.snapshot import publish_snapshot, read_snapshot, try_lease
+from events.weather import fetch_forecast, get_weather_description, get_weather_icon
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GAZETTEER_PATH = os.path.join(ROOT, 'utils', 'cities.py')
+
+# 'cities' (utils/cities.py), 'grid:<degrees>', or a .py/.json/.csv gazetteer path
+WEATHER_LOCATIONS = os.environ.get('GAIA_WEATHER_LOCATIONS', 'cities')
+# Locations per multi-location forecast request
+CHUNK_SIZE = int(os.environ.get('GAIA_WEATHER_CHUNK', 100))
+# Open-Meteo bills each location in a request; the free tier allows 600 a minute
+RATE_PER_MINUTE = float(os.environ.get('GAIA_WEATHER_RATE', 600))
+# Seconds between full refresh passes; matches the forecast cache expiry
+REFRESH_INTERVAL = 3600
+# One process per host fetches (see WeatherEngine); it publishes progress
+# this often during its first pass, and the others poll for it this often
+PUBLISH_INTERVAL = float(os.environ.get('GAIA_WEATHER_PUBLISH', 5))
+FOLLOW_INTERVAL = 2.0
+# Seconds before retrying a first pass that stopped short at a failed chunk,
+# or taking the lease again after leading failed
+RETRY_INTERVAL = 60
+
+CURRENT_VARIABLES = ["temperature_2m", "relative_humidity_2m", "precipitation", "weather_code"]
+VALUE_COLUMNS = ('temperature', 'humidity', 'precipitation', 'weather_code')
+
+
+def _load_module_cities(path):
+    spec = importlib.util.spec_from_file_location('gaia_gazetteer', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.cities
+
+
+def gazetteer_locations(path: str = GAZETTEER_PATH) -> List[Dict]:
+    """Named locations from a gazetteer file with name, lat and lon per entry."""
+    if path.endswith('.py'):
+        entries = _load_module_cities(path)
+    elif path.endswith('.json'):
+        with open(path) as f:
+            entries = json.load(f)
+    else:
+        with open(path, newline='') as f:
+            entries = list(csv.DictReader(f))
+    return [{'name': e['name'], 'lat': float(e['lat']), 'lon': float(e['lon'])} for e in entries]
+
+
+def grid_locations(step: float) -> List[Dict]:
+    """Cell centres of a regular lat/lon grid, ``step`` degrees apart."""
+    locations = []
+    for lat in np.arange(-90 + step / 2, 90, step):
+        for lon in np.arange(-180 + step / 2, 180, step):
+            name = f"{abs(lat):.1f}°{'N' if lat >= 0 else 'S'} {abs(lon):.1f}°{'E' if lon >= 0 else 'W'}"
+            locations.append({'name': name, 'lat': round(float(lat), 4), 'lon': round(float(lon), 4)})
+    return locations
+
+
+def configured_locations(spec: str = WEATHER_LOCATIONS) -> List[Dict]:
+    if spec == 'cities':
+        return gazetteer_locations()
+    if spec.startswith('grid:'):
+        return grid_locations(float(spec[len('grid:'):]))
+    return gazetteer_locations(spec)
+
+
+class RateBudget:
+    """Token bucket refilled continuously at ``per_minute`` tokens."""
+
+    def __init__(self, per_minute: float):
+        self.rate = per_minute / 60.0
+        self.capacity = per_minute
+        self.tokens = per_minute
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, n: int):
+        n = min(n, self.capacity)
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= n:
+                    self.tokens -= n
+                    return
+                wait = (n - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class WeatherTable:
+    """Columnar current-conditions table; rows [0, filled) hold fetched values.
+
+    Chunks are fetched in row order and ``filled`` only advances over those
+that succeeded, so the filled rows are always a fetched prefix.
+    A refresh pass rewrites rows in place and bumps ``generation`` when done,
+    so clients holding those rows know to reload them.
+    """
+
+    def __init__(self, locations: List[Dict]):
+        self.names = [loc['name'] for loc in locations]
+        self.lat = np.array([loc['lat'] for loc in locations], dtype=np.float32)
+        self.lon = np.array([loc['lon'] for loc in locations], dtype=np.float32)
+        n = len(locations)
+        self.temperature = np.full(n, np.nan, dtype=np.float32)
+        self.humidity = np.full(n, np.nan, dtype=np.float32)
+        self.precipitation = np.full(n, np.nan, dtype=np.float32)
+        self.weather_code = np.full(n, -1, dtype=np.int16)
+        self.filled = 0
+        self.generation = 0
+
+    def __len__(self):
+        return len(self.names)
+
+    def columns(self, start: int = 0, stop: Optional[int] = None) -> Dict[str, np.ndarray]:
+        rows = slice(start, self.filled if stop is None else stop)
+        return {
+            'name': self.names[rows],
+            'lat': self.lat[rows],
+            'lon': self.lon[rows],
+            'temperature': self.temperature[rows],
+            'humidity': self.humidity[rows],
+            'precipitation': self.precipitation[rows],
+            'weather_code': self.weather_code[rows],
+        }
+
+    def records(self) -> List[Dict]:
+        cols = self.columns()
+        return [
+            {
+                'name': cols['name'][i],
+                'lat': float(cols['lat'][i]),
+                'lon': float(cols['lon'][i]),
+                'temperature': float(cols['temperature'][i]),
+                'humidity': float(cols['humidity'][i]),
+                'precipitation': float(cols['precipitation'][i]),
+                'weather_icon': get_weather_icon(int(cols['weather_code'][i])),
+                'weather_description': get_weather_description(int(cols['weather_code'][i])),
+            }
+            for i in range(len(cols['name']))
+            if cols['weather_code'][i] >= 0
+        ]
+
+    def seed(self, snapshot) -> bool:
+        """Adopt a published snapshot's values if it covers the same locations."""
+        if snapshot is None or len(snapshot) != len(self) or 'weather_code' not in snapshot:
+            return False
+        if not (np.array_equal(snapshot['lat'], self.lat) and np.array_equal(snapshot['lon'], self.lon)):
+            return False
+        for name in VALUE_COLUMNS:
+            getattr(self, name)[:] = snapshot[name]
+        self.filled = len(self)
+        return True
+
+    def adopt(self, snapshot) -> bool:
+        """Point the value columns at a published, possibly partial, snapshot.
+
+        The columns become read-only views of the mapped file, so following
+        processes share its pages instead of holding a copy.
+        """
+        if snapshot is None or len(snapshot) > len(self) or 'weather_code' not in snapshot:
+            return False
+        n = len(snapshot)
+        if not (np.array_equal(snapshot['lat'], self.lat[:n]) and np.array_equal(snapshot['lon'], self.lon[:n])):
+            return False
+        for name in VALUE_COLUMNS:
+            setattr(self, name, snapshot[name])
+        self.generation = snapshot.attrs.get('generation', self.generation)
+        self.filled = n
+        return True
+
+
+def fetch_chunk(table: WeatherTable, start: int, stop: int):
+    """Fetch current conditions for rows [start, stop) in one request."""
+    params = {
+        "latitude": ",".join(f"{v:.4f}" for v in table.lat[start:stop]),
+        "longitude": ",".join(f"{v:.4f}" for v in table.lon[start:stop]),
+        "current": CURRENT_VARIABLES,
+        "timezone": "GMT",
+        "forecast_days": 1
+    }
+    responses = http_client.run(fetch_forecast(params, timeout=30))
+    if len(responses) != stop - start:
+        raise ValueError(f"expected {stop - start} locations, got {len(responses)}")
+    for row, response in enumerate(responses, start):
+        current = response.Current()
+        table.temperature[row] = current.Variables(0).Value()
+        table.humidity[row] = current.Variables(1).Value()
+        table.precipitation[row] = current.Variables(2).Value()
+        table.weather_code[row] = int(current.Variables(3).Value())
+
+
+class WeatherEngine:
+    """Fills a WeatherTable chunk by chunk under a rate budget, then refreshes it.
+
+    Once started, only the process holding the host's weather lease fetches,
+    so the rate budget is spent once however many web workers run. The
+    others follow the snapshots it publishes and take over the lease if it
+    exits.
+    """
+
+    def __init__(self, locations: List[Dict], chunk_size: int = CHUNK_SIZE,
+                 rate_per_minute: float = RATE_PER_MINUTE, refresh: float = REFRESH_INTERVAL):
+        self.locations = locations
+        self.table = WeatherTable(locations)
+        self.chunk_size = chunk_size
+        self.budget = RateBudget(rate_per_minute)
+        self.refresh = refresh
+        self.thread = None
+        self.lease = None
+        self.followed = None
+
+    def _publish(self):
+        table = self.table
+        publish_snapshot('weather', table.columns(), locations=len(table),
+                         generation=table.generation, filled=table.filled)
+
+    @profiled('weather.pass')
+    def run_pass(self, publish: bool = True):
+        """Fetch every chunk, or only those past ``filled`` while the table is incomplete.
+
+        ``filled`` only moves over chunks that succeeded, so a failed chunk
+        holds it back until a later pass fetches it; during a refresh, failed
+        rows keep their previous values.
+        """
+        table = self.table
+        refreshing = table.filled == len(table)
+        published = time.monotonic()
+        fetched = set()
+        for start in range(0 if refreshing else table.filled, len(table), self.chunk_size):
+            stop = min(start + self.chunk_size, len(table))
+            self.budget.acquire(stop - start)
+            try:
+                fetch_chunk(table, start, stop)
+                fetched.add(start)
+            except Exception as e:
+                count_error('weather.chunk', f"rows {start}-{stop}: {e}")
+            while table.filled in fetched:
+                table.filled = min(table.filled + self.chunk_size, len(table))
+            if publish and not refreshing and time.monotonic() - published >= PUBLISH_INTERVAL:
+                # Followers stream the first pass as it fills
+                self._publish()
+                published = time.monotonic()
+        if refreshing:
+            # Rows changed under clients that already have them
+            table.generation += 1
+        if publish:
+            self._publish()
+
+    def follow(self):
+        snapshot = read_snapshot('weather')
+        if snapshot is not None and snapshot.version != self.followed and self.table.adopt(snapshot):
+            self.followed = snapshot.version
+
+    def lead(self):
+        # A follower's columns are read-only maps; fetch into a fresh table
+        table = WeatherTable(self.locations)
+        snapshot = read_snapshot('weather', max_age=self.refresh)
+        seeded = table.seed(snapshot)
+        table.generation = self.table.generation + (0 if seeded else 1)
+        self.table = table
+        if seeded:
+            # Refresh when the seed would have been due, not a full interval on
+            time.sleep(max(0.0, self.refresh - (time.time() - snapshot.created)))
+        while True:
+            self.run_pass()
+            time.sleep(self.refresh if table.filled == len(table) else RETRY_INTERVAL)
+
+    def start(self):
+        if self.thread is not None:
+            return self
+
+        def run():
+            retry_at = 0.0
+            while True:
+                if time.monotonic() >= retry_at:
+                    self.lease = try_lease('weather')
+                if self.lease is not None:
+                    try:
+                        self.lead()
+                    except Exception as e:
+                        count_error('weather.lead', e)
+                    finally:
+                        # Free the lease for another process while this one backs off
+                        self.lease.close()
+                        self.lease = None
+                    retry_at = time.monotonic() + RETRY_INTERVAL
+                self.follow()
+                time.sleep(FOLLOW_INTERVAL)
+
+        self.thread = threading.Thread(target=run, name='gaia-weather', daemon=True)
+        self.thread.start()
+        return self
+
+
+@lru_cache(maxsize=None)
+def get_engine() -> WeatherEngine:
+    """The process-wide engine for the configured locations, started on first use."""
+    return WeatherEngine(configured_locations()).start()
+
+
+def fetch_locations_weather(locations: List[Dict], chunk_size: int = CHUNK_SIZE) -> List[Dict]:
+    """One blocking pass over ``locations``, as a list of records."""
+    engine = WeatherEngine(locations, chunk_size)
+    engine.run_pass(publish=False)
+    return engine.table.records()
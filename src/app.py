@@ -11,17 +11,15 @@ from dash import (
     clientside_callback,
     ctx,
 )
-from dash_extensions.enrich import (
-    DashProxy,
-    MultiplexerTransform
-)
-
 from utils.config.config import (
     PLOT_HEIGHT, 
     NEAREST_NEIGHBORS, 
-    MAX_SUGGESTIONS
+    MAX_SUGGESTIONS,
+    LIVE_POLL_INTERVAL,
+    WEATHER_STREAM_INTERVAL,
+    FAST_START
 )
-import dash_bootstrap_components as dbc, time
+import dash_bootstrap_components as dbc, time, os
 
 from datetime import datetime, timedelta
 
@@ -61,7 +59,62 @@ app.layout = dbc.Container([
                     dcc.Store(id='weather-data-store'),
                     dcc.Store(id='earthquake-data-store'),
                     dcc.Store(id='tide-data-store'),
+                    # Tide snapshot version, map view and stations whose
+                    # predictions have been patched into the hover texts
+                    dcc.Store(id='tide-viewport'),
+
+                    # Live earthquake push: the cursor is the last event seq this
+                    # client has, the delta holds the events sent since, and the
+                    # index maps layer names to trace positions
+                    dcc.Store(id='earthquake-cursor'),
+                    dcc.Store(id='earthquake-delta'),
+                    # Version of the swarm clusters drawn on this globe
+                    dcc.Store(id='swarm-version'),
+                    dcc.Store(id='layer-index-store'),
+                    dcc.Interval(id='earthquake-live-interval', interval=LIVE_POLL_INTERVAL),
+
+                    # Weather rows stream in as chunks complete; the cursor is
+                    # the table generation and row count this client has
+                    dcc.Store(id='weather-cursor'),
+                    dcc.Interval(id='weather-stream-interval', interval=WEATHER_STREAM_INTERVAL),
                     
+                    # Applied in the browser (assets/layers.js)
+                    dbc.Row([
+                        dbc.Col([
+                            dcc.Checklist(
+                                id='layer-toggles',
+                                options=['News Feed', 'Weather Stations', 'Earthquakes', 'Seismic Swarms', 'Tide Stations'],
+                                value=['News Feed', 'Weather Stations', 'Earthquakes', 'Seismic Swarms', 'Tide Stations'],
+                                inline=True,
+                                inputStyle={'marginRight': '6px', 'marginLeft': '14px'},
+                                style={'color': '#00ffaf'}
+                            )
+                        ], md=5),
+                        dbc.Col([
+                            dcc.Slider(
+                                id='quake-min-mag',
+                                min=0, max=8, step=0.5, value=0,
+                                marks={m: f"M{m}" for m in range(0, 9, 2)},
+                                tooltip={'placement': 'bottom'}
+                            )
+                        ], md=4),
+                        dbc.Col([
+                            dcc.RadioItems(
+                                id='quake-window',
+                                options=[
+                                    {'label': 'All', 'value': 0},
+                                    {'label': '1h', 'value': 1},
+                                    {'label': '6h', 'value': 6},
+                                    {'label': '24h', 'value': 24},
+                                ],
+                                value=0,
+                                inline=True,
+                                inputStyle={'marginRight': '6px', 'marginLeft': '14px'},
+                                style={'color': '#00ffaf'}
+                            )
+                        ], md=3),
+                    ], className="mb-2"),
+
                     dbc.Row([
                         dbc.Col([
                             dcc.Graph(
@@ -80,11 +133,44 @@ app.layout = dbc.Container([
         ])
     ], className="mb-4"),
 
+    # Seismic analytics over the rolling hourly aggregates
+    dbc.Row([
+        dbc.Col([
+            dcc.RadioItems(
+                id='seismic-chart-kind',
+                options=[
+                    {'label': 'Per hour', 'value': 'hourly'},
+                    {'label': 'By region', 'value': 'region'},
+                    {'label': 'Magnitude', 'value': 'magnitude'},
+                    {'label': 'Depth', 'value': 'depth'},
+                ],
+                value='hourly',
+                inline=True,
+                inputStyle={'marginRight': '6px', 'marginLeft': '14px'},
+                style={'color': '#00ffaf'}
+            ),
+            dcc.Store(id='seismic-chart-version'),
+            dcc.Graph(id='seismic-chart', className='cluster-barplot', config={'displayModeBar': False})
+        ])
+    ], className="mb-4"),
+
     html.Hr(style={'borderColor': '#00ffaf', 'marginTop': '40px', 'marginBottom': '20px'}),
 ], fluid=True)
 
 import utils.GAIAGX.Globe 
+from utils.GAIAGX.api import register_layer_api
+from utils.GAIAGX.monitoring import register_metrics
+from utils.GAIAGX.startup import register_health, start_warm_up, warm_up
+
+register_layer_api(app.server)
+register_metrics(app.server)
+register_health(app.server)
 
 if __name__ == '__main__':
-    app.run(debug=False, port=8080)
+    port = int(os.environ.get('GAIA_PORT', 8080))
+    if FAST_START:
+        start_warm_up(port)
+    else:
+        warm_up()
+    app.run(debug=False, port=port)
  
\ No newline at end of file
@@ -0,0 +1,106 @@
+// Client-side view of the globe layers: visibility toggles, the earthquake
+// magnitude and time filters, and live earthquake deltas. The full earthquake
+// layer is kept here, so none of these interactions round-trip to the server.
+window.dash_clientside = window.dash_clientside || {};
+
+(function () {
+    const DTYPES = {
+        f4: Float32Array, f8: Float64Array,
+        i1: Int8Array, i2: Int16Array, i4: Int32Array,
+        u1: Uint8Array, u2: Uint16Array, u4: Uint32Array
+    };
+
+    // Inverse of figures.typed_array: a {dtype, bdata} spec or a plain list
+    function decodeArray(value) {
+        if (!value) return [];
+        if (Array.isArray(value) || ArrayBuffer.isView(value)) return Array.from(value);
+        const binary = atob(value.bdata);
+        const bytes = new Uint8Array(binary.length);
+        for (let i = 0; i < binary.length; i++) bytes[i] = binary.charCodeAt(i);
+        return Array.from(new DTYPES[value.dtype](bytes.buffer));
+    }
+
+    // The full earthquake layer; source is the store it was first loaded from
+    const quakes = {source: null, head: 0, lats: [], lons: [], mags: [], times: [], texts: [], unids: []};
+    const FIELDS = ['lats', 'lons', 'mags', 'times', 'texts', 'unids'];
+
+    function columns(events) {
+        events = events || {};
+        return {
+            lats: decodeArray(events.lats),
+            lons: decodeArray(events.lons),
+            mags: decodeArray(events.mags),
+            times: (events.times || []).map(Date.parse),
+            texts: events.texts || [],
+            unids: events.unids || []
+        };
+    }
+
+    function applyDelta(delta) {
+        if (!delta || delta.head <= quakes.head) return false;
+        // Revised events overwrite their rows in place, matched by unid
+        const revised = columns(delta.revised);
+        revised.unids.forEach(function (unid, j) {
+            const i = quakes.unids.indexOf(unid);
+            if (i < 0) return;
+            for (const name of FIELDS) quakes[name][i] = revised[name][j];
+        });
+        // New events are appended and the oldest dropped, as in the
+        // server's ring buffer
+        const events = columns(delta.events);
+        for (const name of FIELDS) {
+            const merged = quakes[name].concat(events[name]);
+            quakes[name] = merged.slice(Math.max(0, merged.length - delta.capacity));
+        }
+        quakes.head = delta.head;
+        return true;
+    }
+
+    function filteredQuakes(minMag, hours) {
+        const cutoff = hours ? Date.now() - hours * 3600e3 : -Infinity;
+        const out = {lat: [], lon: [], text: [], size: []};
+        for (let i = 0; i < quakes.lats.length; i++) {
+            // Missing magnitudes or times (NaN) never filter an event out
+            if (quakes.mags[i] < minMag || quakes.times[i] < cutoff) continue;
+            out.lat.push(quakes.lats[i]);
+            out.lon.push(quakes.lons[i]);
+            out.text.push(quakes.texts[i]);
+            out.size.push(Math.max(4, (quakes.mags[i] || 0) * 2));
+        }
+        return out;
+    }
+
+    window.dash_clientside.gaia = {
+        decodeArray: decodeArray,
+
+        applyView: function (toggles, minMag, hours, layerIndex, delta, store, figure) {
+            const noUpdate = window.dash_clientside.no_update;
+            if (store !== quakes.source) {
+                Object.assign(quakes, columns(store), {source: store});
+            }
+            const triggered = (window.dash_clientside.callback_context.triggered || []).map(t => t.prop_id);
+            const applied = applyDelta(delta);
+            if (!applied && triggered.length === 1 && triggered[0] === 'earthquake-delta.data') {
+                return noUpdate;
+            }
+            if (!figure || !layerIndex) return noUpdate;
+
+            const shown = new Set(toggles || []);
+            const quakeIndex = layerIndex['Earthquakes'];
+            const data = figure.data.map(function (trace, i) {
+                if (!(trace.name in layerIndex)) return trace;
+                // legendonly keeps hidden layers in the legend, one click away
+                const next = Object.assign({}, trace, {visible: shown.has(trace.name) ? true : 'legendonly'});
+                if (i === quakeIndex) {
+                    const view = filteredQuakes(minMag || 0, hours || 0);
+                    next.lat = view.lat;
+                    next.lon = view.lon;
+                    next.text = view.text;
+                    next.marker = Object.assign({}, trace.marker, {size: view.size});
+                }
+                return next;
+            });
+            return Object.assign({}, figure, {data: data});
+        }
+    };
+})();
@@ -9,27 +9,98 @@ from dash import (
     MATCH, 
     ALL,
     clientside_callback,
-    ctx
+    ClientsideFunction,
+    ctx,
+    no_update,
+    Patch
 )
-import plotly.graph_objects as go, pandas, cudf
-from events.weather import get_major_cities_weather
+from datetime import datetime, timezone
+from functools import lru_cache
+import time
+import numpy as np
+from events.weather import get_weather_description, get_weather_icon
+from events.weather_layer import get_engine
 from events.population import fetch_live_population_data, fetch_rss_feeds
-from events.seismic import recent_events
-from events.tide import fetch_tide_stations
+from events.seismic import recent_events, event_columns, events_since, head_seq, MAX_EVENTS, MAG_EDGES, DEPTH_EDGES
+from events.tide import fetch_tide_catalogue, prediction_text, utc_day, warm_predictions
+from events.snapshot import load_layer, read_snapshot
+from events.metrics import count_error, register_collector
+from events.resilience import Unavailable, mark_partial, with_deadline
+from utils.config.config import (
+    SNAPSHOT_MAX_AGE,
+    CALLBACK_DEADLINE,
+    STALE_OPACITY,
+    TIDE_VIEWPORT_MIN_SCALE,
+    TIDE_VIEWPORT_MAX_STATIONS,
+    WEATHER_STREAM_INTERVAL,
+    WEATHER_IDLE_INTERVAL,
+    SEISMIC_TOP_REGIONS,
+    SWARM_COLORS
+)
+from utils.GAIAGX.figures import bar_chart, base_figure, layer_trace, with_layers, trace_index, typed_array, decode_array
 
 
-@callback(
-    Output('earth-globe', 'figure'),
-    Input('news-data-store', 'data'),  # Trigger on initial data load
-    prevent_initial_call=False
-)
-def update_base_globe(news_data):
-    population_data = fetch_live_population_data()
+def _as_list(values):
+    return values.tolist() if hasattr(values, 'tolist') else list(values)
+
+
+def _seismic_events():
+    # The listener may run in this process or publish from its own one
+    if recent_events:
+        return event_columns()
+    return read_snapshot('seismic')
+
+
+def _earthquake_texts(events):
+    # A missing magnitude is None from the live buffer and NaN from a snapshot
+    return [
+        f"🌎 <b>{region}</b><br>"
+        f"{'Depth' if mag is None or np.isnan(mag) else f'M{mag:.1f} at depth'} {depth:.1f} km<br>"
+        f"{time}"
+        for region, mag, depth, time in zip(
+            events['region'], events['mag'], events['depth'], events['time']
+        )
+    ]
+
+
+def _fetch_population_records():
+    return [{'country': k, 'population': v} for k, v in fetch_live_population_data().items()]
+
+
+def _expired(snapshot):
+    # load_layer only serves a snapshot this old when refreshing it failed
+    return time.time() - snapshot.created > SNAPSHOT_MAX_AGE
+
+
+def _stale_marker(snapshot, expired=None, rows=None):
+    """Marker opacity dimming rows a partial fetch could not refresh, or None."""
+    expired = _expired(snapshot) if expired is None else expired
+    if expired:
+        flags = np.ones(len(snapshot), dtype=bool)
+    elif 'stale' in snapshot:
+        flags = snapshot['stale'] > 0
+    else:
+        return None
+    if rows is not None:
+        flags = flags[rows]
+    if not flags.any():
+        return None
+    return {'opacity': typed_array(np.where(flags, STALE_OPACITY, 1.0))}
+
+
+@lru_cache(maxsize=4)
+def _base_figure(version, expired=False):
+    # One figure per population snapshot version, shared by every session
+    population = read_snapshot('population')
+    population_data = dict(zip(population['country'], _as_list(population['population']))) if population else {}
     significant_countries = {k: v for k, v in population_data.items() if v > 5}
     countries = list(significant_countries.keys())
     populations = list(significant_countries.values())
     
-    # Use cuDF instead of pandas for GPU acceleration
+    # Use cuDF instead of pandas for GPU acceleration; imported here because
+    # loading the CUDA runtime would otherwise delay server startup
+    import cudf
+
     df_globe = cudf.DataFrame({
         'country': list(significant_countries.keys()),
         'population': list(significant_countries.values())
@@ -40,264 +111,511 @@ def update_base_globe(news_data):
     # Convert back to pandas for Plotly compatibility if needed
     df_globe = df_globe.to_pandas()
 
-    fig = go.Figure(data=go.Choropleth(
-        locations=df_globe['country'],
-        z=df_globe['population'],
-        text=df_globe['hover_text'],
-        colorscale='twilight',
-        autocolorscale=False,
-        reversescale=False,
-        marker_line_width=0,
-        colorbar_title="Population<br>(Millions)",
-        colorbar=dict(
-            bgcolor='rgba(26, 31, 36, 0.8)',
-            tickfont=dict(color='#00ffaf')
-        ),
-        hoverinfo='text'
-    ))
+    marker = None
+    if population:
+        row = {country: i for i, country in enumerate(population['country'])}
+        marker = _stale_marker(population, expired, [row[c] for c in df_globe['country'].tolist()])
 
-    fig.update_geos(
-        projection_type='natural earth',
-        showland=True,
-        landcolor='#2A3238',
-        oceancolor='#1a1f24',
-        showocean=True,
-        showcountries=False,
-        showcoastlines=True,
-        coastlinecolor='#00ffaf',
-        coastlinewidth=1,
-        showframe=False,
-        projection_rotation=dict(lon=0, lat=0),  # Default center
-        bgcolor='rgba(0,0,0,0)',
-        resolution=50
+    # Static styling was validated once in figures; only the data is new here
+    return base_figure(
+        df_globe['country'].tolist(),
+        typed_array(df_globe['population'].to_numpy()),
+        df_globe['hover_text'].tolist(),
+        marker
     )
-    
-    fig.update_layout(
-        height=1200,
-        paper_bgcolor='rgba(0,0,0,0)',
-        plot_bgcolor='rgba(0,0,0,0)',
-        font=dict(color='#00ffaf', size=12),
-        margin=dict(l=0, r=0, t=50, b=0),
-        legend=dict(
-            x=0,
-            y=1,
-            xanchor='left',
-            yanchor='top',
-            bgcolor='rgba(26, 31, 36, 0.8)',
-            font=dict(color='#00ffaf')
-        ),
-        uirevision='constant',
-        hovermode='closest',
-        # Configure drag interactions - moved from update_geos
-        dragmode=False,  # Disable default drag behavior
-        # For geo plots, we need to use specific geo configuration
-        geo=dict(
-            # Lock the view to prevent vertical movement
-            center=dict(lat=0, lon=0),
-            projection_rotation=dict(lon=0, lat=0, roll=0),
-            # Disable user interaction that would allow vertical movement
-            # This is achieved by not enabling any drag modes that allow tilt
-        )
-    )
-    
-    # Add custom configuration to restrict movement
-    fig.update_layout(
-        # Disable the ability to tilt/rotate vertically
-        scene=dict(
-            camera=dict(
-                up=dict(x=0, y=0, z=1),
-                eye=dict(x=0, y=0, z=1.5),
-                projection=dict(type="orthographic")
-            )
-        ) if 'scene' in fig.to_dict() else {}
-    )
-    
-    return fig
+
+
+def _population_figure():
+    population = load_layer('population', _fetch_population_records, max_age=SNAPSHOT_MAX_AGE)
+    if population is None:
+        return _base_figure(0)
+    return _base_figure(population.version, _expired(population))
+
+
+@callback(
+    Output('earth-globe', 'figure'),
+    Input('news-data-store', 'data'),  # Trigger on initial data load
+    prevent_initial_call=False
+)
+@with_deadline(CALLBACK_DEADLINE)
+def update_base_globe(news_data):
+    return _population_figure()
 
 @callback(
     Output('news-data-store', 'data'),
     Input('earth-globe', 'id'),  # Trigger on initial load
     prevent_initial_call=False
 )
+@with_deadline(CALLBACK_DEADLINE)
 def fetch_news_data(globe_id):
     try:
-        rss_data = fetch_rss_feeds()
+        rss_data = load_layer('news', fetch_rss_feeds, max_age=SNAPSHOT_MAX_AGE)
         if rss_data:
             return {
-                'lats': [item['lat'] for item in rss_data],
-                'lons': [item['lon'] for item in rss_data],
+                'lats': typed_array(rss_data['lat']),
+                'lons': typed_array(rss_data['lon']),
                 'texts': [
                     f"<b>{item['title']}</b><br>{item['published']}<br>{item['summary']}" +
                     (f"<br><br>🌡️ <b>Current Weather:</b><br>"
                      f"{item['weather_icon']} {item['weather_description']}<br>"
                      f"Temperature: {item['temperature']}<br>"
                      f"Humidity: {item['humidity']}<br>"
-                     f"Precipitation: {item['precipitation']}" if 'temperature' in item else "") +
+                     f"Precipitation: {item['precipitation']}" if item.get('temperature') else "") +
                     f"<br><a href='{item['link']}' target='_blank'>Read more</a>"
-                    for item in rss_data
-                ]
+                    for item in rss_data.iter_rows()
+                ],
+                'marker': _stale_marker(rss_data)
             }
-    except:
-        pass
+    except Exception as e:
+        count_error('callback.fetch_news_data', e)
     return None
 
+def _weather_store(table, start, stop, encode=typed_array):
+    cols = table.columns(start, stop)
+    # Rows that were never fetched (weather_code -1) are left off the map
+    valid = cols['weather_code'] >= 0
+    if not valid.all():
+        rows = np.flatnonzero(valid)
+        cols = {name: [values[i] for i in rows] if isinstance(values, list) else values[rows]
+                for name, values in cols.items()}
+    conditions = {}
+    customdata = []
+    for name, code, temperature, humidity, precipitation in zip(
+        cols['name'], cols['weather_code'].tolist(), cols['temperature'].tolist(),
+        cols['humidity'].tolist(), cols['precipitation'].tolist()
+    ):
+        if code not in conditions:
+            conditions[code] = f"{get_weather_icon(code)} {get_weather_description(code)}"
+        customdata.append([name, conditions[code], temperature, humidity, precipitation])
+    return {
+        'lats': encode(cols['lat']),
+        'lons': encode(cols['lon']),
+        'customdata': customdata
+    }
+
+
 @callback(
     Output('weather-data-store', 'data'),
+    Output('weather-cursor', 'data'),
     Input('earth-globe', 'id'),  # Trigger on initial load
     prevent_initial_call=False
 )
 def fetch_weather_data(globe_id):
+    # Returns whatever rows are filled so far; stream_weather_chunks sends the rest
     try:
-        cities_weather = get_major_cities_weather()
-        if cities_weather:
-            return {
-                'lats': [city['lat'] for city in cities_weather],
-                'lons': [city['lon'] for city in cities_weather],
-                'texts': [
-                    f"<b>{city['name']}</b><br>"
-                    f"{city['weather_icon']} {city['weather_description']}<br>"
-                    f"🌡️ Temperature: {city['temperature']:.1f}°C<br>"
-                    f"💧 Humidity: {city['humidity']:.0f}%<br>"
-                    f"🌧️ Precipitation: {city['precipitation']:.1f}mm"
-                    for city in cities_weather
-                ]
-            }
-    except:
-        pass
-    return None
+        table = get_engine().table
+        filled, generation = table.filled, table.generation
+        return _weather_store(table, 0, filled), {'generation': generation, 'rows': filled}
+    except Exception as e:
+        count_error('callback.fetch_weather_data', e)
+    return None, None
+
+
+@callback(
+    Output('earth-globe', 'extendData', allow_duplicate=True),
+    Output('earth-globe', 'figure', allow_duplicate=True),
+    Output('weather-cursor', 'data', allow_duplicate=True),
+    Output('weather-stream-interval', 'interval'),
+    Input('weather-stream-interval', 'n_intervals'),
+    State('weather-cursor', 'data'),
+    State('layer-index-store', 'data'),
+    prevent_initial_call=True
+)
+def stream_weather_chunks(n_intervals, cursor, layer_index):
+    if not cursor or not layer_index or 'Weather Stations' not in layer_index:
+        return no_update, no_update, no_update, no_update
+
+    table = get_engine().table
+    filled, generation = table.filled, table.generation
+    interval = WEATHER_STREAM_INTERVAL if filled < len(table) else WEATHER_IDLE_INTERVAL
+    index = layer_index['Weather Stations']
+    new_cursor = {'generation': generation, 'rows': filled}
+
+    if generation != cursor['generation']:
+        # A refresh pass rewrote rows this client already has
+        data = _weather_store(table, 0, filled)
+        patched = Patch()
+        trace = patched['data'][index]
+        trace['lat'] = data['lats']
+        trace['lon'] = data['lons']
+        trace['customdata'] = data['customdata']
+        return no_update, patched, new_cursor, interval
+
+    if filled <= cursor['rows']:
+        return no_update, no_update, no_update, interval
+
+    # extendData goes through Plotly.extendTraces, which takes plain arrays
+    data = _weather_store(table, cursor['rows'], filled, encode=_as_list)
+    update = {'lat': [data['lats']], 'lon': [data['lons']], 'customdata': [data['customdata']]}
+    return [update, [index]], no_update, new_cursor, interval
 
 @callback(
     Output('earthquake-data-store', 'data'),
+    Output('earthquake-cursor', 'data'),
     Input('earth-globe', 'id'),  # Trigger on initial load
     prevent_initial_call=False
 )
 def fetch_earthquake_data(globe_id):
     try:
-        if recent_events:
-            return {
-                'lats': [e['lat'] for e in recent_events],
-                'lons': [e['lon'] for e in recent_events],
-                'mags': [e['mag'] for e in recent_events],
-                'texts': [
-                    f"🌎 <b>{e['region']}</b><br>"
-                    f"M{e['mag']:.1f} at depth {e['depth']:.1f} km<br>"
-                    f"{e['time']}"
-                    for e in recent_events
-                ]
-            }
-    except:
-        pass
-    return None
+        events = _seismic_events()
+        if events and len(events['lat']):
+            return _earthquake_store(events), head_seq(events)
+    except Exception as e:
+        count_error('callback.fetch_earthquake_data', e)
+    return None, 0
+
+def _earthquake_store(events):
+    # times stay ISO strings; the browser parses them for the time filter
+    return {
+        'lats': typed_array(events['lat']),
+        'lons': typed_array(events['lon']),
+        'mags': typed_array(events['mag']),
+        'texts': _earthquake_texts(events),
+        'times': _as_list(events['time']),
+        # Revisions in a live delta are matched to the client's rows by unid
+        'unids': _as_list(events['unid'])
+    }
+
+def _earthquake_sizes(mags):
+    # fmax gives events without a magnitude (NaN) the smallest marker
+    return typed_array(np.fmax(4, decode_array(mags) * 2))
+
+@lru_cache(maxsize=256)
+def _earthquake_delta(head, cursor):
+    # Keyed on the stream head so every dashboard at the same cursor shares
+    # one result until new events arrive
+    events = _seismic_events()
+    appended, revised = events_since(events, cursor)
+    if not len(appended['seq']) and not revised['seq']:
+        return None
+    # Revised rows go out on their own for the browser to upsert by unid
+    return _earthquake_store(appended), _earthquake_store(revised) if revised['seq'] else None
+
+@register_collector
+def earthquake_delta_metrics():
+    info = _earthquake_delta.cache_info()
+    return [
+        "# HELP gaia_cache_lru In-process lru_cache lookups by cache and result.",
+        "# TYPE gaia_cache_lru counter",
+        f'gaia_cache_lru_total{{cache="earthquake_delta",result="hit"}} {info.hits}',
+        f'gaia_cache_lru_total{{cache="earthquake_delta",result="miss"}} {info.misses}',
+    ]
+
+@callback(
+    Output('earthquake-delta', 'data'),
+    Output('earthquake-cursor', 'data', allow_duplicate=True),
+    Input('earthquake-live-interval', 'n_intervals'),
+    State('earthquake-cursor', 'data'),
+    prevent_initial_call=True
+)
+def push_earthquake_updates(n_intervals, cursor):
+    # Only the new events go out; the browser keeps the full layer and
+    # redraws it through the view filters in assets/layers.js
+    if cursor is None:
+        return no_update, no_update
+
+    events = _seismic_events()
+    head = head_seq(events) if events else 0
+    if head <= cursor:
+        return no_update, no_update
+
+    delta = _earthquake_delta(head, cursor)
+    if delta is None:
+        return no_update, head
+    appended, revised = delta
+    return {'head': head, 'cursor': cursor, 'events': appended, 'revised': revised, 'capacity': MAX_EVENTS}, head
+
+def _bin_labels(edges, unit=''):
+    labels = [f"{lo:g}–{hi:g}{unit}" for lo, hi in zip(edges[:-1], edges[1:])]
+    return labels + [f"{edges[-1]:g}+{unit}"]
+
+
+@lru_cache(maxsize=8)
+def _seismic_chart(kind, version):
+    # Reads the pre-aggregated buckets, so the cost is independent of how
+    # many events have been ingested
+    if kind == 'region':
+        regions = read_snapshot('seismic_regions')
+        totals = regions['hourly'].sum(axis=1)
+        top = np.argsort(totals, kind='stable')[::-1][:SEISMIC_TOP_REGIONS][::-1]
+        top = top[totals[top] > 0]
+        names = regions['region']
+        return bar_chart(
+            [names[i] for i in top], typed_array(totals[top], 'i4'), "Events by region", horizontal=True
+        )
+
+    hours = read_snapshot('seismic_hours')
+    if kind == 'magnitude':
+        return bar_chart(_bin_labels(MAG_EDGES), typed_array(hours['mag'].sum(axis=0), 'i4'), "Magnitude distribution")
+    if kind == 'depth':
+        return bar_chart(
+            _bin_labels(DEPTH_EDGES, ' km'), typed_array(hours['depth'].sum(axis=0), 'i4'), "Depth distribution"
+        )
+    labels = [datetime.fromtimestamp(h * 3600, timezone.utc).strftime('%d %b %H:00') for h in hours['hour']]
+    return bar_chart(labels, typed_array(hours['events'], 'i4'), "Events per hour (UTC)")
+
+
+@callback(
+    Output('seismic-chart', 'figure'),
+    Output('seismic-chart-version', 'data'),
+    Input('earthquake-live-interval', 'n_intervals'),
+    Input('seismic-chart-kind', 'value'),
+    State('seismic-chart-version', 'data'),
+)
+def update_seismic_chart(n_intervals, kind, shown):
+    hours = read_snapshot('seismic_hours')
+    if hours is None or read_snapshot('seismic_regions') is None:
+        return bar_chart([], [], "Waiting for seismic events"), None
+    key = [kind, hours.version]
+    if key == shown:
+        return no_update, no_update
+    try:
+        return _seismic_chart(kind, hours.version), key
+    except Exception as e:
+        count_error('callback.update_seismic_chart', e)
+        return no_update, no_update
+
+
+def _swarm_texts(clusters):
+    return [
+        f"🔶 <b>{'Aftershock sequence' if kind == 'aftershocks' else 'Swarm'}</b><br>"
+        f"{region}<br>"
+        # A cluster with no reported magnitudes has max_mag NaN
+        f"{count} events{'' if np.isnan(mag) else f', largest M{mag:.1f}'}<br>"
+        f"{datetime.fromtimestamp(first, timezone.utc):%d %b %H:%M} – "
+        f"{datetime.fromtimestamp(last, timezone.utc):%d %b %H:%M} UTC"
+        for kind, region, count, mag, first, last in zip(
+            clusters['kind'], clusters['region'], clusters['count'],
+            clusters['max_mag'], clusters['first'], clusters['last']
+        )
+    ]
+
+
+@lru_cache(maxsize=4)
+def _swarm_trace(version):
+    clusters = read_snapshot('seismic_clusters')
+    if clusters is None or not len(clusters):
+        return {'lat': [], 'lon': [], 'text': [], 'size': [], 'color': []}
+    return {
+        'lat': typed_array(clusters['lat']),
+        'lon': typed_array(clusters['lon']),
+        'text': _swarm_texts(clusters),
+        # Area grows with the event count
+        'size': typed_array(10 + 4 * np.sqrt(clusters['count'])),
+        'color': [SWARM_COLORS.get(kind, SWARM_COLORS['swarm']) for kind in clusters['kind']],
+    }
+
+
+@callback(
+    Output('earth-globe', 'figure', allow_duplicate=True),
+    Output('swarm-version', 'data'),
+    Input('earthquake-live-interval', 'n_intervals'),
+    Input('layer-index-store', 'data'),
+    State('swarm-version', 'data'),
+    prevent_initial_call=True
+)
+def update_swarm_layer(n_intervals, layer_index, shown):
+    if not layer_index or 'Seismic Swarms' not in layer_index:
+        return no_update, no_update
+    clusters = read_snapshot('seismic_clusters')
+    version = clusters.version if clusters else 0
+    # A rebuilt figure starts with an empty swarm trace
+    if version == shown and 'layer-index-store.data' not in ctx.triggered_prop_ids:
+        return no_update, no_update
+
+    trace = _swarm_trace(version)
+    patched = Patch()
+    target = patched['data'][layer_index['Seismic Swarms']]
+    target['lat'] = trace['lat']
+    target['lon'] = trace['lon']
+    target['text'] = trace['text']
+    target['marker']['size'] = trace['size']
+    target['marker']['color'] = trace['color']
+    target['marker']['line']['color'] = trace['color']
+    return patched, version
+
+
+# Layer visibility, the earthquake filters and live earthquake deltas are
+# applied in the browser by assets/layers.js; none of them reach the server
+clientside_callback(
+    ClientsideFunction(namespace='gaia', function_name='applyView'),
+    Output('earth-globe', 'figure', allow_duplicate=True),
+    Input('layer-toggles', 'value'),
+    Input('quake-min-mag', 'value'),
+    Input('quake-window', 'value'),
+    Input('layer-index-store', 'data'),
+    Input('earthquake-delta', 'data'),
+    State('earthquake-data-store', 'data'),
+    State('earth-globe', 'figure'),
+    prevent_initial_call=True
+)
+
+
+def _tide_text(name, station_id, predictions=None):
+    return (
+        f"<b>🌊 {name}</b><br>{predictions or 'Click for tide predictions'}<br>"
+        f"<a href='https://surftruths.com/api/tide/stations/{station_id}.json' target='_blank'>View Station</a>"
+    )
+
 
 @callback(
     Output('tide-data-store', 'data'),
+    Output('tide-viewport', 'data'),
     Input('earth-globe', 'id'),  # Trigger on initial load
     prevent_initial_call=False
 )
+@with_deadline(CALLBACK_DEADLINE)
 def fetch_tide_data(globe_id):
+    # The whole catalogue is one cheap cached list; predictions are loaded
+    # per station by load_tide_predictions once a station is in view or clicked
     try:
-        tide_stations = fetch_tide_stations(max_stations=50)
+        tide_stations = load_layer('tide', fetch_tide_catalogue, max_age=SNAPSHOT_MAX_AGE)
         if tide_stations:
-            return {
-                'lats': [t['lat'] for t in tide_stations],
-                'lons': [t['lon'] for t in tide_stations],
-                'texts': [
-                    f"<b>🌊 {t['name']}</b><br>{t['predictions']}<br>"
-                    f"<a href='https://surftruths.com/api/tide/stations/{t['id']}.json' target='_blank'>View Station</a>"
-                    for t in tide_stations
-                ],
-                'ids': [t['id'] for t in tide_stations]
+            store = {
+                'lats': typed_array(tide_stations['lat']),
+                'lons': typed_array(tide_stations['lon']),
+                'texts': [_tide_text(t['name'], t['id']) for t in tide_stations.iter_rows()],
+                'ids': _as_list(tide_stations['id']),
+                'marker': _stale_marker(tide_stations)
             }
-    except:
-        pass
-    return None
+            return store, {'version': tide_stations.version, 'loaded': []}
+    except Exception as e:
+        count_error('callback.fetch_tide_data', e)
+    return None, None
+
+
+def _geo_view(relayout, view):
+    # relayoutData only carries the keys that changed
+    view = dict(view)
+    for key, name in (('geo.center.lon', 'lon'), ('geo.projection.rotation.lon', 'lon'),
+                      ('geo.center.lat', 'lat'), ('geo.projection.scale', 'scale')):
+        if key in relayout:
+            view[name] = relayout[key]
+    return view
+
+
+def _stations_in_view(stations, view, exclude):
+    """Indices of stations inside the visible box, nearest to its centre first."""
+    scale = view.get('scale', 1)
+    if scale < TIDE_VIEWPORT_MIN_SCALE:
+        return []
+    # At scale s the natural earth projection shows roughly 360/s by 180/s degrees
+    dlon = (stations['lon'] - view.get('lon', 0) + 180) % 360 - 180
+    dlat = stations['lat'] - view.get('lat', 0)
+    visible = (np.abs(dlon) <= 180 / scale) & (np.abs(dlat) <= 90 / scale)
+    if exclude:
+        visible[list(exclude)] = False
+    candidates = np.flatnonzero(visible)
+    order = np.argsort(dlon[candidates] ** 2 + dlat[candidates] ** 2)
+    return candidates[order[:TIDE_VIEWPORT_MAX_STATIONS]].tolist()
+
 
 @callback(
     Output('earth-globe', 'figure', allow_duplicate=True),
+    Output('tide-viewport', 'data', allow_duplicate=True),
+    Input('earth-globe', 'relayoutData'),
+    Input('earth-globe', 'clickData'),
+    State('tide-viewport', 'data'),
+    State('layer-index-store', 'data'),
+    prevent_initial_call=True
+)
+@with_deadline(CALLBACK_DEADLINE)
+def load_tide_predictions(relayout, click, viewport, layer_index):
+    if not viewport or not layer_index or 'Tide Stations' not in layer_index:
+        return no_update, no_update
+    index = layer_index['Tide Stations']
+    stations = read_snapshot('tide')
+    # Indices refer to the snapshot the trace was drawn from
+    if stations is None or stations.version != viewport['version']:
+        return no_update, no_update
+
+    loaded = set(viewport['loaded'])
+    if 'earth-globe.clickData' in ctx.triggered_prop_ids:
+        points = [p for p in (click or {}).get('points', []) if p.get('curveNumber') == index]
+        wanted = [p['pointIndex'] for p in points if p['pointIndex'] not in loaded]
+    else:
+        viewport = {**viewport, 'view': _geo_view(relayout or {}, viewport.get('view', {}))}
+        wanted = _stations_in_view(stations, viewport['view'], loaded)
+    if not wanted:
+        return no_update, viewport
+
+    day = utc_day()
+    patched = Patch()
+    texts = patched['data'][index]['text']
+    names, ids = stations['name'], _as_list(stations['id'])
+    # One concurrent round for the stations not cached yet; the loop below
+    # then formats from the cache
+    warm_predictions([ids[i] for i in wanted], day)
+    for i in wanted:
+        try:
+            predictions = prediction_text(ids[i], day) or 'No predictions for today'
+            texts[i] = _tide_text(names[i], ids[i], predictions)
+            loaded.add(i)
+        except Unavailable as e:
+            # Out of time or surftruths is down; the rest load on a later view
+            mark_partial(f"tide.predictions: {e}")
+            break
+        except Exception as e:
+            count_error('callback.load_tide_predictions', f"{names[i]}: {e}")
+    return patched, {**viewport, 'loaded': sorted(loaded)}
+
+@callback(
+    Output('earth-globe', 'figure', allow_duplicate=True),
+    Output('layer-index-store', 'data'),
+    Output('weather-cursor', 'data', allow_duplicate=True),
+    Output('tide-viewport', 'data', allow_duplicate=True),
     [Input('news-data-store', 'data'),
      Input('weather-data-store', 'data'),
      Input('earthquake-data-store', 'data'),
      Input('tide-data-store', 'data')],
-    State('earth-globe', 'figure'),
+    State('tide-viewport', 'data'),
     prevent_initial_call=True
 )
-def add_data_layers(news_data, weather_data, earthquake_data, tide_data, current_fig):
-    if current_fig is None:
-        return current_fig
-    
-    fig = go.Figure(current_fig)
-    
-    fig.data = [trace for trace in fig.data if trace.type == 'choropleth']
-    
+@with_deadline(CALLBACK_DEADLINE)
+def add_data_layers(news_data, weather_data, earthquake_data, tide_data, tide_viewport=None):
+    # The base comes from the server-side cache rather than State: plotly.js
+    # decodes typed arrays in place, so the client copy is not worth uploading
+    base = _population_figure()
+
+    traces = []
+
     # Add news feed layer
     if news_data:
-        fig.add_trace(go.Scattergeo(
-            lon=news_data['lons'],
-            lat=news_data['lats'],
-            text=news_data['texts'],
-            mode='markers',
-            hoverinfo='text',
-            name='News Feed',
-            showlegend=True,
-            marker=dict(
-                size=8,
-                color='#00ffaf',
-                symbol='circle'
-            )
+        traces.append(layer_trace(
+            'News Feed', news_data['lons'], news_data['lats'], news_data['texts'], marker=news_data.get('marker')
         ))
-    
-    # Add weather layer
+
+    # Add weather layer; built from the live table rather than the store,
+    # which still holds the first load, so rows already streamed in through
+    # extendData survive the rebuild and the cursor moves to match
+    weather_cursor = no_update
     if weather_data:
-        fig.add_trace(go.Scattergeo(
-            lon=weather_data['lons'],
-            lat=weather_data['lats'],
-            text=weather_data['texts'],
-            mode='markers',
-            hoverinfo='text',
-            name='Weather Stations',
-            showlegend=True,
-            marker=dict(
-                size=15,
-                color='#ff6b6b',
-                symbol='arrow',
-                line=dict(width=1, color='white')
-            )
-        ))
-    
-    # Add earthquake layer
-    if earthquake_data:
-        fig.add_trace(go.Scattergeo(
-            lon=earthquake_data['lons'],
-            lat=earthquake_data['lats'],
-            text=earthquake_data['texts'],
-            mode='markers',
-            hoverinfo='text',
-            name='Earthquakes',
-            marker=dict(
-                size=[max(4, m * 2) for m in earthquake_data['mags']],
-                color='red',
-                opacity=0.7,
-                line=dict(width=1, color='white'),
-                symbol='circle'
-            )
+        table = get_engine().table
+        filled, generation = table.filled, table.generation
+        weather_data = _weather_store(table, 0, filled)
+        weather_cursor = {'generation': generation, 'rows': filled}
+        traces.append(layer_trace(
+            'Weather Stations', weather_data['lons'], weather_data['lats'],
+            customdata=weather_data['customdata']
         ))
-    
-    # Add tide layer
+
+    # Add earthquake layer; kept even when empty so live updates have a target
+    earthquake_data = earthquake_data or {'lons': [], 'lats': [], 'texts': [], 'mags': []}
+    traces.append(layer_trace(
+        'Earthquakes', earthquake_data['lons'], earthquake_data['lats'], earthquake_data['texts'],
+        marker={'size': _earthquake_sizes(earthquake_data['mags'])}
+    ))
+
+    # Swarm clusters are patched in by update_swarm_layer
+    traces.append(layer_trace('Seismic Swarms', [], [], []))
+
+    # Add tide layer; the rebuilt trace has none of the patched prediction
+    # texts, so load_tide_predictions has to load those stations again
+    tide_viewport = {**tide_viewport, 'loaded': []} if tide_data and tide_viewport else no_update
     if tide_data:
-        fig.add_trace(go.Scattergeo(
-            lon=tide_data['lons'],
-            lat=tide_data['lats'],
-            text=tide_data['texts'],
-            mode='markers',
-            hoverinfo='text',
-            name='Tide Stations',
-            marker=dict(
-                size=12,
-                color='blue',
-                symbol='triangle-up',
-                line=dict(width=1, color='white')
-            )
+        traces.append(layer_trace(
+            'Tide Stations', tide_data['lons'], tide_data['lats'], tide_data['texts'], marker=tide_data.get('marker')
         ))
-    
-    return fig
- 
\ No newline at end of file
+
+    fig = with_layers(base, traces)
+    return fig, trace_index(fig), weather_cursor, tide_viewport
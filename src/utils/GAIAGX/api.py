@@ -0,0 +1,199 @@
+import gzip
+import json
+import math
+import threading
+from collections import OrderedDict
+
+from flask import Blueprint, Response, abort, jsonify, request
+
+from events.metrics import count_cache
+from events.snapshot import LAYERS, read_snapshot
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+API_PREFIX = '/api/v1'
+FORMATS = {
+    'json': 'application/json',
+    'geojson': 'application/geo+json',
+    'arrow': 'application/vnd.apache.arrow.stream',
+}
+MIN_COMPRESS_BYTES = 1024
+BODY_CACHE_SIZE = 64
+
+layer_api = Blueprint('layer_api', __name__, url_prefix=API_PREFIX)
+
+# Encoded bodies keyed by (layer, version, format, encoding); a version is
+# immutable, so each representation is rendered and compressed only once
+_bodies = OrderedDict()
+_bodies_lock = threading.Lock()
+
+
+def _clean(values):
+    values = values.tolist() if hasattr(values, 'tolist') else list(values)
+    return [None if isinstance(v, float) and math.isnan(v) else v for v in values]
+
+
+def _render_json(snapshot):
+    return json.dumps({
+        'layer': snapshot.layer,
+        'version': snapshot.version,
+        'created': snapshot.created,
+        'rows': len(snapshot),
+        'columns': {name: _clean(snapshot[name]) for name in snapshot.names},
+    }, ensure_ascii=False, allow_nan=False).encode('utf-8')
+
+
+def _render_geojson(snapshot):
+    if 'lat' not in snapshot or 'lon' not in snapshot:
+        abort(406, description=f"Layer '{snapshot.layer}' has no coordinates")
+
+    props = [name for name in snapshot.names if name not in ('lat', 'lon')]
+    columns = {name: _clean(snapshot[name]) for name in props}
+    lats, lons = _clean(snapshot['lat']), _clean(snapshot['lon'])
+    features = [
+        {
+            'type': 'Feature',
+            'geometry': {'type': 'Point', 'coordinates': [lons[i], lats[i]]},
+            'properties': {name: columns[name][i] for name in props},
+        }
+        for i in range(len(snapshot))
+    ]
+    return json.dumps({
+        'type': 'FeatureCollection',
+        'version': snapshot.version,
+        'features': features,
+    }, ensure_ascii=False, allow_nan=False).encode('utf-8')
+
+
+def _render_arrow(snapshot):
+    # pyarrow is optional and slow to import, so it is loaded on first use
+    try:
+        import pyarrow as pa
+    except ImportError:
+        abort(406, description="Arrow output needs pyarrow installed")
+
+    table = pa.table({name: snapshot[name] for name in snapshot.names})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+RENDERERS = {
+    'json': _render_json,
+    'geojson': _render_geojson,
+    'arrow': _render_arrow,
+}
+
+
+def _negotiate_encoding():
+    accepted = {}
+    for part in request.headers.get('Accept-Encoding', '').split(','):
+        coding, _, params = part.strip().partition(';')
+        q = 1.0
+        if params.strip().startswith('q='):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        if coding:
+            accepted[coding.strip().lower()] = q
+
+    for coding in ('br', 'gzip'):
+        if coding == 'br' and brotli is None:
+            continue
+        if accepted.get(coding, accepted.get('*', 0)) > 0:
+            return coding
+    return 'identity'
+
+
+def _compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=5)
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=6)
+    return body
+
+
+def _etag_matches(etag):
+    header = request.headers.get('If-None-Match')
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+    # If-None-Match uses weak comparison, so ignore any W/ prefix
+    tags = [t.strip() for t in header.split(',')]
+    return any((t[2:] if t.startswith('W/') else t) == etag for t in tags)
+
+
+def _body(snapshot, fmt, encoding):
+    key = (snapshot.layer, snapshot.version, fmt, encoding)
+    with _bodies_lock:
+        if key in _bodies:
+            _bodies.move_to_end(key)
+            count_cache('api.bodies', True)
+            return _bodies[key]
+    count_cache('api.bodies', False)
+
+    body = RENDERERS[fmt](snapshot)
+    if len(body) < MIN_COMPRESS_BYTES:
+        encoding = 'identity'
+    body = (_compress(body, encoding), encoding)
+
+    with _bodies_lock:
+        _bodies[key] = body
+        while len(_bodies) > BODY_CACHE_SIZE:
+            _bodies.popitem(last=False)
+    return body
+
+
+@layer_api.route('/layers')
+def list_layers():
+    layers = {}
+    for layer in LAYERS:
+        snapshot = read_snapshot(layer)
+        layers[layer] = {
+            'version': snapshot.version,
+            'created': snapshot.created,
+            'rows': len(snapshot),
+            'url': f"{API_PREFIX}/layers/{layer}",
+        } if snapshot else None
+    return jsonify(layers)
+
+
+@layer_api.route('/layers/<layer>')
+def get_layer(layer):
+    if layer not in LAYERS:
+        abort(404, description=f"Unknown layer '{layer}'")
+    fmt = request.args.get('format', 'json').lower()
+    if fmt not in FORMATS:
+        abort(400, description=f"Unsupported format '{fmt}'")
+
+    snapshot = read_snapshot(layer)
+    if snapshot is None:
+        response = jsonify({'error': f"Layer '{layer}' has not been published yet"})
+        response.status_code = 503
+        response.headers['Retry-After'] = '30'
+        return response
+
+    # Bodies are cached per version, so resolving the representation before
+    # the conditional check is cheap and keeps the tag tied to the bytes sent
+    body, encoding = _body(snapshot, fmt, _negotiate_encoding())
+    headers = {
+        'ETag': f'"{layer}-{snapshot.version}-{fmt}-{encoding}"',
+        'Cache-Control': 'no-cache',
+        'Vary': 'Accept-Encoding',
+    }
+    if _etag_matches(headers['ETag']):
+        return Response(status=304, headers=headers)
+
+    if encoding != 'identity':
+        headers['Content-Encoding'] = encoding
+    return Response(body, mimetype=FORMATS[fmt], headers=headers)
+
+
+def register_layer_api(server):
+    server.register_blueprint(layer_api)
@@ -0,0 +1,246 @@
+import base64
+import json
+from functools import lru_cache
+
+import numpy as np
+import plotly.graph_objects as go
+from plotly.io.json import to_json_plotly
+
+from utils.config.config import TYPED_ARRAYS
+
+# Static styling for every trace and the base layout. These go through
+# plotly's validators exactly once (see templates()); callbacks then assemble
+# plain dicts around them, which is what Dash serialises anyway.
+
+CHOROPLETH_STYLE = dict(
+    colorscale='twilight',
+    autocolorscale=False,
+    reversescale=False,
+    marker_line_width=0,
+    colorbar_title="Population<br>(Millions)",
+    colorbar=dict(
+        bgcolor='rgba(26, 31, 36, 0.8)',
+        tickfont=dict(color='#00ffaf')
+    ),
+    hoverinfo='text'
+)
+
+LAYER_STYLES = {
+    'News Feed': dict(
+        mode='markers',
+        hoverinfo='text',
+        showlegend=True,
+        marker=dict(
+            size=8,
+            color='#00ffaf',
+            symbol='circle'
+        )
+    ),
+    'Weather Stations': dict(
+        mode='markers',
+        # customdata rows are [name, icon and description, temperature,
+        # humidity, precipitation]; formatting happens in the browser
+        hovertemplate=(
+            "<b>%{customdata[0]}</b><br>"
+            "%{customdata[1]}<br>"
+            "🌡️ Temperature: %{customdata[2]:.1f}°C<br>"
+            "💧 Humidity: %{customdata[3]:.0f}%<br>"
+            "🌧️ Precipitation: %{customdata[4]:.1f}mm"
+            "<extra></extra>"
+        ),
+        showlegend=True,
+        marker=dict(
+            size=15,
+            color='#ff6b6b',
+            symbol='arrow',
+            line=dict(width=1, color='white')
+        )
+    ),
+    'Earthquakes': dict(
+        mode='markers',
+        hoverinfo='text',
+        marker=dict(
+            color='red',
+            opacity=0.7,
+            line=dict(width=1, color='white'),
+            symbol='circle'
+        )
+    ),
+    # Cluster centroids; size and colour are set per cluster
+    'Seismic Swarms': dict(
+        mode='markers',
+        hoverinfo='text',
+        marker=dict(
+            symbol='circle-open',
+            opacity=0.9,
+            line=dict(width=3)
+        )
+    ),
+    'Tide Stations': dict(
+        mode='markers',
+        hoverinfo='text',
+        marker=dict(
+            size=12,
+            color='blue',
+            symbol='triangle-up',
+            line=dict(width=1, color='white')
+        )
+    ),
+}
+
+# Seismic analytics bar charts, drawn inside a .cluster-barplot container
+CHART_BAR_STYLE = dict(
+    marker=dict(color='#00ffaf', line=dict(width=0)),
+    hoverinfo='x+y',
+    showlegend=False
+)
+
+CHART_LAYOUT_STYLE = dict(
+    height=420,
+    paper_bgcolor='rgba(0,0,0,0)',
+    plot_bgcolor='rgba(0,0,0,0)',
+    font=dict(color='#00ffaf', size=12),
+    margin=dict(l=10, r=10, t=50, b=10),
+    bargap=0.15,
+    xaxis=dict(gridcolor='rgba(0, 255, 175, 0.1)', automargin=True),
+    yaxis=dict(gridcolor='rgba(0, 255, 175, 0.1)', automargin=True),
+    uirevision='constant'
+)
+
+
+def _build_base_layout():
+    fig = go.Figure()
+    fig.update_geos(
+        projection_type='natural earth',
+        showland=True,
+        landcolor='#2A3238',
+        oceancolor='#1a1f24',
+        showocean=True,
+        showcountries=False,
+        showcoastlines=True,
+        coastlinecolor='#00ffaf',
+        coastlinewidth=1,
+        showframe=False,
+        projection_rotation=dict(lon=0, lat=0),  # Default center
+        bgcolor='rgba(0,0,0,0)',
+        resolution=50
+    )
+    fig.update_layout(
+        height=1200,
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)',
+        font=dict(color='#00ffaf', size=12),
+        margin=dict(l=0, r=0, t=50, b=0),
+        legend=dict(
+            x=0,
+            y=1,
+            xanchor='left',
+            yanchor='top',
+            bgcolor='rgba(26, 31, 36, 0.8)',
+            font=dict(color='#00ffaf')
+        ),
+        uirevision='constant',
+        hovermode='closest',
+        # Disable default drag behavior
+        dragmode=False,
+        # Lock the view to prevent vertical movement
+        geo=dict(
+            center=dict(lat=0, lon=0),
+            projection_rotation=dict(lon=0, lat=0, roll=0),
+        )
+    )
+    # Includes the resolved default template, so output matches go.Figure
+    return fig.to_plotly_json()['layout']
+
+
+def _validated(trace_type, style):
+    trace = trace_type(**style).to_plotly_json()
+    # Round-trip through JSON so templates hold only plain lists and dicts
+    return json.loads(to_json_plotly(trace))
+
+
+@lru_cache(maxsize=None)
+def templates():
+    """Validate the static styling; runs on first use or during warm-up.
+
+    Returns (shared layout, choropleth template, layer templates). The
+    shared layout is handed to every figure and must not be mutated.
+    """
+    layout = json.loads(to_json_plotly(_build_base_layout()))
+    layer_templates = {
+        name: _validated(go.Scattergeo, dict(style, name=name)) for name, style in LAYER_STYLES.items()
+    }
+    return layout, _validated(go.Choropleth, CHOROPLETH_STYLE), layer_templates
+
+
+@lru_cache(maxsize=None)
+def chart_templates():
+    """Validated (layout, bar trace) templates for the analytics charts."""
+    layout = go.Figure(layout=CHART_LAYOUT_STYLE).to_plotly_json()['layout']
+    return json.loads(to_json_plotly(layout)), _validated(go.Bar, CHART_BAR_STYLE)
+
+
+def typed_array(values, dtype='f4'):
+    """A numeric column as a plotly.js typed-array spec, encoded from its buffer.
+
+    Falls back to a plain list when TYPED_ARRAYS is off, for clients whose
+    plotly.js predates ``bdata`` support (2.28).
+    """
+    arr = np.asarray(values, dtype=np.dtype(dtype).newbyteorder('<'))
+    if not TYPED_ARRAYS:
+        return arr.tolist()
+    return {'dtype': dtype, 'bdata': base64.b64encode(arr.tobytes()).decode('ascii')}
+
+
+def decode_array(value, dtype='f4'):
+    """Inverse of typed_array, for stores that come back to a callback."""
+    if isinstance(value, dict) and 'bdata' in value:
+        return np.frombuffer(base64.b64decode(value['bdata']), dtype=np.dtype(value['dtype']).newbyteorder('<'))
+    return np.asarray(value, dtype=dtype)
+
+
+def base_layout():
+    """The shared base layout; callers must not mutate it."""
+    return templates()[0]
+
+
+def choropleth_trace(locations, z, text, marker=None):
+    template = templates()[1]
+    trace = {**template, 'locations': locations, 'z': z, 'text': text}
+    if marker:
+        trace['marker'] = {**template.get('marker', {}), **marker}
+    return trace
+
+
+def layer_trace(name, lons, lats, texts=None, marker=None, customdata=None):
+    template = templates()[2][name]
+    trace = {**template, 'lon': lons, 'lat': lats}
+    if texts is not None:
+        trace['text'] = texts
+    if customdata is not None:
+        trace['customdata'] = customdata
+    if marker:
+        trace['marker'] = {**template.get('marker', {}), **marker}
+    return trace
+
+
+def base_figure(locations, z, text, marker=None):
+    return {'data': [choropleth_trace(locations, z, text, marker)], 'layout': base_layout()}
+
+
+def bar_chart(categories, counts, title, horizontal=False):
+    layout, bar = chart_templates()
+    trace = {**bar, 'x': categories, 'y': counts}
+    if horizontal:
+        trace.update(x=counts, y=categories, orientation='h')
+    return {'data': [trace], 'layout': {**layout, 'title': {'text': title}}}
+
+
+def with_layers(current_fig, traces):
+    """Keep the base choropleth of ``current_fig`` and append ``traces``."""
+    base = [t for t in current_fig.get('data', []) if t.get('type') == 'choropleth']
+    return {'data': base + traces, 'layout': current_fig.get('layout') or base_layout()}
+
+
+def trace_index(fig):
+    return {t['name']: i for i, t in enumerate(fig['data']) if t.get('name')}
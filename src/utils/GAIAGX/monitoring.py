@@ -0,0 +1,111 @@
+import hmac
+import json
+import os
+import time
+
+from flask import Response, abort, g, jsonify, request
+
+from events import metrics, profiling
+
+DASH_UPDATE_PATH = '/_dash-update-component'
+# Bearer token for /admin routes; without one they refuse every request, since
+# behind a reverse proxy every client looks like loopback
+ADMIN_TOKEN = os.environ.get('GAIA_ADMIN_TOKEN', '')
+
+
+def _callback_name():
+    # Dash posts the callback's output spec, e.g. "earth-globe.figure" or
+    # "..news-data-store.data...weather-data-store.data.."
+    try:
+        return (request.get_json(silent=True) or {}).get('output', 'unknown')
+    except Exception:
+        return 'unknown'
+
+
+def _start_timer():
+    if request.path.endswith(DASH_UPDATE_PATH):
+        g.callback_started = time.perf_counter()
+        if profiling.settings['rate'] > 0:
+            g.profile = profiling.begin(_callback_name(), request_bytes=request.content_length)
+
+
+def _record_callback(response):
+    started = g.pop('callback_started', None)
+    if started is not None:
+        name = _callback_name()
+        metrics.CALLBACK_SECONDS.labels(name).observe(time.perf_counter() - started)
+        size = response.calculate_content_length()
+        if size is not None:
+            metrics.CALLBACK_PAYLOAD_BYTES.labels(name).observe(size)
+        profiling.end(g.pop('profile', None), response_bytes=size, status=response.status_code)
+    return response
+
+
+def _end_profile(error=None):
+    # after_request is skipped when the callback raised
+    profiling.end(g.pop('profile', None), error=repr(error) if error else None)
+
+
+def metrics_endpoint():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+
+def _require_admin():
+    if not ADMIN_TOKEN:
+        abort(403, description="Admin routes are disabled; set GAIA_ADMIN_TOKEN to enable them")
+    supplied = request.headers.get('Authorization', '')
+    if not hmac.compare_digest(supplied.encode(), f"Bearer {ADMIN_TOKEN}".encode()):
+        abort(403)
+
+
+def profiling_endpoint():
+    """GET lists recent profiles, POST changes settings, DELETE drops the profiles.
+
+    Settings are per process; with several workers, each one that should
+    profile needs its own POST (or the GAIA_PROFILE_* environment).
+    """
+    _require_admin()
+    if request.method == 'POST':
+        try:
+            profiling.configure(**(request.get_json(silent=True) or request.form.to_dict()))
+        except (TypeError, ValueError) as e:
+            abort(400, description=str(e))
+    elif request.method == 'DELETE':
+        profiling.clear()
+    return jsonify({
+        'settings': profiling.settings,
+        'active': profiling.active(),
+        'profiles': [p.summary() for p in profiling.recent()],
+    })
+
+
+def profiling_export():
+    """Recent profiles as collapsed stacks (?format=collapsed) or speedscope JSON.
+
+    ?id=<n> (repeatable) picks profiles; ?match= filters them by name.
+    """
+    _require_admin()
+    fmt = request.args.get('format', 'speedscope')
+    try:
+        ids = [int(i) for i in request.args.getlist('id')] or None
+    except ValueError:
+        abort(400, description="id must be an integer")
+    profiles = profiling.recent(ids, request.args.get('match', ''))
+    if fmt == 'collapsed':
+        return Response(profiling.collapsed(profiles), mimetype='text/plain')
+    if fmt == 'speedscope':
+        return Response(
+            json.dumps(profiling.speedscope(profiles)), mimetype='application/json',
+            headers={'Content-Disposition': 'attachment; filename="gaia-profiles.speedscope.json"'}
+        )
+    abort(400, description=f"Unsupported format '{fmt}'")
+
+
+def register_metrics(server):
+    # Measured at the HTTP layer so payload bytes are what Dash actually sent
+    server.before_request(_start_timer)
+    server.after_request(_record_callback)
+    server.teardown_request(_end_profile)
+    server.add_url_rule('/metrics', 'metrics', metrics_endpoint)
+    server.add_url_rule('/admin/profiling', 'profiling', profiling_endpoint, methods=['GET', 'POST', 'DELETE'])
+    server.add_url_rule('/admin/profiling/export', 'profiling_export', profiling_export)
@@ -0,0 +1,81 @@
+import importlib
+import socket
+import threading
+import time
+
+from flask import jsonify, request
+
+from events.metrics import count_error
+
+# Optional modules the first callbacks would otherwise import on demand
+WARM_IMPORTS = ('cudf', 'feedparser', 'httpx', 'openmeteo_sdk.WeatherApiResponse')
+
+_state = {'started': time.time(), 'warm': False, 'steps': {}}
+
+
+def _steps():
+    from events import http_client
+    from events.tide import start_prefetch
+    from utils.GAIAGX import Globe, figures
+
+    steps = [(f"import.{name}", lambda name=name: importlib.import_module(name)) for name in WARM_IMPORTS]
+    steps += [
+        ('figures.templates', figures.templates),
+        ('figures.chart_templates', figures.chart_templates),
+        ('http.loop', http_client.start),
+        # Populate the layer snapshots the initial page load reads
+        ('layer.population', lambda: Globe.update_base_globe(None)),
+        ('layer.news', lambda: Globe.fetch_news_data('earth-globe')),
+        ('layer.weather', lambda: Globe.fetch_weather_data('earth-globe')),
+        ('layer.tide', lambda: Globe.fetch_tide_data('earth-globe')),
+        ('tide.prefetch', start_prefetch),
+    ]
+    return steps
+
+
+def warm_up():
+    for name, step in _steps():
+        start = time.perf_counter()
+        try:
+            step()
+            _state['steps'][name] = round(time.perf_counter() - start, 3)
+        except Exception as e:
+            _state['steps'][name] = None
+            count_error(f"startup.{name}", e)
+    _state['warm'] = True
+
+
+def _wait_for_port(port, host='127.0.0.1'):
+    while True:
+        try:
+            with socket.create_connection((host, port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.05)
+
+
+def start_warm_up(port):
+    """Warm up in a daemon thread once the server accepts connections."""
+    def run():
+        _wait_for_port(port)
+        warm_up()
+
+    thread = threading.Thread(target=run, name='gaia-warm-up', daemon=True)
+    thread.start()
+    return thread
+
+
+def healthz():
+    # Liveness answers immediately; ?ready=1 reports 503 until warm-up is done
+    body = {
+        'status': 'ok',
+        'warm': _state['warm'],
+        'uptime': round(time.time() - _state['started'], 3),
+        'steps': _state['steps'],
+    }
+    status = 503 if request.args.get('ready') and not _state['warm'] else 200
+    return jsonify(body), status
+
+
+def register_health(server):
+    server.add_url_rule('/healthz', 'healthz', healthz)
@@ -1,3 +1,40 @@
+import os
+
 PLOT_HEIGHT = 1000
 NEAREST_NEIGHBORS = 10
-MAX_SUGGESTIONS = 20
\ No newline at end of file
+MAX_SUGGESTIONS = 20
+
+# Seconds a published layer snapshot is served before it is fetched again
+SNAPSHOT_MAX_AGE = 600
+
+# Milliseconds between live earthquake polls from each open globe
+LIVE_POLL_INTERVAL = 5000
+
+# Milliseconds between weather chunk polls while the layer is filling, and
+# once it is complete (to pick up hourly refreshes)
+WEATHER_STREAM_INTERVAL = 1000
+WEATHER_IDLE_INTERVAL = 60000
+
+# Tide predictions are loaded for the stations in view once the globe is
+# zoomed to at least this projection scale, nearest to the centre first
+TIDE_VIEWPORT_MIN_SCALE = 2.0
+TIDE_VIEWPORT_MAX_STATIONS = 25
+
+# Numeric trace and store columns are sent as base64 typed arrays (plotly.js
+# 2.28+); set GAIA_TYPED_ARRAYS=0 to send plain JSON lists to older clients
+TYPED_ARRAYS = os.environ.get('GAIA_TYPED_ARRAYS', '1') != '0'
+
+# Regions listed in the seismic activity-by-region chart
+SEISMIC_TOP_REGIONS = 15
+
+# Swarm layer marker colours by cluster kind
+SWARM_COLORS = {'swarm': '#ffb000', 'aftershocks': '#ff4f9a'}
+
+# Seconds each data-loading callback may spend on upstream calls; whatever
+# has not finished by then is drawn from the previous snapshot at STALE_OPACITY
+CALLBACK_DEADLINE = 8.0
+STALE_OPACITY = 0.35
+
+# Serve health checks as soon as the port is bound and warm caches in the
+# background; set GAIA_FAST_START=0 to warm up before listening instead
+FAST_START = os.environ.get('GAIA_FAST_START', '1') != '0'
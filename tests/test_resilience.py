@@ -0,0 +1,46 @@
+import time
+
+import pytest
+
+from events import resilience
+from events.resilience import CircuitBreaker, DeadlineExceeded, deadline, guarded
+
+
+@pytest.fixture
+def breaker(monkeypatch):
+    breaker = CircuitBreaker('test', threshold=1, reset_after=0.01)
+    monkeypatch.setitem(resilience._breakers, 'test', breaker)
+    breaker.record_failure()
+    time.sleep(0.02)
+    assert breaker.state == 'half_open'
+    return breaker
+
+
+def test_trial_cut_off_by_deadline_releases_slot(breaker):
+    with pytest.raises(TimeoutError):
+        with deadline(0.01):
+            with guarded('test'):
+                time.sleep(0.02)
+                raise TimeoutError("read timed out")
+    assert breaker.state == 'half_open'
+    assert breaker.allow()
+
+
+def test_trial_skipped_as_unavailable_releases_slot(breaker):
+    with pytest.raises(DeadlineExceeded):
+        with guarded('test'):
+            raise DeadlineExceeded("callback deadline exceeded")
+    assert breaker.allow()
+
+
+def test_trial_failure_reopens(breaker):
+    with pytest.raises(RuntimeError):
+        with guarded('test'):
+            raise RuntimeError("boom")
+    assert breaker.state == 'open'
+    assert not breaker.allow()
+
+
+def test_only_one_trial_at_a_time(breaker):
+    assert breaker.acquire() == 'trial'
+    assert breaker.acquire() is None
@@ -0,0 +1,168 @@
+import json
+import time
+from datetime import datetime, timezone
+
+import pytest
+
+from events import seismic
+from events.seismic import DECODE_ERRORS, EVENT_FIELDS, EventBuffer, decode_message, events_since
+from events.snapshot import records_to_columns
+
+
+def event(unid, seq, **fields):
+    return {'unid': unid, 'seq': seq, 'lat': 0.0, 'lon': 0.0, 'depth': 10.0, 'mag': 4.0,
+            'region': 'R', 'time': None, **fields}
+
+
+def message(coordinates=(142.0, 38.0, -10.0), **properties):
+    props = {'unid': 'a', 'mag': 4.5, 'flynn_region': 'HONSHU', 'time': '2026-10-19T00:00:00', **properties}
+    return json.dumps({'action': 'create', 'data': {
+        'id': 'feature-id', 'geometry': {'coordinates': coordinates}, 'properties': props,
+    }})
+
+
+def test_upsert_revises_in_place():
+    buffer = EventBuffer(3)
+    assert not buffer.upsert(event('a', 1))
+    assert not buffer.upsert(event('b', 2))
+    assert buffer.upsert(event('a', 3, mag=5.0))
+    assert len(buffer) == 2
+    assert [(e['unid'], e['seq'], e['first_seq']) for e in buffer] == [('a', 3, 1), ('b', 2, 2)]
+    assert buffer[0]['mag'] == 5.0
+
+
+def test_full_buffer_evicts_oldest_by_creation():
+    buffer = EventBuffer(2)
+    for seq, unid in enumerate('abc', 1):
+        buffer.upsert(event(unid, seq))
+    assert [e['unid'] for e in buffer] == ['b', 'c']
+    assert buffer[-1]['unid'] == 'c'
+    # The evicted unid is new again rather than a revision
+    assert not buffer.upsert(event('a', 4))
+    assert [e['unid'] for e in buffer] == ['c', 'a']
+
+
+def test_events_without_unid_are_never_revisions():
+    buffer = EventBuffer(3)
+    assert not buffer.upsert(event('', 1))
+    assert not buffer.upsert(event('', 2))
+    assert len(buffer) == 2
+
+
+def test_events_since_splits_appended_and_revised():
+    buffer = EventBuffer(10)
+    for seq, unid in enumerate('abcd', 1):
+        buffer.upsert(event(unid, seq))
+    cursor = 4
+    buffer.upsert(event('b', 5, mag=6.0))
+    buffer.upsert(event('e', 6))
+    buffer.upsert(event('e', 7, mag=3.0))
+
+    appended, revised = events_since(records_to_columns(list(buffer), EVENT_FIELDS), cursor)
+    assert list(appended['unid']) == ['e']
+    assert list(appended['mag']) == [3.0]
+    assert revised['unid'] == ['b']
+    assert revised['mag'] == [6.0]
+
+    appended, revised = events_since(records_to_columns(list(buffer), EVENT_FIELDS), 7)
+    assert not len(appended['seq']) and not revised['seq']
+
+
+def test_decode_message():
+    action, decoded = decode_message(message())
+    assert action == 'create'
+    assert decoded == {'unid': 'a', 'lat': 38.0, 'lon': 142.0, 'depth': -10.0, 'mag': 4.5,
+                       'region': 'HONSHU', 'time': '2026-10-19T00:00:00'}
+
+
+def test_decode_message_fills_null_fields():
+    _, decoded = decode_message(message(unid=None, flynn_region=None, mag=None))
+    assert decoded['unid'] == 'feature-id'
+    assert decoded['region'] == 'Unknown'
+    assert decoded['mag'] is None
+
+
+@pytest.mark.parametrize('coordinates, props', [
+    (None, {}),
+    ([None, 38.0, -10.0], {}),
+    ([142.0, 95.0, -10.0], {}),
+    ([142.0, 38.0], {}),
+    ((142.0, 38.0, -10.0), {'mag': 'large'}),
+])
+def test_decode_message_rejects_bad_values(coordinates, props):
+    with pytest.raises(DECODE_ERRORS):
+        decode_message(message(coordinates, **props))
+
+
+def test_ingest_counts_bad_messages_and_carries_on(monkeypatch):
+    monkeypatch.setattr(seismic, 'recent_events', EventBuffer(10))
+    monkeypatch.setattr(seismic, 'aggregates', seismic.SeismicAggregates(24))
+    monkeypatch.setattr(seismic, 'swarms', seismic.SwarmDetector())
+    monkeypatch.setattr(seismic, 'ingest_counts', {'ingested': 0, 'revised': 0, 'error': 0})
+
+    assert not seismic.ingest([message([None, None, None]), 'not json', message(), message(mag=5.0)])
+    assert seismic.ingest_counts == {'ingested': 2, 'revised': 1, 'error': 2}
+    assert len(seismic.recent_events) == 1
+    assert seismic.ingest([None])
+
+
+# Hours well in the past, since origin times are capped at now
+BASE_HOUR = int(time.time() // 3600) - 200
+
+
+def at_hour(hour):
+    return datetime.fromtimestamp(hour * 3600 + 60, timezone.utc).isoformat()
+
+
+def test_aggregates_count_by_hour_region_and_bin():
+    agg = seismic.SeismicAggregates(4)
+    agg.add(event('a', 1, time=at_hour(BASE_HOUR), mag=4.2, depth=12.0, region='X'))
+    agg.add(event('b', 2, time=at_hour(BASE_HOUR + 1), mag=None, depth=-3.0, region='Y'))
+
+    hours = agg.hour_columns()
+    assert hours['hour'].tolist() == list(range(BASE_HOUR - 2, BASE_HOUR + 2))
+    assert hours['events'].tolist() == [0, 0, 1, 1]
+    assert hours['mag'][2, 8] == 1 and hours['mag'][3].sum() == 0
+    # Depths are binned by absolute value, whichever sign the feed uses
+    assert hours['depth'][2, 2] == 1 and hours['depth'][3, 0] == 1
+    regions = agg.region_columns()
+    assert regions['region'] == ['X', 'Y']
+    assert regions['hourly'].tolist() == [[0, 0, 1, 0], [0, 0, 0, 1]]
+
+
+def test_aggregates_move_a_revision_instead_of_double_counting():
+    agg = seismic.SeismicAggregates(4)
+    agg.add(event('a', 1, time=at_hour(BASE_HOUR), mag=4.2, region='X'))
+    agg.add(event('a', 2, time=at_hour(BASE_HOUR + 1), mag=5.1, region='Y'))
+
+    hours = agg.hour_columns()
+    assert hours['events'].tolist() == [0, 0, 0, 1]
+    assert hours['mag'].sum() == 1 and hours['mag'][3, 10] == 1
+    assert agg.region_columns()['hourly'].sum(axis=1).tolist() == [0, 1]
+
+
+def test_aggregates_expire_hours_that_leave_the_window():
+    agg = seismic.SeismicAggregates(3)
+    agg.add(event('a', 1, time=at_hour(BASE_HOUR)))
+    agg.add(event('b', 2, time=at_hour(BASE_HOUR + 2)))
+    assert agg.hour_columns()['events'].tolist() == [1, 0, 1]
+
+    agg.add(event('c', 3, time=at_hour(BASE_HOUR + 3)))
+    assert agg.hour_columns()['events'].tolist() == [0, 1, 1]
+    # Too old for the window, including a revision of an expired event
+    agg.add(event('d', 4, time=at_hour(BASE_HOUR)))
+    agg.add(event('a', 5, time=at_hour(BASE_HOUR)))
+    assert agg.hour_columns()['events'].tolist() == [0, 1, 1]
+
+    # A jump past the whole window clears it
+    agg.add(event('e', 6, time=at_hour(BASE_HOUR + 10)))
+    assert agg.hour_columns()['events'].tolist() == [0, 0, 1]
+
+
+def test_aggregates_grow_past_the_initial_regions():
+    agg = seismic.SeismicAggregates(2)
+    for i in range(40):
+        agg.add(event(f"e{i}", i, time=at_hour(BASE_HOUR), region=f"R{i}"))
+    regions = agg.region_columns()
+    assert len(regions['region']) == 40
+    assert regions['hourly'][:, -1].tolist() == [1] * 40
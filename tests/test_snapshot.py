@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from events import snapshot
+from events.snapshot import publish_snapshot, read_snapshot
+
+
+@pytest.fixture(autouse=True)
+def snapshot_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot, 'SNAPSHOT_DIR', str(tmp_path))
+    monkeypatch.setattr(snapshot, '_mapped', {})
+    return tmp_path
+
+
+def test_round_trip_text_numeric_and_nan_columns():
+    version = publish_snapshot('test', {
+        'name': ['Tōkyō', None, ''],
+        'count': [3, 1, 2],
+        'mag': [4.5, None, np.nan],
+        'bins': np.arange(6, dtype=np.int32).reshape(3, 2),
+    }, generation=7)
+
+    snap = read_snapshot('test')
+    assert snap.version == version
+    assert len(snap) == 3
+    assert snap.attrs == {'generation': 7}
+    assert snap['name'] == ['Tōkyō', '', '']
+    assert snap['count'].tolist() == [3, 1, 2]
+    np.testing.assert_array_equal(snap['mag'], [4.5, np.nan, np.nan])
+    assert snap['bins'].shape == (3, 2)
+    assert snap['bins'].tolist() == [[0, 1], [2, 3], [4, 5]]
+    assert not snap['count'].flags.writeable
+
+
+def test_rows_and_names():
+    publish_snapshot('test', {'id': ['a', 'b'], 'value': [1.5, 2.5]})
+    snap = read_snapshot('test')
+    assert snap.names == ['id', 'value']
+    assert list(snap.iter_rows()) == [{'id': 'a', 'value': 1.5}, {'id': 'b', 'value': 2.5}]
+
+
+def test_republish_maps_the_new_version():
+    first = publish_snapshot('test', {'value': [1]})
+    assert read_snapshot('test') is read_snapshot('test')
+    second = publish_snapshot('test', {'value': [1, 2]})
+    assert second > first
+    assert read_snapshot('test')['value'].tolist() == [1, 2]
+
+
+def test_missing_and_expired_snapshots():
+    assert read_snapshot('test') is None
+    publish_snapshot('test', {'value': [1]})
+    assert read_snapshot('test', max_age=60) is not None
+    assert read_snapshot('test', max_age=-1) is None
+
+
+def test_ragged_columns_are_rejected():
+    with pytest.raises(ValueError):
+        publish_snapshot('test', {'a': [1, 2], 'b': [1]})
@@ -0,0 +1,145 @@
+import math
+
+from events.swarms import SwarmDetector
+
+HOUR = 3600.0
+# Degrees of latitude per km
+KM = 1 / 111.2
+
+
+def counts(detector):
+    return sorted(c['count'] for c in detector.clusters(min_events=1))
+
+
+def test_nearby_events_link_and_distant_ones_do_not():
+    d = SwarmDetector(link_km=30, link_hours=12)
+    d.add('a', 10.0, 20.0, 0)
+    d.add('b', 10.0 + 20 * KM, 20.0, HOUR)
+    d.add('c', 10.0 + 60 * KM, 20.0, 2 * HOUR)
+    assert counts(d) == [1, 2]
+
+
+def test_events_too_far_apart_in_time_do_not_link():
+    d = SwarmDetector(link_km=30, link_hours=12)
+    d.add('a', 10.0, 20.0, 0)
+    d.add('b', 10.0, 20.0, 13 * HOUR)
+    assert counts(d) == [1, 1]
+
+
+def test_chains_link_transitively():
+    d = SwarmDetector(link_km=30, link_hours=12)
+    for i in range(6):
+        d.add(f"e{i}", 10.0 + i * 25 * KM, 20.0, i * HOUR)
+    assert counts(d) == [6]
+
+
+def test_bridging_event_merges_clusters():
+    d = SwarmDetector(link_km=30, link_hours=12)
+    for i in range(3):
+        d.add(f"w{i}", 0.0, 20.0 - i * 10 * KM, i)
+        d.add(f"e{i}", 0.0, 20.0 + 50 * KM + i * 10 * KM, i)
+    assert counts(d) == [3, 3]
+    d.add('bridge', 0.0, 20.0 + 25 * KM, 10)
+    assert counts(d) == [7]
+    (cluster,) = d.clusters(min_events=1)
+    assert math.isclose(cluster['lat'], 0.0, abs_tol=1e-9)
+
+
+def test_links_across_the_antimeridian():
+    d = SwarmDetector(link_km=30, link_hours=12)
+    d.add('a', -17.0, 179.95, 0)
+    d.add('b', -17.0, -179.95, HOUR)
+    (cluster,) = d.clusters(min_events=1)
+    assert cluster['count'] == 2
+    assert abs(cluster['lon']) > 179.9
+
+
+def test_links_near_the_pole():
+    d = SwarmDetector(link_km=30, link_hours=12)
+    d.add('a', 89.95, 0.0, 0)
+    d.add('b', 89.95, 180.0, HOUR)
+    assert counts(d) == [2]
+
+
+def test_revision_moves_an_event():
+    d = SwarmDetector(link_km=30, link_hours=12)
+    d.add('a', 10.0, 20.0, 0)
+    d.add('b', 10.0, 20.0 + 10 * KM, 0)
+    d.add('b', 40.0, 20.0, 0)
+    assert len(d) == 2
+    assert counts(d) == [1, 1]
+
+
+def test_events_expire_out_of_the_window():
+    d = SwarmDetector(link_km=30, link_hours=12, window_hours=24)
+    for i in range(3):
+        d.add(f"old{i}", 10.0, 20.0, i * HOUR)
+    d.add('new', 10.0, 20.0, 13 * HOUR)
+    assert counts(d) == [4]
+
+    d.expire(now=25.5 * HOUR)
+    assert len(d) == 2
+    assert counts(d) == [2]
+    # Older than the window already
+    d.add('late', 10.0, 20.0, 0)
+    assert len(d) == 2
+
+    d.expire(now=100 * HOUR)
+    assert len(d) == 0 and d.clusters(min_events=1) == []
+    assert d.dirty
+
+
+def test_summary_kind_and_largest_event():
+    d = SwarmDetector(link_km=30, link_hours=12)
+    d.add('main', 10.0, 20.0, 0, mag=6.5, region='MAIN')
+    for i in range(4):
+        d.add(f"after{i}", 10.0 + i * KM, 20.0, (i + 1) * HOUR, mag=4.0, region='AFTER')
+    d.add('unknown', 10.0, 20.0, 6 * HOUR, mag=None)
+    (cluster,) = d.clusters()
+    assert cluster['count'] == 6
+    assert cluster['kind'] == 'aftershocks'
+    assert cluster['max_mag'] == 6.5
+    assert cluster['region'] == 'MAIN'
+    assert (cluster['first'], cluster['last']) == (0, 6 * HOUR)
+
+    flat = SwarmDetector(link_km=30, link_hours=12)
+    for i in range(5):
+        flat.add(f"s{i}", 10.0, 20.0 + i * KM, i * HOUR, mag=3.0 + i * 0.1)
+    assert flat.clusters()[0]['kind'] == 'swarm'
+    assert flat.clusters(min_events=6) == []
+
+
+def test_dense_cells_match_pairwise_linking():
+    # Single linkage by brute force over a mix of dense and sparse events
+    import random
+    rng = random.Random(5)
+    events = []
+    for i in range(400):
+        lat, lon = rng.choice([(35.0, 140.0), (35.5, 140.4), (-60.0, 170.0)])
+        spread = rng.choice([0.02, 0.2])
+        events.append((f"e{i}", lat + rng.gauss(0, spread), lon + rng.gauss(0, spread), i * 60.0))
+    d = SwarmDetector(link_km=30, link_hours=12)
+    for e in events:
+        d.add(*e)
+
+    parent = list(range(len(events)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def km(a, b):
+        p1, p2 = math.radians(a[1]), math.radians(b[1])
+        h = math.sin((p2 - p1) / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(math.radians(b[2] - a[2]) / 2) ** 2
+        return 2 * 6371.0 * math.asin(math.sqrt(h))
+
+    for i, a in enumerate(events):
+        for j in range(i):
+            if abs(a[3] - events[j][3]) <= 12 * HOUR and km(a, events[j]) <= 30:
+                parent[find(i)] = find(j)
+    sizes = {}
+    for i in range(len(events)):
+        sizes[find(i)] = sizes.get(find(i), 0) + 1
+    assert counts(d) == sorted(sizes.values())
@@ -0,0 +1,249 @@
+"""Sliding-window training data over the hourly weather Parquet from fetch.py.
+
+export() converts the Parquet once into raw .npy columns. WindowDataset maps
+those files and serves (input window, target horizon) pairs as strided views,
+so overlapping windows take no memory of their own.
+"""
+import argparse
+import json
+import os
+import sys
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+
+TARGETS = ['temperature', 'humidity', 'precipitation', 'wind_speed', 'pressure', 'cloud_cover']
+FEATURES = [
+    'month_sin', 'month_cos', 'day_sin', 'day_cos', 'hour_sin', 'hour_cos',
+    'day_of_week_sin', 'day_of_week_cos', 'day_of_year_sin', 'day_of_year_cos',
+] + TARGETS
+# Rows read from the Parquet at a time during export
+EXPORT_BATCH_ROWS = 1 << 20
+
+
+def _city_runs(cities: np.ndarray, offset: int) -> List[Tuple[str, int, int]]:
+    changes = np.flatnonzero(cities[1:] != cities[:-1]) + 1
+    bounds = np.concatenate([[0], changes, [len(cities)]])
+    return [(str(cities[a]), offset + int(a), offset + int(b)) for a, b in zip(bounds[:-1], bounds[1:])]
+
+
+def export(parquet_path: str, out_dir: str, features: Sequence[str] = FEATURES,
+           targets: Sequence[str] = TARGETS, batch_rows: int = EXPORT_BATCH_ROWS) -> Dict:
+    """Write ``parquet_path`` (sorted by city, then time) as a window dataset.
+
+    ``out_dir`` gets values.npy (float32, one row per hour, feature columns
+    followed by the targets), time.npy (unix seconds) and meta.json. Each
+    city's rows are split into segments wherever the time step breaks, so
+    no window spans a gap. fetch.py writes naive local times, so a daylight
+    saving change shows up as a skipped or repeated hour; both just start a
+    new segment, and only timestamps that go backwards abort the export.
+    Returns the metadata.
+    """
+    import pyarrow.parquet as pq
+
+    columns = [c for c in features if c not in targets] + list(targets)
+    source = pq.ParquetFile(parquet_path)
+    rows = source.metadata.num_rows
+    os.makedirs(out_dir, exist_ok=True)
+    values = np.lib.format.open_memmap(
+        os.path.join(out_dir, 'values.npy'), mode='w+', dtype='<f4', shape=(rows, len(columns))
+    )
+    times = np.lib.format.open_memmap(os.path.join(out_dir, 'time.npy'), mode='w+', dtype='<i8', shape=(rows,))
+
+    runs, coords, row = [], {}, 0
+    for batch in source.iter_batches(batch_size=batch_rows, columns=columns + ['timestamp', 'city', 'lat', 'lon']):
+        n = batch.num_rows
+        for j, name in enumerate(columns):
+            values[row:row + n, j] = batch.column(name).to_numpy(zero_copy_only=False)
+        stamps = batch.column('timestamp').to_numpy(zero_copy_only=False)
+        times[row:row + n] = stamps.astype('datetime64[s]').astype('<i8')
+
+        cities = batch.column('city').to_numpy(zero_copy_only=False)
+        lats, lons = batch.column('lat').to_numpy(), batch.column('lon').to_numpy()
+        for name, start, stop in _city_runs(cities, row):
+            if runs and runs[-1][0] == name:
+                runs[-1] = (name, runs[-1][1], stop)
+                continue
+            if name in coords:
+                raise ValueError(f"{parquet_path}: rows are not sorted by city ({name} appears twice)")
+            coords[name] = (float(lats[start - row]), float(lons[start - row]))
+            runs.append((name, start, stop))
+        row += n
+    values.flush()
+    times.flush()
+
+    steps = [np.diff(times[start:stop]) for _, start, stop in runs]
+    step = int(np.median(np.concatenate(steps))) if any(len(s) for s in steps) else 3600
+    segments, repeated = [], 0
+    for (name, start, stop), diffs in zip(runs, steps):
+        if np.any(diffs < 0):
+            raise ValueError(f"{parquet_path}: {name} rows are not sorted by time")
+        repeated += int(np.count_nonzero(diffs == 0))
+        breaks = np.flatnonzero(diffs != step) + 1 + start
+        bounds = [start] + breaks.tolist() + [stop]
+        segments += [{'city': name, 'start': a, 'stop': b} for a, b in zip(bounds[:-1], bounds[1:])]
+
+    if repeated:
+        print(f"Warning: {repeated} repeated timestamps (local clock set back, e.g. for DST); "
+              f"windows do not span them")
+
+    meta = {
+        'columns': columns,
+        'targets': len(targets),
+        'step': step,
+        'cities': {name: {'lat': lat, 'lon': lon} for name, (lat, lon) in coords.items()},
+        'segments': segments,
+    }
+    # Written last, so a directory with meta.json holds a complete export
+    with open(os.path.join(out_dir, 'meta.json'), 'w') as f:
+        json.dump(meta, f)
+    return meta
+
+
+def _worker_shard() -> Tuple[int, int]:
+    # Inside a PyTorch DataLoader worker, shard by its worker info; torch is
+    # only consulted if the caller already imported it
+    torch = sys.modules.get('torch')
+    info = torch.utils.data.get_worker_info() if torch is not None else None
+    return (info.id, info.num_workers) if info is not None else (0, 1)
+
+
+class WindowDataset:
+    """(input window, target horizon) pairs over an export()ed directory.
+
+    Window ``i`` covers ``window`` hours of every column, then the next
+    ``horizon`` hours of the target columns. Windows start every ``stride``
+    hours within each segment. The files are memory-mapped and every window
+    is a strided view into them. Unshuffled batches of evenly spaced windows
+    are views too. Shuffled batches gather just their own windows. Only the
+    segment table and, when shuffling, a 4-byte index per window are held
+    in memory.
+
+    Pickling drops the mappings, so worker processes map the files
+    themselves instead of receiving a copy of the data.
+    """
+
+    def __init__(self, path: str, window: int, horizon: int, stride: int = 1,
+                 cities: Optional[Sequence[str]] = None):
+        if window < 1 or horizon < 1 or stride < 1:
+            raise ValueError("window, horizon and stride must be positive")
+        with open(os.path.join(path, 'meta.json')) as f:
+            self.meta = json.load(f)
+        self.path = path
+        self.window, self.horizon, self.stride = window, horizon, stride
+        self.columns: List[str] = self.meta['columns']
+        self.target_columns = self.columns[len(self.columns) - self.meta['targets']:]
+
+        span = window + horizon
+        wanted = None if cities is None else set(cities)
+        self.segments = [
+            s for s in self.meta['segments']
+            if (wanted is None or s['city'] in wanted) and s['stop'] - s['start'] >= span
+        ]
+        self._first = np.array([s['start'] for s in self.segments], dtype=np.int64)
+        counts = np.array([(s['stop'] - s['start'] - span) // stride + 1 for s in self.segments], dtype=np.int64)
+        # Window index at which each segment begins, plus the total
+        self._offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        self._values = None
+        self._windows = None
+
+    def __getstate__(self):
+        return {**self.__dict__, '_values': None, '_windows': None}
+
+    def __len__(self) -> int:
+        return int(self._offsets[-1])
+
+    @property
+    def values(self) -> np.ndarray:
+        if self._values is None:
+            self._values = np.load(os.path.join(self.path, 'values.npy'), mmap_mode='r')
+        return self._values
+
+    @property
+    def times(self) -> np.ndarray:
+        return np.load(os.path.join(self.path, 'time.npy'), mmap_mode='r')
+
+    def _all_windows(self) -> np.ndarray:
+        # Every row-aligned span as a (starts, span, columns) view of the map
+        if self._windows is None:
+            values, span = self.values, self.window + self.horizon
+            rows, cols = values.strides
+            self._windows = as_strided(
+                values, shape=(max(0, len(values) - span + 1), span, values.shape[1]),
+                strides=(rows, rows, cols), writeable=False
+            )
+        return self._windows
+
+    def starts(self, indices) -> np.ndarray:
+        """Row at which each window in ``indices`` starts."""
+        indices = np.asarray(indices, dtype=np.int64)
+        if len(indices) and (indices.min() < 0 or indices.max() >= len(self)):
+            raise IndexError(f"window index out of range for {len(self)} windows")
+        segment = np.searchsorted(self._offsets, indices, side='right') - 1
+        return self._first[segment] + (indices - self._offsets[segment]) * self.stride
+
+    def _split(self, windows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        targets = len(self.target_columns)
+        return windows[..., :self.window, :], windows[..., self.window:, len(self.columns) - targets:]
+
+    def __getitem__(self, index: int) -> Tuple[np.ndarray, np.ndarray]:
+        if index < 0:
+            index += len(self)
+        return self._split(self._all_windows()[int(self.starts([index])[0])])
+
+    def batch(self, indices) -> Tuple[np.ndarray, np.ndarray]:
+        """Inputs (n, window, columns) and targets (n, horizon, targets) for ``indices``.
+
+        Evenly spaced starts come back as views; anything else is gathered
+        into a new array of just these windows.
+        """
+        starts = self.starts(indices)
+        windows = self._all_windows()
+        if len(starts) == 0:
+            return self._split(windows[:0])
+        step = int(starts[1] - starts[0]) if len(starts) > 1 else 1
+        first = int(starts[0])
+        if step > 0 and np.array_equal(starts, first + step * np.arange(len(starts))):
+            return self._split(windows[first:first + step * (len(starts) - 1) + 1:step])
+        return self._split(windows[starts])
+
+    def batches(self, batch_size: int, shuffle: bool = False, seed: int = 0, epoch: int = 0,
+                drop_last: bool = False, worker: Optional[int] = None,
+                workers: Optional[int] = None) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """Yield (inputs, targets) batches for one epoch.
+
+        Shuffling permutes window indices with a generator seeded from
+        (``seed``, ``epoch``), so every worker draws the same order. Worker
+        ``worker`` of ``workers`` then takes every ``workers``-th batch;
+        both default to the PyTorch worker info when running in a
+        DataLoader worker, otherwise to a single worker.
+        """
+        if worker is None or workers is None:
+            worker, workers = _worker_shard()
+        n = len(self)
+        if shuffle:
+            order = np.arange(n, dtype=np.uint32 if n <= np.iinfo(np.uint32).max else np.int64)
+            np.random.default_rng([seed, epoch]).shuffle(order)
+        else:
+            order = np.arange(n, dtype=np.int64)
+        stop = n - n % batch_size if drop_last else n
+        for first in range(worker * batch_size, stop, workers * batch_size):
+            yield self.batch(order[first:first + batch_size])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a fetch.py Parquet file as a window dataset.")
+    parser.add_argument('parquet', help="Parquet written by utils/weather/fetch.py")
+    parser.add_argument('out_dir', help="directory for values.npy, time.npy and meta.json")
+    args = parser.parse_args()
+
+    meta = export(args.parquet, args.out_dir)
+    cities = len(meta['cities'])
+    print(f"Exported {meta['segments'][-1]['stop'] if meta['segments'] else 0} rows, "
+          f"{len(meta['columns'])} columns for {cities} cities ({len(meta['segments'])} segments) "
+          f"to '{args.out_dir}'")
+
+
+if __name__ == "__main__":
+    main()